@@ -28,4 +28,6 @@ urlpatterns += [
     path('', include('backend.apps.notifications.urls')),
     # Analytics API
     path('analytics/', include('backend.apps.analytics.urls')),
+    # Búsqueda de texto completo
+    path('search/', include('backend.apps.search.urls')),
 ]
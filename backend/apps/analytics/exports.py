@@ -0,0 +1,144 @@
+# Streaming exports of raw analytics data
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import AnalyticsEvent, ConversionEvent
+from .reports import date_range_bounds
+
+
+EXPORT_SOURCES = {
+    'events': (AnalyticsEvent, (
+        'id', 'timestamp', 'event_name', 'event_category', 'event_label', 'event_value',
+        'user_id', 'session_id', 'ip_address', 'user_agent', 'page_url', 'page_title',
+        'referrer', 'custom_parameters',
+    )),
+    'conversions': (ConversionEvent, (
+        'id', 'timestamp', 'conversion_type', 'conversion_value', 'currency', 'user_id',
+        'analytics_event_id', 'source', 'medium', 'campaign', 'conversion_data',
+    )),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _LineBuffer:
+    """File-like object that hands back what csv.writer writes"""
+    
+    def write(self, value):
+        return value
+
+
+class AnalyticsExporter:
+    """
+    Stream analytics rows as CSV or NDJSON in constant memory: rows are read
+    with keyset pagination on (timestamp, id) and serialized chunk by chunk,
+    optionally gzip-compressed on the fly.
+    """
+    
+    CHUNK_SIZE = 2000
+    
+    def __init__(self, source, output_format='csv', start_date=None, end_date=None,
+                 compress=False, chunk_size=None):
+        if source not in EXPORT_SOURCES:
+            raise ValueError(f"Unknown export source: {source}")
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {output_format}")
+        
+        self.model, self.fields = EXPORT_SOURCES[source]
+        self.source = source
+        self.output_format = output_format
+        self.start_date = start_date
+        self.end_date = end_date
+        self.compress = compress
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+    
+    @property
+    def content_type(self):
+        return EXPORT_FORMATS[self.output_format]
+    
+    @property
+    def filename(self):
+        name = f"{self.source}.{self.output_format}"
+        return f"{name}.gz" if self.compress else name
+    
+    def _base_queryset(self):
+        queryset = self.model.objects.filter(
+            **date_range_bounds('timestamp', self.start_date, self.end_date)
+        )
+        return queryset.order_by('timestamp', 'id').values_list(*self.fields)
+    
+    def iter_rows(self):
+        """Yield row tuples page by page, resuming after the last (timestamp, id) seen"""
+        queryset = self._base_queryset()
+        timestamp_index = self.fields.index('timestamp')
+        id_index = self.fields.index('id')
+        last_key = None
+        
+        while True:
+            page = queryset
+            if last_key is not None:
+                last_timestamp, last_id = last_key
+                page = page.filter(
+                    Q(timestamp__gt=last_timestamp) | Q(timestamp=last_timestamp, id__gt=last_id)
+                )
+            
+            count = 0
+            row = None
+            for row in page[:self.chunk_size].iterator(chunk_size=self.chunk_size):
+                count += 1
+                yield row
+            
+            if count < self.chunk_size:
+                return
+            last_key = (row[timestamp_index], row[id_index])
+    
+    def _iter_csv(self):
+        writer = csv.writer(_LineBuffer())
+        yield writer.writerow(self.fields)
+        for row in self.iter_rows():
+            yield writer.writerow([
+                json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+                for value in row
+            ])
+    
+    def _iter_ndjson(self):
+        for row in self.iter_rows():
+            yield json.dumps(dict(zip(self.fields, row)), cls=DjangoJSONEncoder) + '\n'
+    
+    def _iter_text(self):
+        lines = self._iter_csv() if self.output_format == 'csv' else self._iter_ndjson()
+        
+        # Group lines into ~64KB blocks to keep the number of writes low
+        block = []
+        size = 0
+        for line in lines:
+            block.append(line)
+            size += len(line)
+            if size >= 64 * 1024:
+                yield ''.join(block)
+                block = []
+                size = 0
+        if block:
+            yield ''.join(block)
+    
+    def stream(self):
+        """Yield the export as encoded (and optionally gzip-compressed) byte blocks"""
+        if not self.compress:
+            for block in self._iter_text():
+                yield block.encode('utf-8')
+            return
+        
+        # wbits=31: zlib stream with a gzip header and trailer
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for block in self._iter_text():
+            data = compressor.compress(block.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
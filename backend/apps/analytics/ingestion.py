@@ -0,0 +1,168 @@
+# Batched ingestion pipeline for analytics events
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from .models import AnalyticsEvent
+from .serializers import AnalyticsEventSerializer
+from .session_tracking import SessionTracker
+
+logger = logging.getLogger(__name__)
+
+
+class EventIngestionService:
+    """
+    Validate a batch of analytics events in a single pass and persist it with
+    chunked bulk_create, or push it to a Redis buffer that a Celery task
+    flushes in large batches (enabled with ANALYTICS_EVENT_BUFFER_URL).
+    """
+    
+    # Hard cap on events accepted in a single request
+    MAX_BATCH_SIZE = 500
+    
+    # Rows per INSERT statement
+    CHUNK_SIZE = 200
+    
+    # Events drained from the buffer per flush
+    FLUSH_BATCH_SIZE = 5000
+    
+    BUFFER_KEY = 'analytics:event_buffer'
+    
+    _redis_client = None
+    
+    @classmethod
+    def get_buffer(cls):
+        """Return the Redis client used as event buffer, or None when buffering is disabled"""
+        buffer_url = getattr(settings, 'ANALYTICS_EVENT_BUFFER_URL', None)
+        if not buffer_url or not REDIS_AVAILABLE:
+            return None
+        if cls._redis_client is None:
+            cls._redis_client = redis.from_url(buffer_url)
+        return cls._redis_client
+    
+    @classmethod
+    def validate_batch(cls, events_data, defaults=None, user_id=None):
+        """
+        Validate every event with a single serializer instance.
+        Returns (accepted, results): the validated data of the accepted events
+        and one accept/reject entry per input event, in input order.
+        """
+        serializer = AnalyticsEventSerializer()
+        defaults = defaults or {}
+        now = timezone.now()
+        accepted = []
+        results = []
+        
+        for index, event_data in enumerate(events_data):
+            if not isinstance(event_data, dict):
+                results.append({'index': index, 'status': 'rejected', 'errors': {'non_field_errors': ['Expected an object.']}})
+                continue
+            
+            data = {key: value for key, value in event_data.items() if key != 'user'}
+            for key, value in defaults.items():
+                if not data.get(key):
+                    data[key] = value
+            
+            try:
+                validated = serializer.run_validation(data)
+            except ValidationError as e:
+                results.append({'index': index, 'status': 'rejected', 'errors': e.detail})
+                continue
+            
+            # The user always comes from the request, never from the payload
+            validated.pop('user', None)
+            validated['user_id'] = user_id
+            validated.setdefault('timestamp', now)
+            accepted.append(validated)
+            results.append({'index': index, 'status': 'accepted'})
+        
+        return accepted, results
+    
+    @classmethod
+    def write_events(cls, validated_events):
+        """Insert validated events with chunked bulk_create and update their session counters"""
+        if not validated_events:
+            return []
+        events = [AnalyticsEvent(**data) for data in validated_events]
+        events = AnalyticsEvent.objects.bulk_create(events, batch_size=cls.CHUNK_SIZE)
+        SessionTracker.record_events(events)
+        return events
+    
+    @classmethod
+    def buffer_events(cls, validated_events):
+        """Push validated events to the Redis buffer. Returns False if the buffer is unavailable"""
+        client = cls.get_buffer()
+        if client is None or not validated_events:
+            return False
+        
+        payload = [json.dumps(data, cls=DjangoJSONEncoder) for data in validated_events]
+        try:
+            client.rpush(cls.BUFFER_KEY, *payload)
+        except redis.RedisError as e:
+            logger.error(f"Error buffering analytics events, writing directly: {e}")
+            return False
+        return True
+    
+    @classmethod
+    def ingest(cls, events_data, defaults=None, user_id=None):
+        """Validate and store a batch of events, buffering it when possible"""
+        accepted, results = cls.validate_batch(events_data, defaults, user_id)
+        
+        buffered = cls.buffer_events(accepted)
+        created_count = 0 if buffered else len(cls.write_events(accepted))
+        
+        return {
+            'accepted_count': len(accepted),
+            'rejected_count': len(results) - len(accepted),
+            'created_count': created_count,
+            'buffered': buffered,
+            'results': results,
+        }
+    
+    @classmethod
+    def flush_buffer(cls, max_events=None):
+        """Drain up to max_events buffered events into the database. Returns the number written"""
+        client = cls.get_buffer()
+        if client is None:
+            return 0
+        
+        max_events = max_events or cls.FLUSH_BATCH_SIZE
+        
+        # LRANGE + LTRIM in one MULTI so concurrent flushes never read the same events
+        pipe = client.pipeline()
+        pipe.lrange(cls.BUFFER_KEY, 0, max_events - 1)
+        pipe.ltrim(cls.BUFFER_KEY, max_events, -1)
+        raw_events, _ = pipe.execute()
+        if not raw_events:
+            return 0
+        
+        validated_events = []
+        for raw in raw_events:
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                logger.warning("Dropping malformed buffered analytics event")
+                continue
+            data['timestamp'] = parse_datetime(data['timestamp'])
+            validated_events.append(data)
+        
+        try:
+            written = len(cls.write_events(validated_events))
+        except Exception:
+            # Put the batch back so the next flush retries it
+            client.rpush(cls.BUFFER_KEY, *raw_events)
+            raise
+        
+        logger.info(f"Flushed {written} buffered analytics events")
+        return written
@@ -0,0 +1,88 @@
+"""
+Export analytics events or conversions as CSV/NDJSON in constant memory
+"""
+from datetime import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.apps.analytics.exports import AnalyticsExporter, EXPORT_FORMATS, EXPORT_SOURCES
+
+
+class Command(BaseCommand):
+    help = 'Stream analytics events or conversions to a CSV/NDJSON file (optionally gzip-compressed)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            choices=list(EXPORT_SOURCES),
+            help='Data to export'
+        )
+        parser.add_argument(
+            '--format',
+            dest='output_format',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            help='Output format (default: csv)'
+        )
+        parser.add_argument(
+            '--start-date',
+            help='First day to export (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last day to export (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the output with gzip'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=AnalyticsExporter.CHUNK_SIZE,
+            help=f'Rows fetched per query (default: {AnalyticsExporter.CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--output',
+            help='Output file (default: stdout)'
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            start_date = self._parse_date(options['start_date'])
+            end_date = self._parse_date(options['end_date'])
+        except ValueError:
+            raise CommandError('Dates must use the YYYY-MM-DD format')
+        
+        exporter = AnalyticsExporter(
+            options['source'],
+            options['output_format'],
+            start_date=start_date,
+            end_date=end_date,
+            compress=options['gzip'],
+            chunk_size=options['chunk_size']
+        )
+        
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = self._write(exporter, output)
+            self.stderr.write(
+                self.style.SUCCESS(f"Exported {options['source']} to {options['output']} ({written} bytes)")
+            )
+        else:
+            self._write(exporter, sys.stdout.buffer)
+    
+    @staticmethod
+    def _parse_date(value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    
+    @staticmethod
+    def _write(exporter, output):
+        written = 0
+        for block in exporter.stream():
+            output.write(block)
+            written += len(block)
+        output.flush()
+        return written
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def partition_analytics_events(apps, schema_editor):
+    """
+    Rebuild analytics_events as a table range-partitioned by month on
+    PostgreSQL. Other databases (SQLite in development/tests) keep the
+    plain table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'analytics_events'::regclass")
+        if cursor.fetchone():
+            return
+        
+        # Secondary indexes and foreign keys are recreated on the new table
+        # with their original names once the legacy table is dropped
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'analytics_events' "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'analytics_events'::regclass)"
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'analytics_events'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT date_trunc('month', min(timestamp))::date, date_trunc('month', max(timestamp))::date "
+            "FROM analytics_events"
+        )
+        first_month, last_month = cursor.fetchone()
+        
+        cursor.execute('ALTER TABLE analytics_events RENAME TO analytics_events_legacy')
+        cursor.execute(
+            'CREATE TABLE analytics_events (LIKE analytics_events_legacy INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            'PARTITION BY RANGE ("timestamp")'
+        )
+        # The partition key must be part of the primary key
+        cursor.execute('ALTER TABLE analytics_events ADD PRIMARY KEY (id, "timestamp")')
+        cursor.execute('CREATE TABLE analytics_events_default PARTITION OF analytics_events DEFAULT')
+        
+        # One partition per month with data, plus the next three months
+        cursor.execute(
+            "SELECT month::date FROM generate_series("
+            "COALESCE(%s, date_trunc('month', now())::date), "
+            "date_trunc('month', now())::date + interval '3 months', interval '1 month') AS month",
+            [first_month]
+        )
+        for (month,) in cursor.fetchall():
+            cursor.execute(
+                f'CREATE TABLE "analytics_events_y{month.year}m{month.month:02d}" PARTITION OF analytics_events '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month.isoformat()}'::date + interval '1 month')"
+            )
+        
+        cursor.execute('INSERT INTO analytics_events SELECT * FROM analytics_events_legacy')
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('analytics_events', 'id'), "
+            "COALESCE((SELECT max(id) FROM analytics_events), 0) + 1, false)"
+        )
+        cursor.execute('DROP TABLE analytics_events_legacy')
+        
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE analytics_events ADD CONSTRAINT "{name}" {definition}')
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+    
+    operations = [
+        migrations.AlterField(
+            model_name='conversionevent',
+            name='analytics_event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='conversions', to='analytics.analyticsevent'),
+        ),
+        migrations.RunPython(partition_analytics_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:58
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_activity(apps, schema_editor):
+    """Existing sessions: last activity is their end (or start) time"""
+    UserSession = apps.get_model('analytics', 'UserSession')
+    UserSession.objects.update(last_activity=Coalesce('end_time', 'start_time'))
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('analytics', '0002_analytics_events_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['session_id'], name='analytics_event_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['end_time', 'last_activity'], name='analytics_session_idle_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def utc_midnight(day):
+    """Local midnight (TIME_ZONE) of a day as a UTC timestamp literal"""
+    return timezone.make_aware(datetime.combine(day, time.min)).astimezone(dt_timezone.utc).isoformat(sep=' ')
+
+
+def realign_event_partitions(apps, schema_editor):
+    """
+    0002 declared the monthly partitions with naive date literals, which
+    PostgreSQL reads in the connection time zone (UTC). Retention archives
+    local-time months (TIME_ZONE), so the last hours of a month sat in a
+    partition that was dropped without being exported. Rebuild every
+    monthly partition with tz-aware bounds and move the rows into them.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'analytics_events'::regclass")
+        if not cursor.fetchone():
+            return
+        
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = 'analytics_events'::regclass"
+        )
+        old_partitions = sorted(
+            row[0] for row in cursor.fetchall() if row[0].startswith('analytics_events_y')
+        )
+        
+        # Rows are moved out of the old partitions (and the default one, which
+        # may hold rows of the new ranges) and routed again once the new
+        # partitions exist
+        cursor.execute('CREATE TEMPORARY TABLE analytics_events_realign (LIKE analytics_events) ON COMMIT DROP')
+        for name in old_partitions:
+            cursor.execute(f'ALTER TABLE analytics_events DETACH PARTITION "{name}"')
+            cursor.execute(f'INSERT INTO analytics_events_realign SELECT * FROM "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        cursor.execute('INSERT INTO analytics_events_realign SELECT * FROM analytics_events_default')
+        cursor.execute('DELETE FROM analytics_events_default')
+        
+        # Same months as before, plus the next three months
+        months = [
+            datetime.strptime(name[-7:], 'y%Ym%m').date() for name in old_partitions
+        ]
+        last_month = month_start(timezone.localdate())
+        for _ in range(3):
+            last_month = next_month(last_month)
+        month = min(months + [month_start(timezone.localdate())])
+        while month <= last_month:
+            cursor.execute(
+                f'CREATE TABLE "analytics_events_y{month.year}m{month.month:02d}" PARTITION OF analytics_events '
+                f"FOR VALUES FROM ('{utc_midnight(month)}') TO ('{utc_midnight(next_month(month))}')"
+            )
+            month = next_month(month)
+        
+        cursor.execute('INSERT INTO analytics_events SELECT * FROM analytics_events_realign')
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('analytics', '0003_session_counters'),
+    ]
+    
+    operations = [
+        migrations.RunPython(realign_event_partitions, migrations.RunPython.noop),
+    ]
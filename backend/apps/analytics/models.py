@@ -49,6 +49,7 @@ class AnalyticsEvent(models.Model):
             models.Index(fields=['event_name', 'timestamp']),
             models.Index(fields=['user', 'timestamp']),
             models.Index(fields=['timestamp']),
+            models.Index(fields=['session_id'], name='analytics_event_session_idx'),
         ]
         ordering = ['-timestamp']
     
@@ -73,7 +74,14 @@ class ConversionEvent(models.Model):
     
     # Related objects
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True)
-    analytics_event = models.ForeignKey(AnalyticsEvent, on_delete=models.CASCADE, related_name='conversions')
+    # No database-level FK: analytics_events is range-partitioned by month on PostgreSQL
+    # (its primary key includes the timestamp) and old partitions are dropped by retention
+    analytics_event = models.ForeignKey(
+        AnalyticsEvent,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='conversions'
+    )
     
     # Conversion context
     source = models.CharField(max_length=100, blank=True, null=True)  # Where the conversion came from
@@ -108,6 +116,7 @@ class UserSession(models.Model):
     end_time = models.DateTimeField(blank=True, null=True)
     duration = models.DurationField(blank=True, null=True)
     page_views = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(default=timezone.now)  # Updated as events are ingested
     
     # User context
     user_agent = models.TextField(blank=True, null=True)
@@ -135,6 +144,7 @@ class UserSession(models.Model):
             models.Index(fields=['start_time']),
             models.Index(fields=['user']),
             models.Index(fields=['is_converted']),
+            models.Index(fields=['end_time', 'last_activity'], name='analytics_session_idle_idx'),
         ]
         ordering = ['-start_time']
     
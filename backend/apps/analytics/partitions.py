@@ -0,0 +1,215 @@
+# Monthly partitions and retention for the analytics_events table
+import logging
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .exports import AnalyticsExporter
+from .models import AnalyticsEvent
+from .reports import date_range_bounds
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+class AnalyticsPartitionManager:
+    """
+    Manage the monthly range partitions of analytics_events on PostgreSQL
+    and apply the retention horizon: months older than
+    ANALYTICS_RETENTION_MONTHS are archived to gzip NDJSON files and then
+    dropped. On other databases (SQLite in tests) the table is not
+    partitioned and retention deletes the archived rows in batches.
+    """
+    
+    TABLE = AnalyticsEvent._meta.db_table
+    
+    # Partitions created ahead of time so inserts never land in the default partition
+    MONTHS_AHEAD = 3
+    
+    DELETE_BATCH_SIZE = 5000
+    
+    @classmethod
+    def is_partitioned(cls):
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+                [cls.TABLE]
+            )
+            return cursor.fetchone() is not None
+    
+    @classmethod
+    def partition_name(cls, month):
+        return f"{cls.TABLE}_y{month.year}m{month.month:02d}"
+    
+    @classmethod
+    def partition_month(cls, name):
+        """Month of a partition from its name (inverse of partition_name)"""
+        return datetime.strptime(name[len(cls.TABLE) + 1:], 'y%Ym%m').date()
+    
+    @classmethod
+    def partition_bounds(cls, month):
+        """
+        [from, to) of a month as UTC timestamp literals. They are the same
+        local-time month bounds the archive export uses (date_range_bounds),
+        so archiving a month covers exactly the partition that is dropped.
+        """
+        bounds = date_range_bounds('timestamp', month, next_month(month) - timedelta(days=1))
+        return tuple(
+            bounds[key].astimezone(dt_timezone.utc).isoformat(sep=' ')
+            for key in ('timestamp__gte', 'timestamp__lt')
+        )
+    
+    @classmethod
+    def create_partition(cls, month):
+        """Create the partition of a month if it does not exist yet"""
+        month = month_start(month)
+        name = cls.partition_name(month)
+        lower, upper = cls.partition_bounds(month)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{cls.TABLE}" '
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        return name
+    
+    @classmethod
+    def ensure_partitions(cls, today=None):
+        """Create the partitions of the current month and MONTHS_AHEAD following months"""
+        if not cls.is_partitioned():
+            return []
+        
+        month = month_start(today or timezone.localdate())
+        created = []
+        for _ in range(cls.MONTHS_AHEAD + 1):
+            created.append(cls.create_partition(month))
+            month = next_month(month)
+        return created
+    
+    @classmethod
+    def list_partitions(cls):
+        """Names of the monthly partitions currently attached to the table"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = %s::regclass",
+                [cls.TABLE]
+            )
+            return sorted(
+                row[0] for row in cursor.fetchall()
+                if row[0].startswith(f"{cls.TABLE}_y")
+            )
+    
+    @classmethod
+    def retention_cutoff(cls, today=None):
+        """First month that is kept: everything before it is archived"""
+        months = getattr(settings, 'ANALYTICS_RETENTION_MONTHS', 13)
+        cutoff = month_start(today or timezone.localdate())
+        for _ in range(months):
+            cutoff = month_start(cutoff - timedelta(days=1))
+        return cutoff
+    
+    @classmethod
+    def archive_month(cls, month, archive_dir=None):
+        """Write every event of a month to a gzip NDJSON file. Returns the file path"""
+        archive_dir = archive_dir or settings.ANALYTICS_ARCHIVE_DIR
+        os.makedirs(archive_dir, exist_ok=True)
+        
+        path = os.path.join(archive_dir, f"{cls.partition_name(month)}.ndjson.gz")
+        exporter = AnalyticsExporter(
+            'events',
+            'ndjson',
+            start_date=month,
+            end_date=next_month(month) - timedelta(days=1),
+            compress=True
+        )
+        with open(path, 'wb') as archive:
+            for block in exporter.stream():
+                archive.write(block)
+        return path
+    
+    @classmethod
+    def _oldest_month(cls):
+        oldest = AnalyticsEvent.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+        return month_start(timezone.localtime(oldest).date()) if oldest else None
+    
+    @classmethod
+    def apply_retention(cls, today=None, archive=True, archive_dir=None):
+        """
+        Archive (optionally) and remove every month older than the retention
+        horizon, then drop the old partitions left empty (months without
+        events). Returns the list of months removed.
+        """
+        cutoff = cls.retention_cutoff(today)
+        month = cls._oldest_month()
+        removed = []
+        
+        while month is not None and month < cutoff:
+            if archive:
+                path = cls.archive_month(month, archive_dir)
+                logger.info(f"Archived analytics events of {month:%Y-%m} to {path}")
+            cls._drop_month(month)
+            removed.append(month)
+            month = next_month(month)
+        
+        cls._drop_empty_partitions(cutoff)
+        return removed
+    
+    @classmethod
+    def _drop_empty_partitions(cls, cutoff):
+        """Detach and drop the empty partitions of months before the cutoff"""
+        if not cls.is_partitioned():
+            return []
+        
+        dropped = []
+        for name in cls.list_partitions():
+            if cls.partition_month(name) < cutoff and not cls._partition_has_rows(name):
+                cls._drop_partition(name)
+                dropped.append(name)
+        if dropped:
+            logger.info(f"Dropped {len(dropped)} empty analytics partitions before {cutoff:%Y-%m}")
+        return dropped
+    
+    @classmethod
+    def _partition_has_rows(cls, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT 1 FROM "{name}" LIMIT 1')
+            return cursor.fetchone() is not None
+    
+    @classmethod
+    def _drop_partition(cls, name):
+        # Dropping a partition is O(1) and leaves nothing to vacuum
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{cls.TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+    
+    @classmethod
+    def _drop_month(cls, month):
+        if cls.is_partitioned():
+            name = cls.partition_name(month)
+            if name in cls.list_partitions():
+                cls._drop_partition(name)
+                return
+        
+        # Rows outside a monthly partition (default partition or no partitioning)
+        bounds = date_range_bounds('timestamp', month, next_month(month) - timedelta(days=1))
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    AnalyticsEvent.objects.filter(**bounds).values_list('id', flat=True)[:cls.DELETE_BATCH_SIZE]
+                )
+                if not ids:
+                    break
+                AnalyticsEvent.objects.filter(id__in=ids).delete()
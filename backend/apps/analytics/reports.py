@@ -0,0 +1,149 @@
+# Grouped time-series report queries for Orta Novias analytics
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Count, DateField, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import AnalyticsEvent, ConversionEvent, UserSession
+
+
+# Source table of each metric: (model, timestamp field, aggregate)
+SOURCE_METRICS = {
+    'sessions': (UserSession, 'start_time', {
+        'daily_visitors': Count('id'),
+        'bounce_rate': Avg('bounce_rate'),
+        'avg_session_duration': Avg('duration'),
+    }),
+    'events': (AnalyticsEvent, 'timestamp', {
+        'daily_page_views': Count('id', filter=Q(event_category='page_view')),
+    }),
+    'conversions': (ConversionEvent, 'timestamp', {
+        'daily_conversions': Count('id'),
+        'daily_revenue': Sum('conversion_value'),
+    }),
+}
+
+# Metrics derived from other metrics once the grouped rows are merged
+DERIVED_METRICS = {
+    'conversion_rate': ('daily_conversions', 'daily_visitors'),
+}
+
+TRUNC_FUNCTIONS = {
+    'day': TruncDate,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+def date_range_bounds(field, start_date=None, end_date=None):
+    """
+    Filter kwargs selecting the days between start_date and end_date (inclusive)
+    as half-open datetime bounds, so the timestamp index is usable
+    (unlike field__date__range, which wraps the column in a date cast).
+    """
+    bounds = {}
+    if start_date:
+        bounds[f'{field}__gte'] = timezone.make_aware(datetime.combine(start_date, time.min))
+    if end_date:
+        bounds[f'{field}__lt'] = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return bounds
+
+
+SUPPORTED_METRICS = tuple(
+    metric for _, _, aggregates in SOURCE_METRICS.values() for metric in aggregates
+) + tuple(DERIVED_METRICS)
+
+
+class TimeSeriesReport:
+    """
+    Build grouped time-series aggregates (by day, week or month) issuing at
+    most one GROUP BY query per source table, whatever the date range.
+    """
+    
+    def __init__(self, start_date, end_date, metric_types, group_by='day'):
+        if group_by not in TRUNC_FUNCTIONS:
+            raise ValueError(f"Unsupported group_by: {group_by}")
+        unsupported = set(metric_types) - set(SUPPORTED_METRICS)
+        if unsupported:
+            raise ValueError(f"Unsupported metric types: {', '.join(sorted(unsupported))}")
+        
+        self.start_date = start_date
+        self.end_date = end_date
+        self.metric_types = list(metric_types)
+        self.group_by = group_by
+    
+    @staticmethod
+    def period_start(day, group_by):
+        """First day of the period that contains a date"""
+        if group_by == 'week':
+            return day - timedelta(days=day.weekday())
+        if group_by == 'month':
+            return day.replace(day=1)
+        return day
+    
+    def periods(self):
+        """Every period between start_date and end_date, in order"""
+        periods = []
+        current = self.period_start(self.start_date, self.group_by)
+        while current <= self.end_date:
+            periods.append(current)
+            if self.group_by == 'month':
+                current = (current + timedelta(days=32)).replace(day=1)
+            else:
+                current += timedelta(days=7 if self.group_by == 'week' else 1)
+        return periods
+    
+    def _required_metrics(self):
+        required = set()
+        for metric in self.metric_types:
+            required.update(DERIVED_METRICS.get(metric, (metric,)))
+        return required
+    
+    def _query_source(self, model, timestamp_field, aggregates):
+        """One GROUP BY query over a source table with sargable timestamp bounds"""
+        trunc = TRUNC_FUNCTIONS[self.group_by](timestamp_field, output_field=DateField())
+        
+        rows = model.objects.filter(
+            **date_range_bounds(timestamp_field, self.start_date, self.end_date)
+        ).annotate(period=trunc).values('period').annotate(**aggregates).order_by()
+        
+        return {row.pop('period'): row for row in rows}
+    
+    def run(self):
+        """Return one dict per period with the requested metrics"""
+        required = self._required_metrics()
+        values_by_period = {}
+        
+        for model, timestamp_field, aggregates in SOURCE_METRICS.values():
+            requested = {name: agg for name, agg in aggregates.items() if name in required}
+            if not requested:
+                continue
+            for period, values in self._query_source(model, timestamp_field, requested).items():
+                if isinstance(period, datetime):
+                    period = period.date()
+                values_by_period.setdefault(period, {}).update(values)
+        
+        series = []
+        for period in self.periods():
+            values = values_by_period.get(period, {})
+            row = {'period': period}
+            for metric in self.metric_types:
+                if metric in DERIVED_METRICS:
+                    numerator, denominator = DERIVED_METRICS[metric]
+                    denominator_value = values.get(denominator) or 0
+                    row[metric] = ((values.get(numerator) or 0) / denominator_value * 100) if denominator_value else 0
+                else:
+                    row[metric] = self._normalize(values.get(metric))
+            series.append(row)
+        
+        return series
+    
+    @staticmethod
+    def _normalize(value):
+        if value is None:
+            return 0
+        if isinstance(value, timedelta):
+            return value.total_seconds()
+        if isinstance(value, (int, float)):
+            return value
+        return float(value)
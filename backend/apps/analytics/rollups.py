@@ -0,0 +1,156 @@
+# Daily rollups of business metrics for Orta Novias analytics
+import logging
+from datetime import timedelta
+
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import AnalyticsEvent, ConversionEvent, UserSession, BusinessMetrics
+from .reports import TimeSeriesReport
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRollupService:
+    """
+    Pre-aggregate daily metrics into BusinessMetrics so reports read one row
+    per day and metric instead of scanning the raw event tables. Only the
+    current day is computed live.
+    """
+    
+    PERIOD_TYPE = 'daily'
+    
+    ROLLUP_METRICS = (
+        'daily_visitors',
+        'daily_page_views',
+        'daily_conversions',
+        'daily_revenue',
+        'conversion_rate',
+    )
+    
+    # Days re-aggregated on every run to pick up late events
+    LATE_EVENT_DAYS = 1
+    
+    @classmethod
+    def compute_range(cls, start_date, end_date):
+        """
+        Compute the rollup metrics of every day in a range from the raw
+        tables (one grouped query per source table). Returns {day: metrics}.
+        """
+        report = TimeSeriesReport(start_date, end_date, cls.ROLLUP_METRICS, group_by='day')
+        return {row.pop('period'): row for row in report.run()}
+    
+    @classmethod
+    def compute_day(cls, day):
+        """Compute the rollup metrics of a single day from the raw tables"""
+        return cls.compute_range(day, day)[day]
+    
+    @classmethod
+    def rollup_range(cls, start_date, end_date):
+        """Compute and upsert the rollup rows of a range of days (one INSERT ... ON CONFLICT per chunk)"""
+        metrics_by_day = cls.compute_range(start_date, end_date)
+        BusinessMetrics.objects.bulk_create(
+            [
+                BusinessMetrics(
+                    metric_type=metric_type,
+                    metric_value=value,
+                    date=day,
+                    period_type=cls.PERIOD_TYPE,
+                )
+                for day, metrics in metrics_by_day.items()
+                for metric_type, value in metrics.items()
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['metric_type', 'date', 'period_type'],
+            update_fields=['metric_value', 'updated_at'],
+        )
+        return metrics_by_day
+    
+    @classmethod
+    def rollup_day(cls, day):
+        """Compute and upsert the rollup rows of a day"""
+        return cls.rollup_range(day, day)[day]
+    
+    @classmethod
+    def rollup_pending(cls, today=None):
+        """
+        Incrementally fill the rollups up to yesterday, starting after the
+        last rolled-up day (re-aggregating LATE_EVENT_DAYS for late events).
+        Returns the number of days rolled up.
+        """
+        today = today or timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        
+        last_rolled = BusinessMetrics.objects.filter(
+            metric_type=cls.ROLLUP_METRICS[0],
+            period_type=cls.PERIOD_TYPE
+        ).aggregate(last=Max('date'))['last']
+        
+        if last_rolled:
+            start = min(last_rolled + timedelta(days=1), today - timedelta(days=cls.LATE_EVENT_DAYS))
+        else:
+            start = cls._first_activity_date()
+            if start is None:
+                return 0
+        
+        if start > yesterday:
+            return 0
+        
+        cls.rollup_range(start, yesterday)
+        
+        days = (yesterday - start).days + 1
+        logger.info(f"Rolled up business metrics for {days} days")
+        return days
+    
+    @staticmethod
+    def _first_activity_date():
+        first_dates = [
+            UserSession.objects.aggregate(first=Min('start_time'))['first'],
+            AnalyticsEvent.objects.aggregate(first=Min('timestamp'))['first'],
+            ConversionEvent.objects.aggregate(first=Min('timestamp'))['first'],
+        ]
+        first_dates = [timezone.localtime(value).date() for value in first_dates if value]
+        return min(first_dates) if first_dates else None
+    
+    @classmethod
+    def get_daily_series(cls, start_date, end_date):
+        """
+        Daily metrics between two dates (inclusive): past days come from the
+        rollups in a single query, missing past days are computed on the fly
+        without persisting them (the beat task owns the writes) and today is
+        always computed live.
+        """
+        today = timezone.localdate()
+        
+        rows = BusinessMetrics.objects.filter(
+            metric_type__in=cls.ROLLUP_METRICS,
+            period_type=cls.PERIOD_TYPE,
+            date__range=[start_date, min(end_date, today - timedelta(days=1))]
+        ).values_list('date', 'metric_type', 'metric_value')
+        
+        by_day = {}
+        for day, metric_type, value in rows:
+            by_day.setdefault(day, {})[metric_type] = value
+        
+        # Past days without rollups are aggregated together in a single
+        # read-only pass; rollup_pending persists them on its next run
+        missing = [
+            start_date + timedelta(days=offset)
+            for offset in range((min(end_date, today - timedelta(days=1)) - start_date).days + 1)
+            if len(by_day.get(start_date + timedelta(days=offset), {})) < len(cls.ROLLUP_METRICS)
+        ]
+        if missing:
+            by_day.update(cls.compute_range(missing[0], missing[-1]))
+        
+        if start_date <= today <= end_date:
+            by_day[today] = cls.compute_day(today)
+        
+        empty = dict.fromkeys(cls.ROLLUP_METRICS, 0)
+        series = []
+        current_date = start_date
+        while current_date <= end_date:
+            series.append({'date': current_date, **by_day.get(current_date, empty)})
+            current_date += timedelta(days=1)
+        
+        return series
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import AnalyticsEvent, ConversionEvent, UserSession, BusinessMetrics
+from .reports import SUPPORTED_METRICS
 
 class AnalyticsEventSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,7 +18,7 @@ class UserSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserSession
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at', 'last_activity')
 
 class BusinessMetricsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,3 +39,17 @@ class AnalyticsReportSerializer(serializers.Serializer):
         choices=['day', 'week', 'month'],
         default='day'
     )
+    
+    def validate_metric_types(self, value):
+        unsupported = [metric for metric in value if metric not in SUPPORTED_METRICS]
+        if unsupported:
+            raise serializers.ValidationError(
+                f"Unsupported metric types: {', '.join(unsupported)}. "
+                f"Available: {', '.join(SUPPORTED_METRICS)}"
+            )
+        return value
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError('start_date must be before end_date')
+        return data
@@ -0,0 +1,89 @@
+# Incremental session counters for Orta Novias analytics
+import logging
+from datetime import timedelta
+
+from django.db.models import Case, DurationField, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import AnalyticsEvent, UserSession
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTracker:
+    """
+    Keep UserSession counters (page views, last activity, first conversion)
+    up to date as events are ingested, with atomic F() updates, so ending a
+    session never has to rescan the events table.
+    """
+    
+    # Sessions without activity for this long are closed by the sweeper
+    IDLE_TIMEOUT = timedelta(minutes=30)
+    
+    @classmethod
+    def record_events(cls, events):
+        """Apply a batch of ingested events to their sessions (one UPDATE per session)"""
+        activity = {}
+        for event in events:
+            if not event.session_id:
+                continue
+            page_views, last_activity = activity.get(event.session_id, (0, event.timestamp))
+            activity[event.session_id] = (
+                page_views + (1 if event.event_category == 'page_view' else 0),
+                max(last_activity, event.timestamp),
+            )
+        
+        for session_id, (page_views, last_activity) in activity.items():
+            UserSession.objects.filter(session_id=session_id).update(
+                page_views=F('page_views') + page_views,
+                last_activity=Greatest('last_activity', Value(last_activity)),
+            )
+    
+    @staticmethod
+    def record_conversion(conversion):
+        """Flag the session of a conversion as converted, keeping its first conversion type"""
+        if not conversion.analytics_event_id:
+            return
+        try:
+            session_id = conversion.analytics_event.session_id
+        except AnalyticsEvent.DoesNotExist:
+            # The event's month was archived and dropped by retention
+            # (the foreign key has no database constraint)
+            return
+        if not session_id:
+            return
+        UserSession.objects.filter(session_id=session_id, is_converted=False).update(
+            is_converted=True,
+            conversion_type=conversion.conversion_type,
+        )
+    
+    @staticmethod
+    def close(session, end_time=None):
+        """End a session from its counters: no query over the events"""
+        session.end_time = end_time or timezone.now()
+        session.duration = session.end_time - session.start_time
+        session.bounce_rate = 1.0 if session.page_views <= 1 else 0.0
+        session.save(update_fields=['end_time', 'duration', 'bounce_rate', 'updated_at'])
+        return session
+    
+    @classmethod
+    def close_idle_sessions(cls, now=None):
+        """Close every session idle for longer than IDLE_TIMEOUT in a single UPDATE"""
+        cutoff = (now or timezone.now()) - cls.IDLE_TIMEOUT
+        closed = UserSession.objects.filter(
+            end_time__isnull=True,
+            last_activity__lt=cutoff
+        ).update(
+            end_time=F('last_activity'),
+            duration=ExpressionWrapper(F('last_activity') - F('start_time'), output_field=DurationField()),
+            bounce_rate=Case(
+                When(page_views__lte=1, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField()
+            ),
+            updated_at=timezone.now(),
+        )
+        if closed:
+            logger.info(f"Closed {closed} idle analytics sessions")
+        return closed
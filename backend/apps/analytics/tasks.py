@@ -0,0 +1,53 @@
+# Celery tasks for Orta Novias analytics
+from celery import shared_task
+import logging
+
+from .ingestion import EventIngestionService
+from .rollups import MetricsRollupService
+from .partitions import AnalyticsPartitionManager
+from .session_tracking import SessionTracker
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def flush_analytics_events(self):
+    """Flush buffered analytics events to the database in large batches"""
+    try:
+        return EventIngestionService.flush_buffer()
+    except Exception as exc:
+        logger.error(f"Error flushing analytics events: {exc}")
+        raise self.retry(exc=exc, countdown=30)
+
+
+@shared_task(bind=True, max_retries=3)
+def rollup_business_metrics(self):
+    """Incrementally fill the daily BusinessMetrics rollups up to yesterday"""
+    try:
+        return MetricsRollupService.rollup_pending()
+    except Exception as exc:
+        logger.error(f"Error rolling up business metrics: {exc}")
+        raise self.retry(exc=exc, countdown=300)
+
+
+@shared_task(bind=True)
+def maintain_analytics_partitions(self):
+    """Create upcoming monthly partitions and archive/drop months past the retention horizon"""
+    try:
+        created = AnalyticsPartitionManager.ensure_partitions()
+        removed = AnalyticsPartitionManager.apply_retention()
+        logger.info(f"Analytics partitions ensured: {len(created)}, months archived: {len(removed)}")
+        return [month.isoformat() for month in removed]
+    except Exception as exc:
+        logger.error(f"Error maintaining analytics partitions: {exc}")
+        raise
+
+
+@shared_task(bind=True)
+def close_idle_sessions(self):
+    """Close abandoned sessions (no activity for SessionTracker.IDLE_TIMEOUT) in bulk"""
+    try:
+        return SessionTracker.close_idle_sessions()
+    except Exception as exc:
+        logger.error(f"Error closing idle sessions: {exc}")
+        raise
@@ -0,0 +1,434 @@
+"""
+Tests for the analytics app
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from backend.apps.analytics.models import AnalyticsEvent, ConversionEvent, UserSession, BusinessMetrics
+from backend.apps.analytics.ingestion import EventIngestionService
+from backend.apps.analytics.rollups import MetricsRollupService
+from backend.apps.analytics.exports import AnalyticsExporter
+from backend.apps.analytics.partitions import AnalyticsPartitionManager
+from backend.apps.analytics.session_tracking import SessionTracker
+from backend.apps.analytics.views import AnalyticsReportViewSet
+
+User = get_user_model()
+
+
+class AnalyticsIngestionTest(APITestCase):
+    """Tests for batched event ingestion"""
+    
+    def _event(self, **overrides):
+        event = {
+            'event_name': 'dress_view',
+            'event_category': 'user_interaction',
+            'page_url': 'https://ortanovias.com/vestidos',
+            'session_id': 'session-1',
+        }
+        event.update(overrides)
+        return event
+    
+    def test_bulk_create_per_event_results(self):
+        """Valid events are stored, invalid ones are reported by index"""
+        url = reverse('analyticsevent-bulk-create')
+        events = [
+            self._event(),
+            self._event(event_category='unknown'),
+            self._event(event_name='page_view', event_category='page_view'),
+            'not-an-event',
+        ]
+        
+        response = self.client.post(url, {'events': events}, format='json', HTTP_USER_AGENT='TestAgent')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['accepted_count'], 2)
+        self.assertEqual(response.data['rejected_count'], 2)
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['accepted', 'rejected', 'accepted', 'rejected']
+        )
+        self.assertIn('event_category', response.data['results'][1]['errors'])
+        
+        self.assertEqual(AnalyticsEvent.objects.count(), 2)
+        event = AnalyticsEvent.objects.first()
+        self.assertEqual(event.user_agent, 'TestAgent')
+        self.assertEqual(event.ip_address, '127.0.0.1')
+    
+    def test_bulk_create_uses_batched_insert(self):
+        """The whole batch is written with a single INSERT (plus one session counter UPDATE)"""
+        url = reverse('analyticsevent-bulk-create')
+        events = [self._event(event_label=f'dress-{i}') for i in range(40)]
+        
+        with self.assertNumQueries(2):
+            response = self.client.post(url, {'events': events}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AnalyticsEvent.objects.count(), 40)
+    
+    def test_bulk_create_rejects_oversized_batch(self):
+        """Batches over the limit are rejected without writing"""
+        url = reverse('analyticsevent-bulk-create')
+        events = [self._event()] * (EventIngestionService.MAX_BATCH_SIZE + 1)
+        
+        response = self.client.post(url, {'events': events}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(AnalyticsEvent.objects.count(), 0)
+
+
+class MetricsRollupTest(APITestCase):
+    """Tests for the daily business metrics rollups"""
+    
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        yesterday_noon = timezone.make_aware(datetime.combine(self.yesterday, time(12, 0)))
+        
+        for i in range(4):
+            UserSession.objects.create(session_id=f'session-{i}', start_time=yesterday_noon)
+        event = AnalyticsEvent.objects.create(
+            event_name='appointment_form',
+            event_category='conversion',
+            page_url='https://ortanovias.com/citas',
+            timestamp=yesterday_noon
+        )
+        ConversionEvent.objects.create(
+            conversion_type='appointment_scheduled',
+            conversion_value=Decimal('50.00'),
+            analytics_event=event,
+            timestamp=yesterday_noon
+        )
+    
+    def test_rollup_pending_fills_past_days(self):
+        """The task fills every day up to yesterday and is idempotent"""
+        self.assertEqual(MetricsRollupService.rollup_pending(self.today), 1)
+        MetricsRollupService.rollup_pending(self.today)
+        
+        metrics = dict(
+            BusinessMetrics.objects.filter(date=self.yesterday).values_list('metric_type', 'metric_value')
+        )
+        self.assertEqual(metrics['daily_visitors'], 4)
+        self.assertEqual(metrics['daily_conversions'], 1)
+        self.assertEqual(metrics['daily_revenue'], 50.0)
+        self.assertEqual(metrics['conversion_rate'], 25.0)
+        self.assertEqual(BusinessMetrics.objects.count(), len(MetricsRollupService.ROLLUP_METRICS))
+    
+    def test_dashboard_query_count_independent_of_range(self):
+        """Once rolled up, the dashboard cost does not grow with the date range"""
+        url = reverse('analytics-reports-dashboard')
+        start = self.today - timedelta(days=365)
+        day = start
+        while day < self.today:
+            MetricsRollupService.rollup_day(day)
+            day += timedelta(days=1)
+        
+        with CaptureQueriesContext(connection) as short_range:
+            response = self.client.get(url, {'start_date': self.yesterday.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_visitors'], 4)
+        
+        with CaptureQueriesContext(connection) as long_range:
+            response = self.client.get(url, {'start_date': start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['daily_trends']), 366)
+        self.assertEqual(response.data['summary']['total_conversions'], 1)
+        self.assertEqual(len(long_range.captured_queries), len(short_range.captured_queries))
+    
+    def test_dashboard_does_not_persist_rollups(self):
+        """Missing days are computed read-only; only the beat task writes rollups"""
+        url = reverse('analytics-reports-dashboard')
+        response = self.client.get(url, {'start_date': self.yesterday.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['total_visitors'], 4)
+        self.assertFalse(BusinessMetrics.objects.exists())
+    
+    def test_dashboard_rejects_invalid_ranges(self):
+        """Malformed, reversed and oversized ranges are rejected with 400"""
+        url = reverse('analytics-reports-dashboard')
+        too_long = self.today - timedelta(days=AnalyticsReportViewSet.MAX_DASHBOARD_DAYS)
+        for params in (
+            {'start_date': 'not-a-date'},
+            {'start_date': self.today.isoformat(), 'end_date': self.yesterday.isoformat()},
+            {'start_date': too_long.isoformat()},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BusinessMetrics.objects.exists())
+
+
+class AnalyticsReportTest(APITestCase):
+    """Tests for the grouped time-series reports"""
+    
+    def setUp(self):
+        self.start = date(2025, 3, 3)  # Lunes
+        for offset, sessions in ((0, 2), (1, 3), (8, 5)):
+            moment = timezone.make_aware(datetime.combine(self.start + timedelta(days=offset), time(10, 0)))
+            for i in range(sessions):
+                UserSession.objects.create(session_id=f'{offset}-{i}', start_time=moment)
+            event = AnalyticsEvent.objects.create(
+                event_name='page_view',
+                event_category='page_view',
+                page_url='https://ortanovias.com/',
+                timestamp=moment
+            )
+            ConversionEvent.objects.create(
+                conversion_type='dress_inquiry',
+                conversion_value=Decimal('10.00'),
+                analytics_event=event,
+                timestamp=moment
+            )
+    
+    def test_report_grouped_by_week(self):
+        """Weekly buckets with one query per source table"""
+        url = reverse('analytics-reports-report')
+        params = {
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=13)).isoformat(),
+            'group_by': 'week',
+            'metric_types': 'daily_visitors,daily_conversions,daily_revenue,conversion_rate',
+        }
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['series'], [
+            {'period': '2025-03-03', 'daily_visitors': 5, 'daily_conversions': 2, 'daily_revenue': 20.0, 'conversion_rate': 40.0},
+            {'period': '2025-03-10', 'daily_visitors': 5, 'daily_conversions': 1, 'daily_revenue': 10.0, 'conversion_rate': 20.0},
+        ])
+    
+    def test_report_daily_fills_empty_days(self):
+        """Days without activity are returned with zero values"""
+        url = reverse('analytics-reports-report')
+        response = self.client.get(url, {
+            'start_date': self.start.isoformat(),
+            'end_date': (self.start + timedelta(days=2)).isoformat(),
+            'metric_types': ['daily_page_views'],
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['daily_page_views'] for row in response.data['series']], [1, 1, 0])
+    
+    def test_report_rejects_unknown_metric(self):
+        """Unsupported metrics are a validation error"""
+        url = reverse('analytics-reports-report')
+        response = self.client.get(url, {
+            'start_date': self.start.isoformat(),
+            'end_date': self.start.isoformat(),
+            'metric_types': 'popular_pages',
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AnalyticsExportTest(APITestCase):
+    """Tests for the streaming exports"""
+    
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass')
+        moment = timezone.make_aware(datetime(2025, 3, 3, 10, 0))
+        # Several events share a timestamp to exercise the id tie-breaker
+        for i in range(7):
+            AnalyticsEvent.objects.create(
+                event_name=f'event-{i}',
+                event_category='page_view',
+                page_url='https://ortanovias.com/',
+                custom_parameters={'position': i},
+                timestamp=moment + timedelta(minutes=i // 3)
+            )
+    
+    def test_keyset_pagination_visits_every_row_once(self):
+        """Pages resume after the last (timestamp, id) without gaps or duplicates"""
+        exporter = AnalyticsExporter('events', 'ndjson', chunk_size=2)
+        rows = [json.loads(line) for line in b''.join(exporter.stream()).decode().splitlines()]
+        
+        self.assertEqual([row['event_name'] for row in rows], [f'event-{i}' for i in range(7)])
+        self.assertEqual(rows[0]['custom_parameters'], {'position': 0})
+    
+    def test_export_endpoint_streams_gzip_csv(self):
+        """The endpoint streams a gzip-compressed CSV to admins only"""
+        url = reverse('analytics-reports-export')
+        params = {'source': 'events', 'output': 'csv', 'gzip': '1', 'end_date': '2025-03-03'}
+        
+        response = self.client.get(url, params)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url, params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('events.csv.gz', response['Content-Disposition'])
+        lines = list(csv.reader(io.StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual(lines[0][:3], ['id', 'timestamp', 'event_name'])
+        self.assertEqual(len(lines), 8)
+    
+    def test_export_command(self):
+        """The management command writes the same export to a file"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'events.ndjson')
+            call_command('export_analytics', 'events', '--format', 'ndjson', '--output', path, stderr=io.StringIO())
+            with open(path) as export_file:
+                self.assertEqual(len(export_file.readlines()), 7)
+
+
+class AnalyticsRetentionTest(APITestCase):
+    """Tests for the retention horizon and sargable date filters"""
+    
+    def _create_event(self, moment):
+        return AnalyticsEvent.objects.create(
+            event_name='page_view',
+            event_category='page_view',
+            page_url='https://ortanovias.com/',
+            timestamp=timezone.make_aware(moment)
+        )
+    
+    @override_settings(ANALYTICS_RETENTION_MONTHS=2)
+    def test_apply_retention_archives_old_months(self):
+        """Months past the horizon are archived to gzip NDJSON and removed"""
+        old = self._create_event(datetime(2025, 1, 15, 10, 0))
+        self._create_event(datetime(2025, 2, 28, 23, 59))
+        kept = self._create_event(datetime(2025, 3, 1, 0, 0))
+        ConversionEvent.objects.create(conversion_type='dress_inquiry', analytics_event=old)
+        
+        with tempfile.TemporaryDirectory() as archive_dir:
+            removed = AnalyticsPartitionManager.apply_retention(today=date(2025, 5, 10), archive_dir=archive_dir)
+            
+            self.assertEqual(removed, [date(2025, 1, 1), date(2025, 2, 1)])
+            with gzip.open(os.path.join(archive_dir, 'analytics_events_y2025m01.ndjson.gz'), 'rt') as archive:
+                self.assertEqual([json.loads(line)['id'] for line in archive], [old.id])
+        
+        self.assertEqual(list(AnalyticsEvent.objects.values_list('id', flat=True)), [kept.id])
+        # Conversions keep their own history
+        self.assertEqual(ConversionEvent.objects.count(), 1)
+    
+    @override_settings(ANALYTICS_RETENTION_MONTHS=2, TIME_ZONE='Europe/Madrid')
+    def test_month_boundary_events_are_archived(self):
+        """Events in the last UTC hours of a month are archived before they are removed"""
+        # 23:30 UTC on January 31st is already February in Madrid
+        boundary = AnalyticsEvent.objects.create(
+            event_name='page_view',
+            event_category='page_view',
+            page_url='https://ortanovias.com/',
+            timestamp=datetime(2025, 1, 31, 23, 30, tzinfo=dt_timezone.utc)
+        )
+        january = self._create_event(datetime(2025, 1, 10, 12, 0))
+        
+        with tempfile.TemporaryDirectory() as archive_dir:
+            AnalyticsPartitionManager.apply_retention(today=date(2025, 5, 10), archive_dir=archive_dir)
+            archived = {}
+            for month in ('01', '02'):
+                with gzip.open(os.path.join(archive_dir, f'analytics_events_y2025m{month}.ndjson.gz'), 'rt') as archive:
+                    archived[month] = [json.loads(line)['id'] for line in archive]
+        
+        self.assertEqual(archived, {'01': [january.id], '02': [boundary.id]})
+        self.assertFalse(AnalyticsEvent.objects.exists())
+    
+    @override_settings(TIME_ZONE='Europe/Madrid')
+    def test_partition_bounds_are_local_months(self):
+        """Partition bounds are the same tz-aware bounds the archive uses"""
+        self.assertEqual(
+            AnalyticsPartitionManager.partition_bounds(date(2025, 2, 1)),
+            ('2025-01-31 23:00:00+00:00', '2025-02-28 23:00:00+00:00')
+        )
+    
+    @override_settings(ANALYTICS_RETENTION_MONTHS=2)
+    def test_apply_retention_drops_empty_old_partitions(self):
+        """Old partitions without events are detached and dropped as well"""
+        partitions = ['analytics_events_y2024m12', 'analytics_events_y2025m02', 'analytics_events_y2025m03']
+        with patch.object(AnalyticsPartitionManager, 'is_partitioned', return_value=True), \
+                patch.object(AnalyticsPartitionManager, 'list_partitions', return_value=partitions), \
+                patch.object(AnalyticsPartitionManager, '_partition_has_rows', return_value=False), \
+                patch.object(AnalyticsPartitionManager, '_drop_partition') as drop_partition:
+            AnalyticsPartitionManager.apply_retention(today=date(2025, 5, 10))
+        
+        self.assertEqual(
+            [call.args[0] for call in drop_partition.call_args_list],
+            ['analytics_events_y2024m12', 'analytics_events_y2025m02']
+        )
+        self.assertEqual(AnalyticsPartitionManager.partition_month('analytics_events_y2024m12'), date(2024, 12, 1))
+    
+    def test_conversion_of_dropped_event(self):
+        """A conversion whose event was removed by retention does not break session tracking"""
+        event = self._create_event(datetime(2025, 1, 15, 10, 0))
+        conversion = ConversionEvent.objects.create(conversion_type='dress_inquiry', analytics_event=event)
+        AnalyticsEvent.objects.filter(id=event.id).delete()
+        
+        SessionTracker.record_conversion(ConversionEvent.objects.get(id=conversion.id))
+    
+    def test_report_filters_are_sargable(self):
+        """Date ranges are filtered with timestamp bounds, not a date cast"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('analytics-reports-business-insights'))
+        
+        for query in queries.captured_queries:
+            self.assertNotIn('django_datetime_cast_date', query['sql'])
+
+
+class SessionTrackingTest(APITestCase):
+    """Tests for the incremental session counters"""
+    
+    def setUp(self):
+        self.session = UserSession.objects.create(session_id='session-1')
+    
+    def _event(self, category='page_view'):
+        return {
+            'event_name': category,
+            'event_category': category,
+            'page_url': 'https://ortanovias.com/',
+            'session_id': 'session-1',
+        }
+    
+    def test_counters_follow_ingested_events(self):
+        """Page views, activity and first conversion are tracked as events arrive"""
+        events = [self._event(), self._event(), self._event('user_interaction'), self._event()]
+        self.client.post(reverse('analyticsevent-bulk-create'), {'events': events}, format='json')
+        event = AnalyticsEvent.objects.filter(session_id='session-1').first()
+        for conversion_type in ('appointment_scheduled', 'dress_inquiry'):
+            self.client.post(reverse('conversionevent-list'), {
+                'conversion_type': conversion_type,
+                'analytics_event': event.id,
+            }, format='json')
+        
+        with self.assertNumQueries(2):
+            response = self.client.patch(reverse('usersession-end-session', args=[self.session.pk]))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['page_views'], 3)
+        self.assertEqual(response.data['bounce_rate'], 0.0)
+        self.assertTrue(response.data['is_converted'])
+        self.assertEqual(response.data['conversion_type'], 'appointment_scheduled')
+    
+    def test_close_idle_sessions(self):
+        """Abandoned sessions are closed in bulk at their last activity"""
+        now = timezone.now()
+        UserSession.objects.filter(pk=self.session.pk).update(
+            start_time=now - timedelta(hours=2),
+            last_activity=now - timedelta(hours=1),
+            page_views=1
+        )
+        UserSession.objects.create(session_id='active-session')
+        
+        self.assertEqual(SessionTracker.close_idle_sessions(now), 1)
+        
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.end_time, now - timedelta(hours=1))
+        self.assertEqual(self.session.duration, timedelta(hours=1))
+        self.assertEqual(self.session.bounce_rate, 1.0)
+        self.assertIsNone(UserSession.objects.get(session_id='active-session').end_time)
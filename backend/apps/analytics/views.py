@@ -1,13 +1,19 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from django.db.models import Count, Sum, Avg, Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
 from .models import AnalyticsEvent, ConversionEvent, UserSession, BusinessMetrics
+from .ingestion import EventIngestionService
+from .rollups import MetricsRollupService
+from .reports import TimeSeriesReport, date_range_bounds
+from .exports import AnalyticsExporter, EXPORT_FORMATS, EXPORT_SOURCES
+from .session_tracking import SessionTracker
 from .serializers import (
     AnalyticsEventSerializer, 
     ConversionEventSerializer, 
@@ -36,6 +42,10 @@ class AnalyticsEventViewSet(viewsets.ModelViewSet):
         
         return super().create(request, *args, **kwargs)
     
+    def perform_create(self, serializer):
+        event = serializer.save()
+        SessionTracker.record_events([event])
+    
     def get_client_ip(self, request):
         """Extract client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -47,34 +57,50 @@ class AnalyticsEventViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def bulk_create(self, request):
-        """Create multiple analytics events in one request"""
+        """
+        Create multiple analytics events in one request.
+        The batch is validated in a single pass and written with chunked
+        bulk_create (or buffered in Redis); returns one result per event.
+        """
         events_data = request.data.get('events', [])
-        created_events = []
+        if not isinstance(events_data, list):
+            return Response(
+                {'error': 'events must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(events_data) > EventIngestionService.MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'A batch can contain at most {EventIngestionService.MAX_BATCH_SIZE} events'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Common data for every event
+        defaults = {
+            'ip_address': self.get_client_ip(request),
+            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        }
+        user_id = request.user.id if request.user.is_authenticated else None
         
-        for event_data in events_data:
-            # Add common data to each event
-            if not event_data.get('ip_address'):
-                event_data['ip_address'] = self.get_client_ip(request)
-            if not event_data.get('user_agent'):
-                event_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
-            if request.user.is_authenticated:
-                event_data['user'] = request.user.id
-            
-            serializer = self.get_serializer(data=event_data)
-            if serializer.is_valid():
-                event = serializer.save()
-                created_events.append(event)
+        result = EventIngestionService.ingest(events_data, defaults, user_id)
         
-        return Response({
-            'created_count': len(created_events),
-            'events': AnalyticsEventSerializer(created_events, many=True).data
-        }, status=status.HTTP_201_CREATED)
+        if result['buffered']:
+            response_status = status.HTTP_202_ACCEPTED
+        elif result['accepted_count'] or not events_data:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        
+        return Response(result, status=response_status)
 
 class ConversionEventViewSet(viewsets.ModelViewSet):
     """ViewSet for tracking conversion events"""
     queryset = ConversionEvent.objects.all()
     serializer_class = ConversionEventSerializer
     permission_classes = [AllowAny]
+    
+    def perform_create(self, serializer):
+        conversion = serializer.save()
+        SessionTracker.record_conversion(conversion)
 
 class UserSessionViewSet(viewsets.ModelViewSet):
     """ViewSet for managing user sessions"""
@@ -103,29 +129,10 @@ class UserSessionViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['patch'])
     def end_session(self, request, pk=None):
-        """End a user session"""
+        """End a user session (O(1): counters are maintained as events arrive)"""
         try:
             session = self.get_object()
-            session.end_time = timezone.now()
-            session.duration = session.end_time - session.start_time
-            
-            # Calculate engagement metrics
-            page_views = AnalyticsEvent.objects.filter(
-                session_id=session.session_id,
-                event_category='page_view'
-            ).count()
-            session.page_views = page_views
-            session.bounce_rate = 1.0 if page_views <= 1 else 0.0
-            
-            # Check for conversions
-            conversions = ConversionEvent.objects.filter(
-                analytics_event__session_id=session.session_id
-            )
-            if conversions.exists():
-                session.is_converted = True
-                session.conversion_type = conversions.first().conversion_type
-            
-            session.save()
+            SessionTracker.close(session)
             return Response(UserSessionSerializer(session).data)
         except UserSession.DoesNotExist:
             return Response(
@@ -146,6 +153,9 @@ class AnalyticsReportViewSet(viewsets.ViewSet):
     """ViewSet for generating analytics reports"""
     permission_classes = [AllowAny]  # Adjust permissions as needed
     
+    # Maximum dashboard range in days (one year including today)
+    MAX_DASHBOARD_DAYS = 366
+    
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """Get dashboard analytics data"""
@@ -154,79 +164,65 @@ class AnalyticsReportViewSet(viewsets.ViewSet):
         start_date = end_date - timedelta(days=30)
         
         # Override with query parameters if provided
-        if request.query_params.get('start_date'):
-            start_date = datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
-        if request.query_params.get('end_date'):
-            end_date = datetime.strptime(request.query_params['end_date'], '%Y-%m-%d').date()
+        try:
+            if request.query_params.get('start_date'):
+                start_date = datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
+            if request.query_params.get('end_date'):
+                end_date = datetime.strptime(request.query_params['end_date'], '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get key metrics
-        total_visitors = UserSession.objects.filter(
-            start_time__date__range=[start_date, end_date]
-        ).count()
+        if end_date < start_date:
+            return Response({'error': 'end_date must be on or after start_date'}, status=status.HTTP_400_BAD_REQUEST)
         
-        total_page_views = AnalyticsEvent.objects.filter(
-            event_category='page_view',
-            timestamp__date__range=[start_date, end_date]
-        ).count()
+        if (end_date - start_date).days >= self.MAX_DASHBOARD_DAYS:
+            return Response({
+                'error': f'The maximum range is {self.MAX_DASHBOARD_DAYS} days'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        total_conversions = ConversionEvent.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).count()
+        # Daily trends come from the pre-aggregated rollups (only today is live)
+        daily_series = MetricsRollupService.get_daily_series(start_date, end_date)
+        daily_trends = [
+            {
+                'date': day['date'].isoformat(),
+                'visitors': int(day['daily_visitors']),
+                'conversions': int(day['daily_conversions']),
+                'revenue': day['daily_revenue'],
+                'conversion_rate': day['conversion_rate'],
+            }
+            for day in daily_series
+        ]
         
-        total_revenue = ConversionEvent.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).aggregate(total=Sum('conversion_value'))['total'] or 0
+        # Key metrics are the sum of the daily rollups
+        total_visitors = sum(day['visitors'] for day in daily_trends)
+        total_page_views = int(sum(day['daily_page_views'] for day in daily_series))
+        total_conversions = sum(day['conversions'] for day in daily_trends)
+        total_revenue = sum(day['revenue'] for day in daily_trends)
         
         # Calculate rates
         conversion_rate = (total_conversions / total_visitors * 100) if total_visitors > 0 else 0
         
         avg_session_duration = UserSession.objects.filter(
-            start_time__date__range=[start_date, end_date],
+            **date_range_bounds('start_time', start_date, end_date),
             duration__isnull=False
         ).aggregate(avg=Avg('duration'))['avg']
         
         # Get popular pages
         popular_pages = AnalyticsEvent.objects.filter(
             event_category='page_view',
-            timestamp__date__range=[start_date, end_date]
+            **date_range_bounds('timestamp', start_date, end_date)
         ).values('page_url').annotate(
             views=Count('id')
         ).order_by('-views')[:10]
         
         # Get conversion types breakdown
         conversion_breakdown = ConversionEvent.objects.filter(
-            timestamp__date__range=[start_date, end_date]
+            **date_range_bounds('timestamp', start_date, end_date)
         ).values('conversion_type').annotate(
             count=Count('id'),
             revenue=Sum('conversion_value')
         ).order_by('-count')
         
-        # Get daily trends
-        daily_trends = []
-        current_date = start_date
-        while current_date <= end_date:
-            daily_visitors = UserSession.objects.filter(
-                start_time__date=current_date
-            ).count()
-            
-            daily_conversions = ConversionEvent.objects.filter(
-                timestamp__date=current_date
-            ).count()
-            
-            daily_revenue = ConversionEvent.objects.filter(
-                timestamp__date=current_date
-            ).aggregate(total=Sum('conversion_value'))['total'] or 0
-            
-            daily_trends.append({
-                'date': current_date.isoformat(),
-                'visitors': daily_visitors,
-                'conversions': daily_conversions,
-                'revenue': float(daily_revenue),
-                'conversion_rate': (daily_conversions / daily_visitors * 100) if daily_visitors > 0 else 0
-            })
-            
-            current_date += timedelta(days=1)
-        
         return Response({
             'summary': {
                 'total_visitors': total_visitors,
@@ -251,33 +247,25 @@ class AnalyticsReportViewSet(viewsets.ViewSet):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=30)
         
-        # Appointment-related metrics
-        appointment_events = AnalyticsEvent.objects.filter(
-            event_name__icontains='appointment',
-            timestamp__date__range=[start_date, end_date]
+        # Appointment, dress and testimonial interest in a single pass over the events
+        interest = AnalyticsEvent.objects.filter(
+            **date_range_bounds('timestamp', start_date, end_date)
+        ).aggregate(
+            dress_inquiries=Count('id', filter=Q(event_name__icontains='dress')),
+            testimonial_views=Count('id', filter=Q(event_name__icontains='testimonial')),
         )
+        dress_inquiries = interest['dress_inquiries']
+        testimonial_views = interest['testimonial_views']
         
         appointment_conversions = ConversionEvent.objects.filter(
             conversion_type='appointment_scheduled',
-            timestamp__date__range=[start_date, end_date]
-        ).count()
-        
-        # Dress-related metrics
-        dress_inquiries = AnalyticsEvent.objects.filter(
-            event_name__icontains='dress',
-            timestamp__date__range=[start_date, end_date]
-        ).count()
-        
-        # Testimonial engagement
-        testimonial_views = AnalyticsEvent.objects.filter(
-            event_name__icontains='testimonial',
-            timestamp__date__range=[start_date, end_date]
+            **date_range_bounds('timestamp', start_date, end_date)
         ).count()
         
         # Traffic sources analysis
         traffic_sources = AnalyticsEvent.objects.filter(
             event_category='page_view',
-            timestamp__date__range=[start_date, end_date]
+            **date_range_bounds('timestamp', start_date, end_date)
         ).values('custom_parameters__referrer').annotate(
             count=Count('id')
         ).order_by('-count')[:5]
@@ -294,3 +282,86 @@ class AnalyticsReportViewSet(viewsets.ViewSet):
                 'end_date': end_date.isoformat()
             }
         })
+    
+    @action(detail=False, methods=['get'])
+    def report(self, request):
+        """
+        Grouped time-series report.
+        Query params: start_date, end_date, group_by (day|week|month) and
+        metric_types (comma separated or repeated).
+        """
+        metric_types = [
+            metric.strip()
+            for value in request.query_params.getlist('metric_types')
+            for metric in value.split(',')
+            if metric.strip()
+        ]
+        data = {
+            'start_date': request.query_params.get('start_date'),
+            'end_date': request.query_params.get('end_date'),
+            'group_by': request.query_params.get('group_by', 'day'),
+        }
+        if metric_types:
+            data['metric_types'] = metric_types
+        
+        serializer = AnalyticsReportSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        series = TimeSeriesReport(
+            params['start_date'],
+            params['end_date'],
+            params['metric_types'],
+            group_by=params['group_by']
+        ).run()
+        
+        return Response({
+            'group_by': params['group_by'],
+            'metric_types': params['metric_types'],
+            'series': [
+                {**row, 'period': row['period'].isoformat()}
+                for row in series
+            ],
+            'date_range': {
+                'start_date': params['start_date'].isoformat(),
+                'end_date': params['end_date'].isoformat()
+            }
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream raw events or conversions for offline analysis.
+        Query params: source (events|conversions), output (csv|ndjson),
+        start_date, end_date and gzip=1 for on-the-fly compression.
+        """
+        source = request.query_params.get('source', 'events')
+        output_format = request.query_params.get('output', 'csv')
+        if source not in EXPORT_SOURCES or output_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"source must be one of {', '.join(EXPORT_SOURCES)} and output one of {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            start_date = request.query_params.get('start_date')
+            end_date = request.query_params.get('end_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        exporter = AnalyticsExporter(
+            source,
+            output_format,
+            start_date=start_date,
+            end_date=end_date,
+            compress=request.query_params.get('gzip') in ('1', 'true')
+        )
+        
+        response = StreamingHttpResponse(exporter.stream(), content_type=exporter.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{exporter.filename}"'
+        return response
@@ -1,8 +1,9 @@
 """
 Servicio para manejar horarios de negocio y validaciones de tiempo
 """
-from datetime import datetime, date, time as datetime_time
-from typing import List, Tuple
+from datetime import date, timedelta, time as datetime_time
+from typing import List, Set, Tuple
+from django.utils import timezone
 
 class BusinessHoursService:
     """Servicio para gestionar horarios de negocio de Orta Novias"""
@@ -35,9 +36,12 @@ class BusinessHoursService:
         Verificar si una fecha y hora son válidas para una cita
         Returns: (is_valid, error_message)
         """
-        # Verificar fecha pasada
-        if date_obj < datetime.now().date():
+        # Verificar fecha y hora pasadas (en la zona horaria del negocio)
+        now = timezone.localtime()
+        if date_obj < now.date():
             return False, "No se pueden programar citas en fechas pasadas."
+        if date_obj == now.date() and time_obj <= now.time():
+            return False, "No se pueden programar citas en horas pasadas."
         
         # Verificar día laborable
         if not cls.is_working_day(date_obj):
@@ -78,11 +82,49 @@ class BusinessHoursService:
         
         return slots
     
+    @classmethod
+    def get_slot_availability(cls, start_date: date, end_date: date, occupied_slots: Set[Tuple[date, str]]) -> List[dict]:
+        """
+        Construir el calendario de huecos libres/ocupados entre dos fechas (inclusive)
+        occupied_slots: conjunto de tuplas (fecha, 'HH:MM') ya reservadas
+        """
+        now = timezone.localtime()
+        today = now.date()
+        current_time = now.strftime('%H:%M')
+        slots = cls.get_working_time_slots()
+        days = []
+        
+        current_date = start_date
+        while current_date <= end_date:
+            is_working_day = cls.is_working_day(current_date)
+            day_slots = []
+        
+            if is_working_day:
+                for slot in slots:
+                    occupied = (current_date, slot) in occupied_slots
+                    # Los huecos de hoy que ya han pasado tampoco están disponibles
+                    upcoming = current_date > today or (current_date == today and slot > current_time)
+                    day_slots.append({
+                        'time': slot,
+                        'available': not occupied and upcoming,
+                        'occupied': occupied,
+                    })
+        
+            days.append({
+                'date': current_date.isoformat(),
+                'is_working_day': is_working_day,
+                'available_count': sum(1 for s in day_slots if s['available']),
+                'slots': day_slots,
+            })
+            current_date += timedelta(days=1)
+        
+        return days
+    
     @classmethod
     def get_next_working_day(cls, from_date: date = None) -> date:
         """Obtener el próximo día laborable"""
         if from_date is None:
-            from_date = datetime.now().date()
+            from_date = timezone.localdate()
         
         current_date = from_date
         while not cls.is_working_day(current_date):
@@ -2,14 +2,14 @@
 Comando para limpiar datos de seguridad antiguos
 """
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
-from datetime import datetime, timedelta
 import logging
 
+from backend.apps.appointments.security_monitor import SecurityDataCleaner
+
 logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
-    help = 'Limpia datos de seguridad antiguos del cache'
+    help = 'Limpia datos de seguridad antiguos del cache (SCAN por lotes, sin vaciar la caché)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -37,48 +37,28 @@ class Command(BaseCommand):
                 self.style.WARNING('MODO DRY-RUN: No se harán cambios reales')
             )
         
-        # Patrones de claves de cache relacionadas con seguridad
-        security_patterns = [
-            'failed_validations:*',
-            'suspicious_patterns:*',
-            'blocked_emails:*',
-            'critical_events:*',
-            'rate_limit:*'
-        ]
-        
-        cleaned_count = 0
+        # Solo los espacios de claves de seguridad: sesiones, contadores y
+        # caché de páginas no se tocan
+        report = SecurityDataCleaner.cleanup(days * 86400, dry_run=dry_run)
         
-        # En una implementación real con Redis, usaríamos:
-        # redis_client = cache._cache.get_client()
-        # for pattern in security_patterns:
-        #     keys = redis_client.keys(pattern)
-        #     for key in keys:
-        #         if self._is_old_key(key, days):
-        #             if not dry_run:
-        #                 cache.delete(key)
-        #             cleaned_count += 1
+        for pattern, counts in report.items():
+            self.stdout.write(
+                f"  {pattern}: {counts['scanned']} revisadas, {counts['deleted']} antiguas"
+            )
         
-        # Para el cache de Django por defecto, limpiamos todo
-        if not dry_run:
-            cache.clear()
-            cleaned_count = 1  # Estimación
+        cleaned_count = sum(counts['deleted'] for counts in report.values())
         
         if dry_run:
             self.stdout.write(
-                self.style.WARNING(f'Se limpiarían aproximadamente {cleaned_count} entradas')
+                self.style.WARNING(f'Se limpiarían {cleaned_count} entradas')
             )
         else:
             self.stdout.write(
-                self.style.SUCCESS(f'Limpieza completada. {cleaned_count} entradas procesadas')
+                self.style.SUCCESS(f'Limpieza completada. {cleaned_count} entradas eliminadas')
             )
         
         # Log la operación
-        logger.info(f"Security cache cleanup completed. Days: {days}, Dry run: {dry_run}")
-
-    def _is_old_key(self, key, days):
-        """
-        Verificar si una clave es antigua
-        En una implementación real, verificaríamos el timestamp del valor
-        """
-        # Implementación simplificada
-        return True
+        logger.info(
+            f"Security cache cleanup completed. Days: {days}, Dry run: {dry_run}, "
+            f"Keys: {cleaned_count}"
+        )
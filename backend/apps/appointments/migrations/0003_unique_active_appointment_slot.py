@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+def cancel_duplicate_active_appointments(apps, schema_editor):
+    """Cancelar reservas duplicadas previas (se conserva la más antigua) antes de crear la restricción"""
+    Appointment = apps.get_model('appointments', 'Appointment')
+
+    duplicated_slots = (
+        Appointment.objects.filter(status__in=['pending', 'confirmed'])
+        .values('date', 'time')
+        .annotate(total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for slot in duplicated_slots:
+        active = Appointment.objects.filter(
+            date=slot['date'],
+            time=slot['time'],
+            status__in=['pending', 'confirmed'],
+        ).order_by('status', 'created_at', 'id')  # 'confirmed' < 'pending': las confirmadas primero
+        keep = active.first()
+        active.exclude(pk=keep.pk).update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_slot_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_active_appointments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('date', 'time'), name='unique_active_appointment_slot'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0003_unique_active_appointment_slot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='confirmation_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='confirmation_status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('queued', 'En cola'), ('sent', 'Enviada'), ('failed', 'Fallida')], default='pending', max_length=10),
+        ),
+    ]
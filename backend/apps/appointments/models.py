@@ -3,6 +3,17 @@ from django.core.exceptions import ValidationError
 from datetime import datetime, time as datetime_time
 
 class Appointment(models.Model):
+    # Estados que ocupan un hueco en la agenda
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+
+    # Estados de entrega de la confirmación (email/WhatsApp), consultables por la API
+    CONFIRMATION_STATUSES = [
+        ('pending', 'Pendiente'),
+        ('queued', 'En cola'),
+        ('sent', 'Enviada'),
+        ('failed', 'Fallida'),
+    ]
+
     name = models.CharField(max_length=100)
     phone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
@@ -12,8 +23,24 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=[('pending', 'Pendiente'), ('confirmed', 'Confirmada'), ('cancelled', 'Cancelada')], default='pending')
     comment = models.TextField(blank=True, null=True)
     auto_confirmed = models.BooleanField(default=False)
+    confirmation_status = models.CharField(max_length=10, choices=CONFIRMATION_STATUSES, default='pending')
+    confirmation_sent_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Cubre las consultas de disponibilidad por rango de fechas
+            models.Index(fields=['date', 'time', 'status'], name='appointment_slot_idx'),
+        ]
+        constraints = [
+            # Un único hueco activo por fecha/hora: la base de datos resuelve las reservas concurrentes
+            models.UniqueConstraint(
+                fields=['date', 'time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='unique_active_appointment_slot',
+            ),
+        ]
+
     def clean(self):
         """Validación personalizada: debe tener al menos email o teléfono y horarios de negocio"""
         super().clean()
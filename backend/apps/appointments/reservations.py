@@ -0,0 +1,149 @@
+"""
+Motor de reservas de huecos para citas
+
+- La unicidad de un hueco activo la garantiza la restricción
+  unique_active_appointment_slot de la base de datos (una sola escritura,
+  sin consulta previa de conflicto y correcta con varios workers).
+- Los "holds" son bloqueos temporales en cache que se toman al abrir el
+  formulario y caducan solos (cache.add es atómico en Redis). Cada cliente
+  puede retener a la vez como máximo MAX_HOLDS_PER_CLIENT huecos: cada hold
+  ocupa una plaza del cliente tomada también con cache.add.
+"""
+import logging
+import uuid
+from datetime import date, time as datetime_time
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class SlotUnavailableError(Exception):
+    """El hueco solicitado ya está reservado o retenido por otra persona"""
+
+    def __init__(self, message: str = 'Esta hora ya está ocupada. Por favor, selecciona otra hora.'):
+        self.message = message
+        super().__init__(message)
+
+
+class HoldLimitExceededError(Exception):
+    """El cliente ya retiene el máximo de huecos simultáneos"""
+
+    def __init__(self, message: str = 'Ya tienes demasiadas horas retenidas. Libera alguna o completa tu reserva.'):
+        self.message = message
+        super().__init__(message)
+
+
+class SlotReservationService:
+    """Servicio para retener y reservar huecos de citas"""
+
+    # Duración de un hold (segundos): tiempo para rellenar el formulario
+    HOLD_TTL = 5 * 60
+
+    # Holds simultáneos por cliente (IP): impide acaparar el calendario
+    MAX_HOLDS_PER_CLIENT = 3
+
+    HOLD_KEY_PREFIX = 'slot_hold'
+    SEAT_KEY_PREFIX = 'slot_hold_seat'
+
+    @classmethod
+    def _hold_key(cls, slot_date: date, slot_time: datetime_time) -> str:
+        return f"{cls.HOLD_KEY_PREFIX}:{slot_date.isoformat()}:{slot_time.strftime('%H:%M')}"
+
+    @classmethod
+    def _seat_keys(cls, owner: str) -> list:
+        """Una plaza por hold simultáneo del cliente; cada una guarda el token que la ocupa"""
+        return [f"{cls.SEAT_KEY_PREFIX}:{owner}:{seat}" for seat in range(cls.MAX_HOLDS_PER_CLIENT)]
+
+    @classmethod
+    def _claim_seat(cls, owner: str, token: str) -> Optional[str]:
+        """
+        Ocupar una plaza libre del cliente. cache.add es atómico, así que
+        peticiones concurrentes nunca ocupan más de MAX_HOLDS_PER_CLIENT plazas.
+        """
+        for seat_key in cls._seat_keys(owner):
+            if cache.add(seat_key, token, cls.HOLD_TTL):
+                return seat_key
+        return None
+
+    @classmethod
+    def _owner_seats(cls, owner: Optional[str], token: str) -> list:
+        if not owner:
+            return []
+        seats = cache.get_many(cls._seat_keys(owner))
+        return [seat_key for seat_key, seat_token in seats.items() if seat_token == token]
+
+    @classmethod
+    def hold_slot(cls, slot_date, slot_time, token: Optional[str] = None, owner: Optional[str] = None) -> Optional[str]:
+        """
+        Retener un hueco durante HOLD_TTL segundos.
+        Devuelve el token del hold, o None si otra persona ya lo retiene.
+        Renovar con el mismo token alarga la retención. Con owner, lanza
+        HoldLimitExceededError si el cliente ya retiene MAX_HOLDS_PER_CLIENT huecos.
+        """
+        key = cls._hold_key(slot_date, slot_time)
+
+        if token and cache.get(key) == token:
+            cache.touch(key, cls.HOLD_TTL)
+            for seat_key in cls._owner_seats(owner, token):
+                cache.touch(seat_key, cls.HOLD_TTL)
+            return token
+
+        new_token = uuid.uuid4().hex
+        seat_key = None
+        if owner:
+            # La plaza caduca con el hold y se libera al soltarlo o reservar
+            seat_key = cls._claim_seat(owner, new_token)
+            if seat_key is None:
+                raise HoldLimitExceededError()
+
+        if cache.add(key, new_token, cls.HOLD_TTL):
+            return new_token
+
+        if seat_key:
+            cache.delete(seat_key)
+        return None
+
+    @classmethod
+    def release_hold(cls, slot_date, slot_time, token: Optional[str], owner: Optional[str] = None) -> bool:
+        """Liberar un hold (y la plaza del cliente) si pertenece al token indicado"""
+        if not token:
+            return False
+
+        key = cls._hold_key(slot_date, slot_time)
+        if cache.get(key) == token:
+            cache.delete_many([key, *cls._owner_seats(owner, token)])
+            return True
+        return False
+
+    @classmethod
+    def is_held_by_other(cls, slot_date, slot_time, token: Optional[str] = None) -> bool:
+        """Verificar si el hueco está retenido por otro token"""
+        current = cache.get(cls._hold_key(slot_date, slot_time))
+        return current is not None and current != token
+
+    @classmethod
+    def reserve(cls, serializer, hold_token: Optional[str] = None, owner: Optional[str] = None):
+        """
+        Guardar la cita de un serializer ya validado.
+        El conflicto se detecta por la violación de la restricción única,
+        no con una consulta previa. Lanza SlotUnavailableError si el hueco no está libre.
+        """
+        slot_date = serializer.validated_data.get('date')
+        slot_time = serializer.validated_data.get('time')
+
+        if cls.is_held_by_other(slot_date, slot_time, hold_token):
+            raise SlotUnavailableError('Esta hora está reservada temporalmente por otra persona. Por favor, selecciona otra hora.')
+
+        try:
+            # Savepoint propio: un IntegrityError no invalida la transacción exterior
+            with transaction.atomic():
+                appointment = serializer.save()
+        except IntegrityError:
+            logger.warning(f"Slot conflict for {slot_date} {slot_time}")
+            raise SlotUnavailableError()
+
+        cls.release_hold(slot_date, slot_time, hold_token, owner)
+        return appointment
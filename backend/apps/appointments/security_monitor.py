@@ -1,16 +1,149 @@
 """
 Servicio de monitoreo de seguridad para detectar y responder a actividad sospechosa
+
+Los eventos se guardan en un almacén compacto por IP:
+
+- Redis (SECURITY_MONITOR_REDIS_URL): un sorted set por tipo de evento e IP
+  (puntuación = timestamp). Añadir, recortar la ventana y contar se hace en
+  una transacción de una sola ida y vuelta, sin perder eventos concurrentes.
+- Sin Redis (desarrollo/tests) o si Redis falla: listas ordenadas en memoria
+  del proceso protegidas con un lock. Como en el rate limiting, Redis usa
+  timeouts cortos y tras un fallo no se reintenta durante un tiempo.
+
+Al superar un umbral se marca la IP como bloqueada (clave con TTL), de modo
+que is_ip_blocked() es una consulta EXISTS con una caché LRU en proceso y se
+puede ejecutar en cada request.
 """
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List
-from django.core.cache import cache
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict
 from django.core.mail import mail_admins
 from django.conf import settings
-from collections import defaultdict
+from backend.middleware.ratelimit import CircuitBreaker, redis_client
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Tipos de evento que cuentan para la reputación de una IP
+FAILED_VALIDATIONS = 'failed_validations'
+SUSPICIOUS_PATTERNS = 'suspicious_patterns'
+BLOCKED_EMAILS = 'blocked_emails'
+CRITICAL_EVENTS = 'critical_events'
+
+REPUTATION_KINDS = (FAILED_VALIDATIONS, SUSPICIOUS_PATTERNS, BLOCKED_EMAILS)
+
+
+def encode_event(timestamp, **fields):
+    """Miembro compacto del sorted set (único gracias al id corto)"""
+    fields['t'] = round(timestamp, 3)
+    fields['id'] = uuid.uuid4().hex[:8]
+    return json.dumps(fields, separators=(',', ':'), ensure_ascii=False)
+
+
+class LocalSecurityEventStore:
+    """Eventos en memoria del proceso (tests, desarrollo o Redis caído)"""
+    
+    def __init__(self):
+        # clave -> (timestamps ordenados, miembros)
+        self.events = {}
+        # clave de marca -> instante de caducidad
+        self.flags = {}
+        self.lock = threading.Lock()
+    
+    def _trim(self, key, since):
+        timestamps, members = self.events.get(key, ([], []))
+        cut = bisect_right(timestamps, since)
+        if cut:
+            del timestamps[:cut]
+            del members[:cut]
+        if not timestamps:
+            self.events.pop(key, None)
+        return timestamps
+    
+    def record(self, key, member, now, retention, count_keys, since):
+        with self.lock:
+            timestamps, members = self.events.setdefault(key, ([], []))
+            # Los eventos llegan casi siempre en orden: insertar al final
+            position = bisect_right(timestamps, now)
+            timestamps.insert(position, now)
+            members.insert(position, member)
+            self._trim(key, now - retention)
+            return [len(self._trim(count_key, since)) for count_key in count_keys]
+    
+    def summary(self, keys, since):
+        """(número de eventos, último timestamp) por clave"""
+        with self.lock:
+            result = []
+            for key in keys:
+                timestamps = self._trim(key, since)
+                result.append((len(timestamps), timestamps[-1] if timestamps else None))
+            return result
+    
+    def set_flag(self, key, ttl):
+        with self.lock:
+            self.flags[key] = time.time() + ttl
+    
+    def has_flag(self, key):
+        with self.lock:
+            expires = self.flags.get(key)
+            if expires is None:
+                return False
+            if expires <= time.time():
+                del self.flags[key]
+                return False
+            return True
+    
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+            self.flags.clear()
+
+
+class RedisSecurityEventStore:
+    """Eventos en sorted sets de Redis: añadir, recortar y contar en una transacción"""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def record(self, key, member, now, retention, count_keys, since):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zadd(key, {member: now})
+        pipe.zremrangebyscore(key, '-inf', now - retention)
+        pipe.expire(key, int(retention))
+        for count_key in count_keys:
+            pipe.zcount(count_key, f'({since}', '+inf')
+        results = pipe.execute()
+        return [int(count) for count in results[3:]]
+    
+    def summary(self, keys, since):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zcount(key, f'({since}', '+inf')
+            pipe.zrevrangebyscore(key, '+inf', f'({since}', start=0, num=1, withscores=True)
+        results = pipe.execute()
+        summary = []
+        for count, latest in zip(results[::2], results[1::2]):
+            summary.append((int(count), latest[0][1] if latest else None))
+        return summary
+    
+    def set_flag(self, key, ttl):
+        self.client.set(key, 1, ex=int(ttl))
+    
+    def has_flag(self, key):
+        return bool(self.client.exists(key))
+
+
 class SecurityMonitor:
     """
     Monitor de seguridad para detectar patrones sospechosos
@@ -24,37 +157,133 @@ class SecurityMonitor:
         'blocked_emails_per_ip': 3,       # 3 emails bloqueados por IP en 1 hora
     }
     
+    # Peso de cada tipo de evento en la puntuación de riesgo
+    REPUTATION_WEIGHTS = {
+        FAILED_VALIDATIONS: 1,
+        SUSPICIOUS_PATTERNS: 3,
+        BLOCKED_EMAILS: 2,
+    }
+    
+    KEY_PREFIX = 'security'
+    WINDOW = 3600             # Ventana de reputación: 1 hora
+    CRITICAL_RETENTION = 86400  # Eventos críticos: 24 horas
+    
+    # Caché en proceso de is_ip_blocked() para las IPs más activas
+    BLOCKED_CACHE_SIZE = 10000
+    BLOCKED_CACHE_TTL = 5
+    
+    _store = None
+    _local = LocalSecurityEventStore()
+    _breaker = CircuitBreaker()
+    _blocked_cache = OrderedDict()
+    _blocked_lock = threading.Lock()
+    
+    @classmethod
+    def get_store(cls):
+        if cls._store is None:
+            redis_url = getattr(settings, 'SECURITY_MONITOR_REDIS_URL', None)
+            if redis_url and REDIS_AVAILABLE:
+                cls._store = RedisSecurityEventStore(redis_client(redis_url))
+            else:
+                cls._store = cls._local
+        return cls._store
+    
+    @classmethod
+    def reset_store(cls):
+        """Volver a leer la configuración y vaciar los datos en memoria (tests)"""
+        cls._store = None
+        cls._local.clear()
+        cls._breaker.reset()
+        with cls._blocked_lock:
+            cls._blocked_cache.clear()
+    
+    @classmethod
+    def _key(cls, kind, ip):
+        return f"{cls.KEY_PREFIX}:{kind}:{ip}"
+    
+    @classmethod
+    def _call(cls, method, *args):
+        """
+        Ejecutar una operación del almacén; si Redis falla, usar el almacén
+        local (también durante el enfriamiento del circuito)
+        """
+        store = cls.get_store()
+        if store is not cls._local and cls._breaker.is_open():
+            store = cls._local
+        try:
+            return getattr(store, method)(*args)
+        except Exception as exc:
+            if store is cls._local:
+                raise
+            cooldown = cls._breaker.trip()
+            logger.error(f"Security event store unavailable, using local store for {cooldown}s: {exc}")
+            return getattr(cls._local, method)(*args)
+    
+    @classmethod
+    def _record(cls, kind, ip, retention=None, **fields):
+        """
+        Registrar un evento y devolver los contadores de reputación de la IP
+        (misma ida y vuelta)
+        """
+        now = time.time()
+        count_keys = [cls._key(k, ip) for k in REPUTATION_KINDS]
+        counts = cls._call(
+            'record',
+            cls._key(kind, ip),
+            encode_event(now, **fields),
+            now,
+            retention or cls.WINDOW,
+            count_keys,
+            now - cls.WINDOW,
+        )
+        counts = dict(zip(REPUTATION_KINDS, counts))
+        if cls._should_block(counts):
+            cls._call('set_flag', cls._key('blocked', ip), cls.WINDOW)
+            cls._cache_blocked(ip, True)
+        return counts
+    
+    @classmethod
+    def _risk_score(cls, counts):
+        return sum(counts[kind] * weight for kind, weight in cls.REPUTATION_WEIGHTS.items())
+    
+    @classmethod
+    def _risk_level(cls, score):
+        if score >= 20:
+            return 'high'
+        if score >= 10:
+            return 'medium'
+        return 'low'
+    
+    @classmethod
+    def _should_block(cls, counts):
+        # Bloquear IPs de alto riesgo o con demasiados patrones sospechosos recientes
+        return (
+            cls._risk_level(cls._risk_score(counts)) == 'high' or
+            counts[SUSPICIOUS_PATTERNS] >= cls.SUSPICIOUS_THRESHOLDS['suspicious_patterns_per_ip']
+        )
+    
+    @classmethod
+    def _cache_blocked(cls, ip, blocked):
+        with cls._blocked_lock:
+            cls._blocked_cache[ip] = (blocked, time.monotonic() + cls.BLOCKED_CACHE_TTL)
+            cls._blocked_cache.move_to_end(ip)
+            if len(cls._blocked_cache) > cls.BLOCKED_CACHE_SIZE:
+                cls._blocked_cache.popitem(last=False)
+    
     @classmethod
     def log_failed_validation(cls, ip: str, validation_type: str, error_details: str):
         """
         Registrar validación fallida y verificar si es sospechoso
         """
-        cache_key = f"failed_validations:{ip}"
-        failures = cache.get(cache_key, [])
-        
-        # Agregar nueva falla
-        failure_data = {
-            'timestamp': datetime.now().isoformat(),
-            'type': validation_type,
-            'details': error_details
-        }
-        failures.append(failure_data)
-        
-        # Mantener solo las últimas horas
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        failures = [
-            f for f in failures 
-            if datetime.fromisoformat(f['timestamp']) > one_hour_ago
-        ]
-        
-        cache.set(cache_key, failures, 3600)  # 1 hora
+        counts = cls._record(FAILED_VALIDATIONS, ip, type=validation_type, details=error_details[:200])
+        failures = counts[FAILED_VALIDATIONS]
         
         # Verificar si excede el umbral
-        if len(failures) >= cls.SUSPICIOUS_THRESHOLDS['failed_validations_per_ip']:
+        if failures >= cls.SUSPICIOUS_THRESHOLDS['failed_validations_per_ip']:
             cls._alert_suspicious_activity(
                 'excessive_failed_validations',
                 ip,
-                f"IP {ip} ha tenido {len(failures)} validaciones fallidas en la última hora"
+                f"IP {ip} ha tenido {failures} validaciones fallidas en la última hora"
             )
         
         logger.warning(f"Validation failed for IP {ip}: {validation_type} - {error_details}")
@@ -64,24 +293,8 @@ class SecurityMonitor:
         """
         Registrar patrón sospechoso detectado
         """
-        cache_key = f"suspicious_patterns:{ip}"
-        patterns = cache.get(cache_key, [])
-        
-        pattern_data = {
-            'timestamp': datetime.now().isoformat(),
-            'pattern': pattern,
-            'request_data': request_data[:200]  # Limitar datos para logs
-        }
-        patterns.append(pattern_data)
-        
-        # Mantener solo la última hora
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        patterns = [
-            p for p in patterns 
-            if datetime.fromisoformat(p['timestamp']) > one_hour_ago
-        ]
-        
-        cache.set(cache_key, patterns, 3600)
+        counts = cls._record(SUSPICIOUS_PATTERNS, ip, pattern=pattern, request_data=request_data[:200])
+        patterns = counts[SUSPICIOUS_PATTERNS]
         
         # Alerta inmediata para patrones críticos
         critical_patterns = ['union select', 'drop table', 'script>', '../']
@@ -89,11 +302,11 @@ class SecurityMonitor:
             cls._alert_critical_security_event(ip, pattern, request_data)
         
         # Verificar umbral general
-        if len(patterns) >= cls.SUSPICIOUS_THRESHOLDS['suspicious_patterns_per_ip']:
+        if patterns >= cls.SUSPICIOUS_THRESHOLDS['suspicious_patterns_per_ip']:
             cls._alert_suspicious_activity(
                 'excessive_suspicious_patterns',
                 ip,
-                f"IP {ip} ha generado {len(patterns)} patrones sospechosos en la última hora"
+                f"IP {ip} ha generado {patterns} patrones sospechosos en la última hora"
             )
     
     @classmethod
@@ -101,90 +314,49 @@ class SecurityMonitor:
         """
         Registrar email bloqueado
         """
-        cache_key = f"blocked_emails:{ip}"
-        blocked = cache.get(cache_key, [])
-        
-        blocked_data = {
-            'timestamp': datetime.now().isoformat(),
-            'email': email,
-            'reason': reason
-        }
-        blocked.append(blocked_data)
-        
-        # Mantener solo la última hora
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        blocked = [
-            b for b in blocked 
-            if datetime.fromisoformat(b['timestamp']) > one_hour_ago
-        ]
+        counts = cls._record(BLOCKED_EMAILS, ip, email=email, reason=reason)
+        blocked = counts[BLOCKED_EMAILS]
         
-        cache.set(cache_key, blocked, 3600)
-        
-        if len(blocked) >= cls.SUSPICIOUS_THRESHOLDS['blocked_emails_per_ip']:
+        if blocked >= cls.SUSPICIOUS_THRESHOLDS['blocked_emails_per_ip']:
             cls._alert_suspicious_activity(
                 'excessive_blocked_emails',
                 ip,
-                f"IP {ip} ha intentado usar {len(blocked)} emails bloqueados en la última hora"
+                f"IP {ip} ha intentado usar {blocked} emails bloqueados en la última hora"
             )
     
     @classmethod
     def get_ip_reputation(cls, ip: str) -> Dict:
         """
-        Obtener reputación de una IP
+        Obtener reputación de una IP (una sola ida y vuelta a Redis)
         """
-        reputation = {
-            'risk_level': 'low',
-            'failed_validations': 0,
-            'suspicious_patterns': 0,
-            'blocked_emails': 0,
-            'last_activity': None
-        }
-        
-        # Obtener datos de cache
-        failed_validations = cache.get(f"failed_validations:{ip}", [])
-        suspicious_patterns = cache.get(f"suspicious_patterns:{ip}", [])
-        blocked_emails = cache.get(f"blocked_emails:{ip}", [])
-        
-        reputation['failed_validations'] = len(failed_validations)
-        reputation['suspicious_patterns'] = len(suspicious_patterns)
-        reputation['blocked_emails'] = len(blocked_emails)
-        
-        # Calcular nivel de riesgo
-        total_score = (
-            len(failed_validations) * 1 +
-            len(suspicious_patterns) * 3 +
-            len(blocked_emails) * 2
-        )
+        keys = [cls._key(kind, ip) for kind in REPUTATION_KINDS]
+        summary = cls._call('summary', keys, time.time() - cls.WINDOW)
         
-        if total_score >= 20:
-            reputation['risk_level'] = 'high'
-        elif total_score >= 10:
-            reputation['risk_level'] = 'medium'
-        
-        # Última actividad
-        all_events = failed_validations + suspicious_patterns + blocked_emails
-        if all_events:
-            latest = max(all_events, key=lambda x: x['timestamp'])
-            reputation['last_activity'] = latest['timestamp']
+        counts = {kind: count for kind, (count, _) in zip(REPUTATION_KINDS, summary)}
+        latest = [timestamp for _, timestamp in summary if timestamp is not None]
         
+        reputation = {
+            'risk_level': cls._risk_level(cls._risk_score(counts)),
+            **counts,
+            'last_activity': datetime.fromtimestamp(max(latest)).isoformat() if latest else None
+        }
         return reputation
     
     @classmethod
     def is_ip_blocked(cls, ip: str) -> bool:
         """
-        Verificar si una IP debe ser bloqueada
+        Verificar si una IP debe ser bloqueada (barato: pensado para cada request)
         """
-        reputation = cls.get_ip_reputation(ip)
-        
-        # Bloquear IPs de alto riesgo
-        if reputation['risk_level'] == 'high':
-            return True
-        
-        # Bloquear si hay demasiados patrones sospechosos recientes
-        if reputation['suspicious_patterns'] >= 5:
-            return True
+        now = time.monotonic()
+        with cls._blocked_lock:
+            cached = cls._blocked_cache.get(ip)
+            if cached is not None and cached[1] > now:
+                cls._blocked_cache.move_to_end(ip)
+                return cached[0]
         
-        return False
+        blocked = cls._call('has_flag', cls._key('blocked', ip))
+        cls._cache_blocked(ip, blocked)
+        return blocked
     
     @classmethod
     def _alert_suspicious_activity(cls, alert_type: str, ip: str, message: str):
@@ -221,15 +393,8 @@ class SecurityMonitor:
         message = f"CRITICAL: Potential attack from IP {ip} - Pattern: {pattern}"
         logger.critical(message)
         
-        # Registrar en cache para análisis posterior
-        cache_key = f"critical_events:{ip}"
-        events = cache.get(cache_key, [])
-        events.append({
-            'timestamp': datetime.now().isoformat(),
-            'pattern': pattern,
-            'request_data': request_data[:500]
-        })
-        cache.set(cache_key, events, 86400)  # 24 horas
+        # Registrar para análisis posterior (24 horas)
+        cls._record(CRITICAL_EVENTS, ip, cls.CRITICAL_RETENTION, pattern=pattern, request_data=request_data[:500])
         
         # En producción, enviar alerta inmediata
         if not settings.DEBUG:
@@ -251,6 +416,127 @@ class SecurityMonitor:
             except Exception as e:
                 logger.error(f"Failed to send critical security alert: {e}")
 
+class SecurityDataCleaner:
+    """
+    Limpieza de claves de seguridad en Redis sin vaciar la caché completa
+    
+    Recorre solo los espacios de claves de seguridad con SCAN (por lotes, sin
+    bloquear Redis), decide la antigüedad por TTL o por el timestamp de los
+    eventos y elimina en lotes con UNLINK.
+    """
+    
+    SCAN_BATCH_SIZE = 500
+    
+    # Claves antiguas de la caché de Django -> timeout con el que se escribían
+    LEGACY_CACHE_KEYSPACES = {
+        'failed_validations': 3600,
+        'suspicious_patterns': 3600,
+        'blocked_emails': 3600,
+        'critical_events': 86400,
+        'rate_limit': 3600,
+    }
+    
+    @staticmethod
+    def cache_client(cache_backend):
+        """Cliente redis-py de la caché de Django, o None si no usa Redis"""
+        # django-redis
+        client = getattr(cache_backend, 'client', None)
+        if client is not None and hasattr(client, 'get_client'):
+            return client.get_client(write=True)
+        # django.core.cache.backends.redis
+        inner = getattr(cache_backend, '_cache', None)
+        if inner is not None and hasattr(inner, 'get_client'):
+            return inner.get_client(write=True)
+        return None
+    
+    @classmethod
+    def scan_batches(cls, client, pattern):
+        cursor = 0
+        while True:
+            cursor, keys = client.scan(cursor, match=pattern, count=cls.SCAN_BATCH_SIZE)
+            if keys:
+                yield keys
+            if not cursor:
+                break
+    
+    @classmethod
+    def sweep_by_ttl(cls, client, pattern, timeout, max_age, dry_run=False):
+        """
+        Claves escritas hace más de max_age segundos (timeout - TTL restante)
+        o sin caducidad. Devuelve (revisadas, eliminadas).
+        """
+        scanned = stale_count = 0
+        for keys in cls.scan_batches(client, pattern):
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.ttl(key)
+            stale = [
+                key for key, ttl in zip(keys, pipe.execute())
+                if ttl == -1 or (ttl >= 0 and timeout - ttl >= max_age)
+            ]
+            scanned += len(keys)
+            stale_count += len(stale)
+            if stale and not dry_run:
+                client.unlink(*stale)
+        return scanned, stale_count
+    
+    @classmethod
+    def sweep_by_timestamp(cls, client, pattern, cutoff, dry_run=False):
+        """
+        Sorted sets de eventos cuyo evento más reciente es anterior a cutoff.
+        Devuelve (revisadas, eliminadas).
+        """
+        scanned = stale_count = 0
+        for keys in cls.scan_batches(client, pattern):
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.zrevrangebyscore(key, '+inf', '-inf', start=0, num=1, withscores=True)
+            stale = [
+                key for key, latest in zip(keys, pipe.execute())
+                if not latest or latest[0][1] < cutoff
+            ]
+            scanned += len(keys)
+            stale_count += len(stale)
+            if stale and not dry_run:
+                client.unlink(*stale)
+        return scanned, stale_count
+    
+    @classmethod
+    def cleanup(cls, max_age: int, dry_run: bool = False) -> Dict:
+        """
+        Limpiar los datos de seguridad más antiguos que max_age segundos.
+        Devuelve {patrón: {'scanned': n, 'deleted': n}} por espacio de claves.
+        """
+        from django.core.cache import cache
+        
+        report = {}
+        
+        # Claves antiguas de la caché de Django (con su prefijo y versión)
+        client = cls.cache_client(cache)
+        if client is None:
+            logger.info("Default cache is not Redis: no legacy security keys to scan")
+        else:
+            for name, timeout in cls.LEGACY_CACHE_KEYSPACES.items():
+                pattern = cache.make_key(f"{name}:*")
+                scanned, deleted = cls.sweep_by_ttl(client, pattern, timeout, max_age, dry_run)
+                report[pattern] = {'scanned': scanned, 'deleted': deleted}
+        
+        # Almacén de eventos de SecurityMonitor
+        store = SecurityMonitor.get_store()
+        if isinstance(store, RedisSecurityEventStore):
+            prefix = SecurityMonitor.KEY_PREFIX
+            cutoff = time.time() - max_age
+            for kind in REPUTATION_KINDS + (CRITICAL_EVENTS,):
+                pattern = f"{prefix}:{kind}:*"
+                scanned, deleted = cls.sweep_by_timestamp(store.client, pattern, cutoff, dry_run)
+                report[pattern] = {'scanned': scanned, 'deleted': deleted}
+            
+            pattern = f"{prefix}:blocked:*"
+            scanned, deleted = cls.sweep_by_ttl(store.client, pattern, SecurityMonitor.WINDOW, max_age, dry_run)
+            report[pattern] = {'scanned': scanned, 'deleted': deleted}
+        
+        return report
+
 class SecurityReporter:
     """
     Generador de reportes de seguridad
@@ -5,6 +5,10 @@ class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = '__all__'
+        read_only_fields = ('confirmation_status', 'confirmation_sent_at')
+        # Sin validador de unicidad previo: los conflictos de hueco los resuelve
+        # la restricción unique_active_appointment_slot al guardar
+        validators = []
     
     def validate(self, data):
         """Validación personalizada para el serializer"""
@@ -3,6 +3,7 @@ Servicios de notificación para citas
 """
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 import requests
 from twilio.rest import Client
@@ -125,3 +126,42 @@ Te contactaremos pronto para confirmar tu cita.
                 success = NotificationService.send_whatsapp_confirmation(appointment)
         
         return success
+    
+    @staticmethod
+    def get_confirmation_channel(appointment):
+        """Canal de confirmación ('email' o 'whatsapp') según el método preferido y los datos disponibles"""
+        if appointment.confirmation_method in ('email', 'whatsapp'):
+            return appointment.confirmation_method
+        if appointment.email:
+            return 'email'
+        if appointment.phone:
+            return 'whatsapp'
+        return None
+    
+    @staticmethod
+    def queue_confirmation(appointment):
+        """
+        Encolar el envío de la confirmación en Celery (colas email/whatsapp).
+        La tarea se publica tras el commit, así la respuesta HTTP no espera
+        al proveedor externo y el worker siempre encuentra la cita guardada.
+        """
+        from .models import Appointment
+        from .tasks import send_confirmation_email, send_confirmation_whatsapp
+        
+        channel = NotificationService.get_confirmation_channel(appointment)
+        if channel is None:
+            logger.warning(f"No confirmation channel for appointment {appointment.id}")
+            Appointment.objects.filter(pk=appointment.pk).update(confirmation_status='failed')
+            appointment.confirmation_status = 'failed'
+            return False
+        
+        task = send_confirmation_email if channel == 'email' else send_confirmation_whatsapp
+        
+        Appointment.objects.filter(pk=appointment.pk).update(confirmation_status='queued')
+        appointment.confirmation_status = 'queued'
+        
+        appointment_id = appointment.pk
+        transaction.on_commit(lambda: task.apply_async(args=[appointment_id], queue=channel))
+        
+        logger.info(f"Confirmation for appointment {appointment_id} queued on '{channel}'")
+        return True
@@ -81,6 +81,53 @@ def send_appointment_whatsapp(self, appointment_data):
         logger.error(f"Error enviando WhatsApp: {exc}")
         raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
 
+def _deliver_confirmation(task, appointment_id, channel):
+    """Enviar la confirmación de una cita y registrar el estado de entrega"""
+    from django.utils import timezone
+    from backend.apps.appointments.models import Appointment
+    from backend.apps.appointments.services import NotificationService
+    
+    try:
+        appointment = Appointment.objects.get(id=appointment_id)
+    except Appointment.DoesNotExist:
+        logger.warning(f"Cita {appointment_id} no encontrada para confirmación")
+        return False
+    
+    # Idempotente: con acks_late la tarea puede ejecutarse más de una vez
+    if appointment.confirmation_status == 'sent':
+        return True
+    
+    if channel == 'email':
+        sent = NotificationService.send_email_confirmation(appointment)
+    else:
+        sent = NotificationService.send_whatsapp_confirmation(appointment)
+    
+    # update() en lugar de save(): no dispara de nuevo las señales post_save
+    if sent:
+        Appointment.objects.filter(pk=appointment_id).update(
+            confirmation_status='sent',
+            confirmation_sent_at=timezone.now()
+        )
+        logger.info(f"Confirmación ({channel}) enviada para cita {appointment_id}")
+        return True
+    
+    if task.request.retries < task.max_retries:
+        raise task.retry(countdown=60 * (task.request.retries + 1))
+    
+    Appointment.objects.filter(pk=appointment_id).update(confirmation_status='failed')
+    logger.error(f"Confirmación ({channel}) fallida para cita {appointment_id}")
+    return False
+
+@app.task(bind=True, max_retries=3)
+def send_confirmation_email(self, appointment_id):
+    """Enviar confirmación de cita por email (cola 'email')"""
+    return _deliver_confirmation(self, appointment_id, 'email')
+
+@app.task(bind=True, max_retries=3)
+def send_confirmation_whatsapp(self, appointment_id):
+    """Enviar confirmación de cita por WhatsApp (cola 'whatsapp')"""
+    return _deliver_confirmation(self, appointment_id, 'whatsapp')
+
 @app.task(bind=True, max_retries=2)
 def send_notification(self, notification_data):
     """Enviar notificación push/email/SMS"""
@@ -122,6 +169,16 @@ def cleanup_old_appointments(self):
         logger.error(f"Error en limpieza de citas: {exc}")
         raise
 
+@app.task(bind=True)
+def cleanup_security_data(self, days=7):
+    """Eliminar datos de seguridad antiguos recorriendo solo sus claves (SCAN)"""
+    from backend.apps.appointments.security_monitor import SecurityDataCleaner
+    
+    report = SecurityDataCleaner.cleanup(days * 86400)
+    deleted = sum(counts['deleted'] for counts in report.values())
+    logger.info(f"Limpieza de seguridad completada: {deleted} claves eliminadas")
+    return report
+
 @app.task(bind=True)
 def send_daily_summary(self):
     """Enviar resumen diario de citas a administradores"""
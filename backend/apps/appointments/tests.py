@@ -1,13 +1,15 @@
 """
 Tests unitarios para el sistema de citas
 """
-from django.test import TestCase
+import io
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import date, time, datetime, timedelta
 from backend.apps.appointments.models import Appointment
 from backend.apps.appointments.business_hours import BusinessHoursService
+from backend.apps.appointments.security_monitor import SecurityDataCleaner, SecurityMonitor
 
 
 class BusinessHoursServiceTest(TestCase):
@@ -27,6 +29,28 @@ class BusinessHoursServiceTest(TestCase):
         sunday = date(2025, 7, 13)  # Un domingo
         self.assertFalse(BusinessHoursService.is_working_day(sunday))
     
+    @override_settings(TIME_ZONE='Europe/Madrid')
+    def test_slot_availability_uses_local_time(self):
+        """Hoy es la fecha local del negocio y sus huecos pasados no están disponibles"""
+        from unittest.mock import patch
+        from datetime import timezone as dt_timezone
+        
+        # 22:30 UTC del lunes 14 = 00:30 del martes 15 en Madrid
+        with patch('django.utils.timezone.now', return_value=datetime(2025, 7, 14, 22, 30, tzinfo=dt_timezone.utc)):
+            days = BusinessHoursService.get_slot_availability(date(2025, 7, 14), date(2025, 7, 15), set())
+            self.assertEqual(BusinessHoursService.get_next_working_day(), date(2025, 7, 15))
+        self.assertEqual(days[0]['available_count'], 0)
+        self.assertEqual(days[1]['available_count'], len(BusinessHoursService.get_working_time_slots()))
+        
+        # 10:05 en Madrid: 09:00-10:00 ya han pasado
+        with patch('django.utils.timezone.now', return_value=datetime(2025, 7, 15, 8, 5, tzinfo=dt_timezone.utc)):
+            slots = BusinessHoursService.get_slot_availability(date(2025, 7, 15), date(2025, 7, 15), set())[0]['slots']
+            self.assertFalse(BusinessHoursService.is_valid_appointment_datetime(date(2025, 7, 15), time(9, 30))[0])
+            self.assertTrue(BusinessHoursService.is_valid_appointment_datetime(date(2025, 7, 15), time(10, 30))[0])
+        available = {slot['time']: slot['available'] for slot in slots}
+        self.assertFalse(available['10:00'])
+        self.assertTrue(available['10:30'])
+    
     def test_is_working_time(self):
         """Test para horarios de trabajo"""
         # Hora matutina válida
@@ -94,6 +118,28 @@ class AppointmentModelTest(TestCase):
         
         with self.assertRaises(ValidationError):
             appointment.full_clean()
+    
+    def test_unique_active_slot_constraint(self):
+        """Test para la restricción de un único hueco activo por fecha y hora"""
+        from django.db import IntegrityError, transaction
+        
+        slot_date = BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1))
+        data = {
+            'name': 'Test User',
+            'phone': '600123456',
+            'confirmation_method': 'whatsapp',
+            'date': slot_date,
+            'time': time(10, 0),
+        }
+        Appointment.objects.create(**data)
+        
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Appointment.objects.create(**data)
+        
+        # Una cita cancelada no ocupa el hueco
+        Appointment.objects.create(**{**data, 'status': 'cancelled'})
+        self.assertEqual(Appointment.objects.filter(date=slot_date).count(), 2)
 
 
 class AppointmentAPITest(APITestCase):
@@ -131,6 +177,242 @@ class AppointmentAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertFalse(response.data['is_valid'])
     
+    def test_availability_endpoint(self):
+        """Test para el calendario de disponibilidad"""
+        monday = BusinessHoursService.get_next_working_day(date.today() + timedelta(days=7))
+        Appointment.objects.create(
+            name='Ocupada',
+            phone='600123456',
+            confirmation_method='whatsapp',
+            date=monday,
+            time=time(10, 0)
+        )
+        Appointment.objects.create(
+            name='Cancelada',
+            phone='600123456',
+            confirmation_method='whatsapp',
+            date=monday,
+            time=time(11, 0),
+            status='cancelled'
+        )
+        
+        url = reverse('appointment-availability')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'start_date': monday.isoformat(), 'end_date': (monday + timedelta(days=6)).isoformat()})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['days']), 7)
+        
+        first_day = response.data['days'][0]
+        slots = {slot['time']: slot for slot in first_day['slots']}
+        self.assertFalse(slots['10:00']['available'])
+        self.assertTrue(slots['10:00']['occupied'])
+        # Las citas canceladas liberan el hueco
+        self.assertTrue(slots['11:00']['available'])
+        self.assertEqual(first_day['available_count'], len(BusinessHoursService.get_working_time_slots()) - 1)
+        
+        # Los fines de semana no tienen huecos
+        weekend = [day for day in response.data['days'] if not day['is_working_day']]
+        self.assertEqual(len(weekend), 2)
+        self.assertEqual(weekend[0]['slots'], [])
+    
+    def test_availability_invalid_range(self):
+        """Test para rangos inválidos en disponibilidad"""
+        url = reverse('appointment-availability')
+        
+        response = self.client.get(url, {'start_date': 'no-es-fecha'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get(url, {'start_date': '2025-07-14', 'end_date': '2025-07-10'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get(url, {'start_date': '2025-01-01', 'end_date': '2025-12-31'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_create_appointment_slot_conflict(self):
+        """Test para reservas duplicadas del mismo hueco"""
+        url = reverse('appointment-list')
+        data = {
+            'name': 'Primera Novia',
+            'email': 'primera@example.com',
+            'phone': '600123456',
+            'confirmation_method': 'whatsapp',
+            'date': BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1)).isoformat(),
+            'time': '18:00',
+        }
+        
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.post(url, {**data, 'name': 'Segunda Novia'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time', response.data)
+        self.assertEqual(Appointment.objects.count(), 1)
+    
+    def test_hold_slot(self):
+        """Test para la retención temporal de huecos"""
+        from django.core.cache import cache
+        cache.clear()
+        
+        url = reverse('appointment-hold')
+        slot = {
+            'date': BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1)).isoformat(),
+            'time': '12:00',
+        }
+        
+        response = self.client.post(url, slot, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.data['hold_token']
+        
+        # Otra persona no puede retener el mismo hueco
+        response = self.client.post(url, slot, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # Ni reservarlo sin el token del hold
+        booking = {
+            **slot,
+            'name': 'Test User',
+            'email': 'hold@example.com',
+            'phone': '600123456',
+            'confirmation_method': 'whatsapp',
+        }
+        response = self.client.post(reverse('appointment-list'), booking, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # Con el token sí, y el hold se libera
+        response = self.client.post(reverse('appointment-list'), {**booking, 'hold_token': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.client.post(reverse('appointment-release-hold'), {**slot, 'hold_token': token}, format='json').data['released'])
+    
+    def test_hold_limits_per_client(self):
+        """Test para el límite de holds simultáneos y el rate limit por IP"""
+        from django.core.cache import cache
+        from backend.apps.appointments.reservations import SlotReservationService
+        from backend.middleware.ratelimit import RateLimiter
+        cache.clear()
+        RateLimiter.reset_backend()
+        
+        url = reverse('appointment-hold')
+        day = BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1)).isoformat()
+        hours = ['11:00', '12:00', '13:00', '17:00']
+        
+        tokens = []
+        for hour in hours[:SlotReservationService.MAX_HOLDS_PER_CLIENT]:
+            response = self.client.post(url, {'date': day, 'time': hour}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            tokens.append(response.data['hold_token'])
+        
+        # Un hueco más supera el máximo; otra IP no se ve afectada
+        response = self.client.post(url, {'date': day, 'time': hours[3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.client.post(url, {'date': day, 'time': hours[3]}, format='json', REMOTE_ADDR='198.51.100.2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        # Renovar un hold propio no cuenta y liberarlo deja sitio
+        response = self.client.post(url, {'date': day, 'time': hours[0], 'hold_token': tokens[0]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post(reverse('appointment-release-hold'), {'date': day, 'time': hours[0], 'hold_token': tokens[0]}, format='json')
+        response = self.client.post(url, {'date': day, 'time': hours[0]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        # Demasiadas solicitudes desde la misma IP
+        with self.settings(RATE_LIMIT_POLICIES={'appointment_holds': (2, 300)}):
+            RateLimiter.reset_backend()
+            responses = [self.client.post(url, {'date': day, 'time': '18:00'}, format='json') for _ in range(3)]
+        RateLimiter.reset_backend()
+        self.assertEqual(responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', responses[-1])
+    
+    def test_hold_limit_under_concurrency(self):
+        """Holds simultáneos de la misma IP nunca superan el máximo"""
+        import threading
+        from django.core.cache import cache
+        from backend.apps.appointments.reservations import HoldLimitExceededError, SlotReservationService
+        cache.clear()
+        
+        day = BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1))
+        tokens = []
+        
+        def hold(hour):
+            try:
+                tokens.append(SlotReservationService.hold_slot(day, time(hour, 0), owner='203.0.113.20'))
+            except HoldLimitExceededError:
+                pass
+        
+        threads = [threading.Thread(target=hold, args=(hour,)) for hour in (10, 11, 12, 13, 17, 18, 19)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(tokens), SlotReservationService.MAX_HOLDS_PER_CLIENT)
+    
+    def test_confirmation_queued_after_commit(self):
+        """Test para el envío de la confirmación fuera de la petición"""
+        from unittest.mock import patch
+        from backend.apps.appointments.services import NotificationService
+        
+        booking = {
+            'name': 'Test User',
+            'email': 'queued@example.com',
+            'phone': '600123456',
+            'date': BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1)).isoformat(),
+            'time': '17:30',
+            'confirmation_method': 'email',
+        }
+        
+        with patch.object(NotificationService, 'send_email_confirmation', return_value=True) as send_email:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                response = self.client.post(reverse('appointment-list'), booking, format='json')
+            
+            # La respuesta no espera al envío: la cita queda en cola
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            appointment = Appointment.objects.get(email='queued@example.com')
+            self.assertEqual(appointment.confirmation_status, 'queued')
+            send_email.assert_not_called()
+            
+            # Tras el commit se ejecuta la tarea (modo eager en desarrollo)
+            for callback in callbacks:
+                callback()
+        
+        send_email.assert_called_once()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.confirmation_status, 'sent')
+        self.assertIsNotNone(appointment.confirmation_sent_at)
+    
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+    def test_confirmation_published_to_queue_without_eager(self):
+        """Sin modo eager la confirmación se publica en su cola y no se envía en línea"""
+        from unittest.mock import patch
+        from core.celery import app as celery_app
+        from backend.apps.appointments.services import NotificationService
+        from backend.apps.appointments.tasks import send_confirmation_email
+        
+        appointment = Appointment.objects.create(
+            name='Test User',
+            email='queue@example.com',
+            phone='600123456',
+            date=BusinessHoursService.get_next_working_day(date.today() + timedelta(days=1)),
+            time=time(17, 30),
+            confirmation_method='email',
+        )
+        
+        # La configuración de Celery se lee al arrancar: se desactiva también en la app
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', celery_app.conf.task_always_eager)
+        celery_app.conf.task_always_eager = False
+        
+        with patch.object(send_confirmation_email, 'apply_async') as apply_async, \
+                patch.object(NotificationService, 'send_email_confirmation') as send_email, \
+                patch('django.core.mail.send_mail') as send_mail:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(NotificationService.queue_confirmation(appointment))
+                apply_async.assert_not_called()
+        
+        apply_async.assert_called_once_with(args=[appointment.pk], queue='email')
+        send_email.assert_not_called()
+        send_mail.assert_not_called()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.confirmation_status, 'queued')
+    
     def test_business_hours_endpoint(self):
         """Test para endpoint de horarios de negocio"""
         url = reverse('appointment-business-hours')
@@ -176,3 +458,93 @@ class AppointmentIntegrationTest(APITestCase):
         response = self.client.get(booked_url, {'date': valid_date})
         booked_times = [apt['time'][:5] for apt in response.data]
         self.assertIn(available_slots[0], booked_times)
+
+
+@override_settings(SECURITY_MONITOR_REDIS_URL='', DEBUG=True)
+class SecurityMonitorTest(TestCase):
+    """Tests para el almacén de eventos de SecurityMonitor (sin Redis)"""
+    
+    def setUp(self):
+        SecurityMonitor.reset_store()
+    
+    def tearDown(self):
+        SecurityMonitor.reset_store()
+    
+    def test_reputation_counts_events(self):
+        """La reputación cuenta los eventos de la última hora por tipo"""
+        for _ in range(3):
+            SecurityMonitor.log_failed_validation('203.0.113.5', 'date', 'Fecha inválida')
+        SecurityMonitor.log_blocked_email('203.0.113.5', 'spam@tempmail.com', 'dominio temporal')
+        
+        reputation = SecurityMonitor.get_ip_reputation('203.0.113.5')
+        self.assertEqual(reputation['failed_validations'], 3)
+        self.assertEqual(reputation['blocked_emails'], 1)
+        self.assertEqual(reputation['suspicious_patterns'], 0)
+        self.assertEqual(reputation['risk_level'], 'low')
+        self.assertIsNotNone(reputation['last_activity'])
+        
+        # Otra IP no se ve afectada
+        self.assertIsNone(SecurityMonitor.get_ip_reputation('203.0.113.6')['last_activity'])
+    
+    def test_events_expire_after_window(self):
+        """Los eventos fuera de la ventana no cuentan"""
+        SecurityMonitor.log_failed_validation('203.0.113.5', 'date', 'Fecha inválida')
+        SecurityMonitor.WINDOW, window = 0, SecurityMonitor.WINDOW
+        try:
+            reputation = SecurityMonitor.get_ip_reputation('203.0.113.5')
+        finally:
+            SecurityMonitor.WINDOW = window
+        self.assertEqual(reputation['failed_validations'], 0)
+    
+    def test_ip_blocked_after_threshold(self):
+        """Una IP queda bloqueada al superar el umbral de patrones sospechosos"""
+        ip = '198.51.100.7'
+        for _ in range(SecurityMonitor.SUSPICIOUS_THRESHOLDS['suspicious_patterns_per_ip'] - 1):
+            SecurityMonitor.log_suspicious_pattern(ip, 'sql_comment', '--')
+        self.assertFalse(SecurityMonitor.is_ip_blocked(ip))
+        
+        SecurityMonitor.log_suspicious_pattern(ip, 'sql_comment', '--')
+        self.assertTrue(SecurityMonitor.is_ip_blocked(ip))
+        self.assertEqual(SecurityMonitor.get_ip_reputation(ip)['risk_level'], 'medium')
+    
+    def test_cleanup_does_not_clear_cache(self):
+        """La limpieza de seguridad no vacía la caché completa"""
+        from django.core.cache import cache
+        from django.core.management import call_command
+        
+        cache.set('session:abc', 'valor', 60)
+        call_command('cleanup_security_data', stdout=io.StringIO())
+        self.assertEqual(cache.get('session:abc'), 'valor')
+    
+    def test_cleanup_sweep_by_ttl(self):
+        """Se eliminan las claves sin caducidad o escritas hace demasiado tiempo"""
+        from unittest.mock import MagicMock
+        
+        client = MagicMock()
+        client.scan.return_value = (0, [b'sin_ttl', b'reciente', b'antigua'])
+        client.pipeline.return_value.execute.return_value = [-1, 3500, 100]
+        
+        scanned, deleted = SecurityDataCleaner.sweep_by_ttl(client, 'failed_validations:*', 3600, 1800)
+        self.assertEqual((scanned, deleted), (3, 2))
+        client.unlink.assert_called_once_with(b'sin_ttl', b'antigua')
+        
+        client.unlink.reset_mock()
+        SecurityDataCleaner.sweep_by_ttl(client, 'failed_validations:*', 3600, 1800, dry_run=True)
+        client.unlink.assert_not_called()
+    
+    @override_settings(SECURITY_MONITOR_REDIS_URL='redis://127.0.0.1:1/0', REDIS_SOCKET_TIMEOUT=0.05)
+    def test_redis_failure_opens_circuit(self):
+        """Tras un fallo de Redis se usa el almacén local sin reintentar"""
+        from unittest.mock import patch
+        from backend.apps.appointments.security_monitor import RedisSecurityEventStore
+        
+        SecurityMonitor.reset_store()
+        store = SecurityMonitor.get_store()
+        self.assertIsInstance(store, RedisSecurityEventStore)
+        self.assertEqual(store.client.connection_pool.connection_kwargs['socket_connect_timeout'], 0.05)
+        
+        with patch.object(RedisSecurityEventStore, 'record', side_effect=ConnectionError) as record:
+            for _ in range(3):
+                SecurityMonitor.log_failed_validation('203.0.113.7', 'date', 'Fecha inválida')
+        record.assert_called_once()
+        self.assertEqual(SecurityMonitor.get_ip_reputation('203.0.113.7')['failed_validations'], 3)
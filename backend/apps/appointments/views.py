@@ -1,15 +1,19 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.utils.dateparse import parse_date
+from django.utils.dateparse import parse_date, parse_time
+from django.db import IntegrityError, transaction
 from django.utils import timezone
+from django.db.models import Count
+from datetime import timedelta
 from .models import Appointment
 from .serializers import AppointmentSerializer
-from .services import NotificationService
 from .business_hours import BusinessHoursService
+from .reservations import HoldLimitExceededError, SlotReservationService, SlotUnavailableError
 # from .validators import AppointmentValidator, DataValidator
-# from .security_monitor import SecurityMonitor
+from .security_monitor import SecurityMonitor
+from backend.middleware.ratelimit import RateLimiter
 
 # Validadores simples temporales
 class TempDataValidator:
@@ -78,6 +82,9 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     serializer_class = AppointmentSerializer
     permission_classes = [AllowAny]  # Por defecto permitir todo, luego restringir específicamente
     
+    # Rango máximo (en días) que admite el endpoint de disponibilidad
+    MAX_AVAILABILITY_DAYS = 62
+    
     def get_queryset(self):
         """
         Filtrar las citas por parámetros de consulta
@@ -131,44 +138,24 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             logger.warning(f"Appointment validation failed from IP {client_ip}: {validation_errors}")
             return Response(validation_errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Validaciones adicionales de negocio
-        # Verificar disponibilidad de la fecha/hora
-        if 'date' in sanitized_data and 'time' in sanitized_data:
-            existing_appointment = Appointment.objects.filter(
-                date=sanitized_data['date'],
-                time=sanitized_data['time'],
-                status__in=['pending', 'confirmed']
-            ).first()
-            
-            if existing_appointment:
-                logger.warning(f"Time slot conflict for {sanitized_data['date']} {sanitized_data['time']} from IP {client_ip}")
-                return Response({
-                    'time': 'Esta hora ya está ocupada. Por favor, selecciona otra hora.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
         # Crear el serializer con datos sanitizados
         serializer = self.get_serializer(data=sanitized_data)
         serializer.is_valid(raise_exception=True)
         
-        # Guardar la cita
-        appointment = serializer.save()
-        logger.info(f"Appointment {appointment.id} created successfully from IP {client_ip}")
-        
-        # Enviar notificación
-        notification_sent = False
+        # Guardar la cita: la restricción única resuelve los conflictos de hueco
+        # (una sola escritura, sin consulta previa)
         try:
-            notification_sent = NotificationService.send_confirmation(appointment)
-            if notification_sent:
-                logger.info(f"Notification sent for appointment {appointment.id}")
-            else:
-                logger.warning(f"Failed to send notification for appointment {appointment.id}")
-        except Exception as e:
-            logger.error(f"Error sending notification for appointment {appointment.id}: {str(e)}")
+            appointment = SlotReservationService.reserve(serializer, request.data.get('hold_token'), owner=client_ip)
+        except SlotUnavailableError as e:
+            logger.warning(f"Time slot conflict for {sanitized_data['date']} {sanitized_data['time']} from IP {client_ip}")
+            return Response({'time': e.message}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Responder con los datos de la cita creada
+        logger.info(f"Appointment {appointment.id} created successfully from IP {client_ip}")
+        
+        # La confirmación (email/WhatsApp) se encola tras el commit desde la señal
+        # post_save; su estado se consulta en el campo confirmation_status
         headers = self.get_success_headers(serializer.data)
-        response_data = serializer.data.copy()
-        response_data['notification_sent'] = notification_sent
+        response_data = serializer.data
         
         return Response(
             response_data,
@@ -176,12 +163,144 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             headers=headers
         )
     
+    def perform_update(self, serializer):
+        """Actualizar cita convirtiendo los conflictos de hueco en errores de validación"""
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise serializers.ValidationError({
+                'time': 'Esta hora ya está ocupada. Por favor, selecciona otra hora.'
+            })
+    
+    @action(detail=False, methods=['post'])
+    def hold(self, request):
+        """
+        Retener temporalmente un hueco mientras se rellena el formulario.
+        Body: date, time y opcionalmente hold_token para renovar un hold propio.
+        Limitado por IP (política appointment_holds y MAX_HOLDS_PER_CLIENT).
+        """
+        client_ip = self._get_client_ip(request)
+        rate_limit = RateLimiter.allow('appointment_holds', client_ip)
+        if not rate_limit.allowed:
+            logger.warning(f"Hold rate limit exceeded for IP: {client_ip}")
+            response = Response({
+                'error': 'Demasiadas solicitudes. Intenta de nuevo más tarde.',
+                'retry_after': rate_limit.retry_after
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(rate_limit.retry_after)
+            return response
+        
+        try:
+            slot_date = parse_date(request.data.get('date') or '')
+            slot_time = parse_time(request.data.get('time') or '')
+        except ValueError:
+            slot_date = slot_time = None
+        
+        if not slot_date or not slot_time:
+            return Response({'error': 'Parámetros date (YYYY-MM-DD) y time (HH:MM) requeridos'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        is_valid, error_message = BusinessHoursService.is_valid_appointment_datetime(slot_date, slot_time)
+        if not is_valid:
+            return Response({'error': error_message}, status=status.HTTP_400_BAD_REQUEST)
+        
+        already_booked = Appointment.objects.filter(
+            date=slot_date,
+            time=slot_time,
+            status__in=Appointment.ACTIVE_STATUSES
+        ).exists()
+        
+        token = None
+        if not already_booked:
+            try:
+                token = SlotReservationService.hold_slot(
+                    slot_date, slot_time, request.data.get('hold_token'), owner=client_ip
+                )
+            except HoldLimitExceededError as e:
+                logger.warning(f"Hold limit reached for IP {client_ip}")
+                return Response({'error': e.message}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        if not token:
+            return Response({
+                'time': 'Esta hora ya está ocupada. Por favor, selecciona otra hora.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'hold_token': token,
+            'date': slot_date.isoformat(),
+            'time': slot_time.strftime('%H:%M'),
+            'expires_in': SlotReservationService.HOLD_TTL,
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def release_hold(self, request):
+        """Liberar un hueco retenido (al cerrar el formulario o cambiar de hora)"""
+        try:
+            slot_date = parse_date(request.data.get('date') or '')
+            slot_time = parse_time(request.data.get('time') or '')
+        except ValueError:
+            slot_date = slot_time = None
+        
+        if not slot_date or not slot_time:
+            return Response({'error': 'Parámetros date (YYYY-MM-DD) y time (HH:MM) requeridos'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        released = SlotReservationService.release_hold(
+            slot_date, slot_time, request.data.get('hold_token'), owner=self._get_client_ip(request)
+        )
+        return Response({'released': released})
+    
     @action(detail=False, methods=['get'])
     def business_hours(self, request):
         """Obtener información sobre horarios de negocio"""
         info = BusinessHoursService.get_business_hours_info()
         return Response(info)
     
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Calendario de huecos libres/ocupados para un rango de fechas.
+        Parámetros: start_date (por defecto hoy) y end_date (por defecto start_date + 6 días).
+        Todas las citas activas del rango se obtienen en una única consulta.
+        """
+        start_param = request.query_params.get('start_date')
+        end_param = request.query_params.get('end_date')
+        
+        try:
+            start_date = parse_date(start_param) if start_param else timezone.localdate()
+            end_date = parse_date(end_param) if end_param else None
+        except ValueError:
+            start_date = end_date = None
+        
+        if start_date is None or (end_param and end_date is None):
+            return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if end_date is None:
+            end_date = start_date + timedelta(days=6)
+        
+        if end_date < start_date:
+            return Response({'error': 'end_date debe ser posterior a start_date'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if (end_date - start_date).days >= self.MAX_AVAILABILITY_DAYS:
+            return Response({
+                'error': f'El rango máximo es de {self.MAX_AVAILABILITY_DAYS} días'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Una sola consulta agrupada sobre el índice (date, time, status)
+        occupied_rows = Appointment.objects.filter(
+            date__range=(start_date, end_date),
+            status__in=Appointment.ACTIVE_STATUSES
+        ).values('date', 'time').annotate(bookings=Count('id'))
+        
+        occupied_slots = {
+            (row['date'], row['time'].strftime('%H:%M')) for row in occupied_rows
+        }
+        
+        return Response({
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'days': BusinessHoursService.get_slot_availability(start_date, end_date, occupied_slots),
+        })
+    
     @action(detail=False, methods=['get'])
     def validate_date(self, request):
         """Validar si una fecha es válida para citas con validación mejorada"""
@@ -243,12 +362,10 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             )
         
         # Obtener reputación de la IP
-        # reputation = SecurityMonitor.get_ip_reputation(ip)
-        reputation = {'risk_level': 'low', 'failed_validations': 0}
+        reputation = SecurityMonitor.get_ip_reputation(ip)
         
         # Verificar si está bloqueada
-        # is_blocked = SecurityMonitor.is_ip_blocked(ip)
-        is_blocked = False
+        is_blocked = SecurityMonitor.is_ip_blocked(ip)
         
         return Response({
             'ip': ip,
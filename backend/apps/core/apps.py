@@ -5,3 +5,8 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.apps.core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        import backend.apps.core.signals
+        from backend.apps.core import metrics
+        metrics.setup()
@@ -0,0 +1,191 @@
+"""
+Derivados responsive de las imágenes subidas (vestidos y testimonios)
+
+- Al subir una imagen se encola una tarea Celery que genera versiones
+  AVIF, WebP y JPEG a varios anchos y las guarda junto al original
+  (dresses/foto.jpg -> dresses/foto-640w.webp).
+- El mapa de derivados se guarda en el campo image_renditions del modelo,
+  así los serializers construyen el srcset sin tocar el storage.
+"""
+import io
+import logging
+import os
+
+from celery import shared_task
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Anchos generados (nunca se amplía por encima del original)
+RENDITION_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# Formatos en orden de preferencia para el <picture> del frontend
+RENDITION_FORMATS = {
+    'avif': {'format': 'AVIF', 'options': {'quality': 60}},
+    'webp': {'format': 'WEBP', 'options': {'quality': 80, 'method': 6}},
+    'jpeg': {'format': 'JPEG', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+def available_formats():
+    """Formatos soportados por el Pillow instalado (AVIF depende de libavif)"""
+    return [
+        name for name in RENDITION_FORMATS
+        if name == 'jpeg' or features.check(name)
+    ]
+
+
+def rendition_name(name, width, extension):
+    root, _ = os.path.splitext(name)
+    return f"{root}-{width}w.{extension}"
+
+
+def target_widths(original_width):
+    """Anchos a generar para una imagen: los menores que el original y el propio original (con tope)"""
+    widths = {width for width in RENDITION_WIDTHS if width < original_width}
+    widths.add(min(original_width, RENDITION_WIDTHS[-1]))
+    return sorted(widths)
+
+
+def _normalize_mode(image):
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _flatten(image):
+    """JPEG no admite transparencia: se compone sobre fondo blanco"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+class ImageRenditionService:
+    """Generación y consulta de los derivados de un ImageField"""
+    
+    FIELD_NAME = 'image'
+    RENDITIONS_FIELD = 'image_renditions'
+    
+    @classmethod
+    def is_current(cls, instance):
+        """Los derivados guardados corresponden a la imagen actual"""
+        image = getattr(instance, cls.FIELD_NAME)
+        renditions = getattr(instance, cls.RENDITIONS_FIELD) or {}
+        return bool(image) and renditions.get('source') == image.name
+    
+    @classmethod
+    def queue(cls, instance):
+        """Encolar la generación tras el commit si la imagen cambió"""
+        image = getattr(instance, cls.FIELD_NAME)
+        if not image or cls.is_current(instance):
+            return
+        
+        model_label = instance._meta.label
+        transaction.on_commit(
+            lambda: generate_image_renditions.delay(model_label, instance.pk)
+        )
+    
+    @classmethod
+    def generate(cls, field_file):
+        """
+        Generar todos los derivados de un archivo de imagen.
+        Devuelve el mapa {'source', 'width', 'height', 'sources': {formato: {ancho: nombre}}}
+        """
+        storage = field_file.storage
+        with storage.open(field_file.name, 'rb') as source:
+            image = Image.open(source)
+            image.load()
+        
+        image = _normalize_mode(ImageOps.exif_transpose(image))
+        original_width, original_height = image.size
+        formats = available_formats()
+        sources = {name: {} for name in formats}
+        
+        # Del ancho mayor al menor, reduciendo cada vez desde el anterior
+        current = image
+        for width in reversed(target_widths(original_width)):
+            height = max(1, round(original_height * width / original_width))
+            if current.size != (width, height):
+                current = current.resize((width, height), Image.LANCZOS)
+            
+            for name in formats:
+                spec = RENDITION_FORMATS[name]
+                frame = _flatten(current) if name == 'jpeg' else current
+                buffer = io.BytesIO()
+                frame.save(buffer, spec['format'], **spec['options'])
+                
+                target = rendition_name(field_file.name, width, name)
+                if storage.exists(target):
+                    storage.delete(target)
+                sources[name][str(width)] = storage.save(target, ContentFile(buffer.getvalue()))
+        
+        return {
+            'source': field_file.name,
+            'width': original_width,
+            'height': original_height,
+            'sources': {name: dict(sorted(widths.items(), key=lambda item: int(item[0]))) for name, widths in sources.items()},
+        }
+    
+    @staticmethod
+    def delete_files(renditions, storage):
+        for widths in (renditions or {}).get('sources', {}).values():
+            for name in widths.values():
+                if storage.exists(name):
+                    storage.delete(name)
+    
+    @classmethod
+    def build_srcset(cls, instance, request=None):
+        """
+        Mapa {formato: "url 320w, url 640w, ..."} para el serializer.
+        Vacío mientras los derivados no estén generados para la imagen actual.
+        """
+        if not cls.is_current(instance):
+            return {}
+        
+        storage = getattr(instance, cls.FIELD_NAME).storage
+        renditions = getattr(instance, cls.RENDITIONS_FIELD)
+        srcset = {}
+        for name, widths in renditions.get('sources', {}).items():
+            candidates = []
+            for width, path in widths.items():
+                url = storage.url(path)
+                if request:
+                    url = request.build_absolute_uri(url)
+                candidates.append(f"{url} {width}w")
+            if candidates:
+                srcset[name] = ', '.join(candidates)
+        return srcset
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_image_renditions(self, model_label, pk):
+    """Generar los derivados responsive de la imagen de un objeto"""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.image or ImageRenditionService.is_current(instance):
+        return None
+    
+    previous = instance.image_renditions
+    try:
+        renditions = ImageRenditionService.generate(instance.image)
+    except FileNotFoundError:
+        logger.warning(f"Imagen no encontrada para {model_label}#{pk}: {instance.image.name}")
+        return None
+    except Exception as exc:
+        logger.error(f"Error generando derivados de {model_label}#{pk}: {exc}")
+        raise self.retry(exc=exc)
+    
+    # Derivados de una imagen anterior ya reemplazada
+    if previous and previous.get('source') != renditions['source']:
+        ImageRenditionService.delete_files(previous, instance.image.storage)
+    
+    instance.image_renditions = renditions
+    instance.save(update_fields=['image_renditions'])
+    logger.info(f"Derivados generados para {model_label}#{pk} ({len(renditions['sources'])} formatos)")
+    return renditions
@@ -0,0 +1,117 @@
+"""
+Medir el coste por request de la capa de seguridad
+
+Compara la cadena de middlewares por separado (SecurityMiddleware,
+AdvancedSecurityMiddleware, CloudflareMiddleware, CloudflareSecurityMiddleware
+y DataSanitizationMiddleware) con SecurityPipelineMiddleware con todas las
+etapas activas, sobre varios tipos de request. No toca la base de datos ni
+la vista: la respuesta es una HttpResponse vacía.
+"""
+import json
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from backend.middleware.advanced_security import AdvancedSecurityMiddleware
+from backend.middleware.cloudflare import CloudflareMiddleware, CloudflareSecurityMiddleware
+from backend.middleware.pipeline import STAGES, SecurityPipelineMiddleware
+from backend.middleware.ratelimit import RateLimiter
+from backend.middleware.security import DataSanitizationMiddleware, SecurityMiddleware
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36'
+
+
+def empty_view(request):
+    return HttpResponse()
+
+
+class Command(BaseCommand):
+    """Benchmark de la cadena de middlewares de seguridad frente al pipeline"""
+    
+    help = 'Mide el coste por request de los middlewares de seguridad (cadena separada vs pipeline)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Requests por escenario (por defecto 2000)'
+        )
+        parser.add_argument(
+            '--body-kb',
+            type=int,
+            default=512,
+            help='Tamaño del body JSON grande en KB (por defecto 512)'
+        )
+    
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        large_body = json.dumps({'notes': 'x' * (options['body_kb'] * 1024)})
+        
+        scenarios = {
+            'GET /api/dresses/': lambda: factory.get(
+                '/api/dresses/', {'style': 'Sirena'}, HTTP_USER_AGENT=USER_AGENT
+            ),
+            'POST JSON 1 KB': lambda: factory.post(
+                '/api/testimonials/', json.dumps({'text': 'y' * 1024}),
+                content_type='application/json', HTTP_USER_AGENT=USER_AGENT
+            ),
+            f"POST JSON {options['body_kb']} KB": lambda: factory.post(
+                '/api/testimonials/', large_body,
+                content_type='application/json', HTTP_USER_AGENT=USER_AGENT
+            ),
+        }
+        
+        # Límites altos: se mide el coste de la comprobación, no las respuestas 429
+        policies = {name: (10 ** 9, 3600) for name in (
+            'appointments_create', 'appointments', 'api', 'authenticated_user', 'anonymous_ip',
+        )}
+        with override_settings(
+            DEBUG=False,
+            ENABLE_ADVANCED_SECURITY=True,
+            RATE_LIMIT_REDIS_URL='',
+            RATE_LIMIT_POLICIES=policies,
+            SECURITY_PIPELINE_STAGES=list(STAGES),
+        ):
+            # Sin salida de logs: se mide solo el trabajo de los middlewares
+            logging.disable(logging.CRITICAL)
+            RateLimiter.reset_backend()
+            chain = self.build_chain()
+            pipeline = SecurityPipelineMiddleware(empty_view)
+            
+            self.stdout.write(f"{'Escenario':<24}{'Cadena (µs)':>14}{'Pipeline (µs)':>16}")
+            for name, make_request in scenarios.items():
+                chain_time = self.measure(chain, make_request, iterations)
+                pipeline_time = self.measure(pipeline, make_request, iterations)
+                self.stdout.write(f"{name:<24}{chain_time:>14.1f}{pipeline_time:>16.1f}")
+            RateLimiter.reset_backend()
+            logging.disable(logging.NOTSET)
+    
+    @staticmethod
+    def build_chain():
+        """Los middlewares originales anidados como en settings"""
+        handler = empty_view
+        for middleware in (
+            DataSanitizationMiddleware,
+            AdvancedSecurityMiddleware,
+            SecurityMiddleware,
+            CloudflareSecurityMiddleware,
+            CloudflareMiddleware,
+        ):
+            handler = middleware(handler)
+        return handler
+    
+    @staticmethod
+    def measure(handler, make_request, iterations):
+        """Microsegundos por request (sin contar la construcción de la request)"""
+        requests = [make_request() for _ in range(iterations)]
+        for request in requests:
+            request.body  # el body ya leído, como lo dejaría el servidor WSGI
+        start = time.perf_counter()
+        for request in requests:
+            handler(request)
+        return (time.perf_counter() - start) / iterations * 1e6
@@ -3,9 +3,9 @@ Script para generar automáticamente contenido SEO optimizado
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from django.contrib.sitemaps import ping_google
+from backend.apps.core.sitemaps import SitemapBuilder
 from backend.apps.store.models import Dress
-from backend.apps.testimonials.models import Testimonial
+from backend.apps.testimonials.models import BrideTestimonial
 from backend.apps.appointments.models import Appointment
 import json
 import os
@@ -19,7 +19,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--generate-sitemap',
             action='store_true',
-            help='Regenerar sitemap y notificar a Google'
+            help='Regenerar el sitemap precalculado'
         )
         parser.add_argument(
             '--update-meta',
@@ -64,15 +64,14 @@ class Command(BaseCommand):
         )
 
     def generate_sitemap(self):
-        """Generar sitemap y notificar a Google"""
+        """
+        Regenerar el sitemap precalculado. Google retiró el endpoint de ping
+        (y Django 5 ping_google): los buscadores lo descubren por robots.txt
+        """
         self.stdout.write('📄 Generando sitemap...')
         
-        try:
-            # Notificar a Google del nuevo sitemap
-            ping_google()
-            self.stdout.write('✅ Sitemap enviado a Google')
-        except Exception as e:
-            self.stdout.write(f'⚠️  Error notificando a Google: {e}')
+        manifest = SitemapBuilder.generate()
+        self.stdout.write(f'✅ Sitemap precalculado: {len(manifest)} ficheros')
 
     def update_meta_descriptions(self):
         """Actualizar meta descriptions automáticamente"""
@@ -157,8 +156,8 @@ class Command(BaseCommand):
         else:
             self.stdout.write(f'✅ {dresses_count} vestidos en la base de datos')
         
-        # Verificar testimonios
-        testimonials_count = Testimonial.objects.filter(is_published=True).count()
+        # Verificar testimonios (todos los testimonios son públicos)
+        testimonials_count = BrideTestimonial.objects.count()
         if testimonials_count < 3:
             issues.append('⚠️  Pocos testimonios publicados (mínimo recomendado: 3)')
         else:
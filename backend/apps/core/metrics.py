@@ -0,0 +1,307 @@
+"""
+Instrumentación Prometheus de la aplicación
+
+- Requests: histograma de latencia y contador de códigos de estado por vista
+  (MetricsMiddleware).
+- Base de datos: número de consultas y tiempo por request, medidos con
+  connection.execute_wrapper.
+- Cache: aciertos y fallos de get()/get_many() de los backends configurados.
+- Celery: histograma de duración y contador de estados por tarea (señales
+  task_prerun/task_postrun).
+- Host y servicios: la instantánea del colector (monitoring.py) como gauges.
+
+Con gunicorn (varios workers) se activa el modo multiproceso de
+prometheus_client definiendo PROMETHEUS_MULTIPROC_DIR antes de arrancar: cada
+proceso escribe sus valores en ese directorio y la exposición los agrega.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.utils.module_loading import import_string
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+        generate_latest, multiprocess, start_http_server,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+try:
+    from celery.signals import task_postrun, task_prerun, worker_ready
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Buckets de latencia HTTP (segundos)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Buckets de consultas por request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Buckets de duración de tareas de Celery (segundos)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# Vista sin resolver (404, rutas fuera del URLconf): una sola etiqueta
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+def metrics_enabled():
+    return PROMETHEUS_AVAILABLE and getattr(settings, 'METRICS_ENABLED', True)
+
+
+def multiprocess_mode():
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+if PROMETHEUS_AVAILABLE:
+    REQUEST_LATENCY = Histogram(
+        'django_http_request_duration_seconds',
+        'Latencia de las requests HTTP por vista',
+        ['view', 'method'],
+        buckets=REQUEST_BUCKETS,
+    )
+    REQUESTS_TOTAL = Counter(
+        'django_http_responses_total',
+        'Respuestas HTTP por vista y código de estado',
+        ['view', 'method', 'status'],
+    )
+    DB_QUERIES = Histogram(
+        'django_db_queries_per_request',
+        'Consultas SQL por request',
+        ['view'],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+    DB_TIME = Histogram(
+        'django_db_query_duration_seconds_per_request',
+        'Tiempo total de SQL por request',
+        ['view'],
+        buckets=REQUEST_BUCKETS,
+    )
+    CACHE_REQUESTS = Counter(
+        'django_cache_requests_total',
+        'Lecturas de cache por backend y resultado (hit/miss)',
+        ['backend', 'result'],
+    )
+    TASK_DURATION = Histogram(
+        'celery_task_duration_seconds',
+        'Duración de las tareas de Celery',
+        ['task'],
+        buckets=TASK_BUCKETS,
+    )
+    TASKS_TOTAL = Counter(
+        'celery_tasks_total',
+        'Tareas de Celery ejecutadas por estado',
+        ['task', 'state'],
+    )
+
+
+class QueryTimer:
+    """Wrapper de execute_wrapper: cuenta las consultas y su tiempo"""
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+    
+    def wrap(self, stack):
+        """Instalar el wrapper en todas las conexiones dentro de un ExitStack"""
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def view_label(request):
+    """Nombre de la vista resuelta (cardinalidad acotada por el URLconf)"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED_VIEW
+    return match.view_name or match._func_path
+
+
+def observe_request(view, method, status, duration, queries, query_time):
+    REQUEST_LATENCY.labels(view, method).observe(duration)
+    REQUESTS_TOTAL.labels(view, method, str(status)).inc()
+    DB_QUERIES.labels(view).observe(queries)
+    DB_TIME.labels(view).observe(query_time)
+
+
+# Cache: get() y get_many() instrumentados a nivel de clase
+
+_MISSING = object()
+
+
+def _instrument_cache_class(backend_class):
+    if getattr(backend_class, '_metrics_instrumented', False):
+        return
+    label = backend_class.__name__
+    hits = CACHE_REQUESTS.labels(label, 'hit')
+    misses = CACHE_REQUESTS.labels(label, 'miss')
+    original_get = backend_class.get
+    original_get_many = backend_class.get_many
+    
+    # Se reenvían los argumentos extra de cada backend; solo default se sustituye
+    def get(self, key, default=None, *args, **kwargs):
+        value = original_get(self, key, _MISSING, *args, **kwargs)
+        if value is _MISSING:
+            misses.inc()
+            return default
+        hits.inc()
+        return value
+    
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = original_get_many(self, keys, *args, **kwargs)
+        hits.inc(len(values))
+        misses.inc(len(keys) - len(values))
+        return values
+    
+    backend_class.get = get
+    # BaseCache.get_many ya pasa por get(): no contar dos veces
+    if original_get_many is not BaseCache.get_many:
+        backend_class.get_many = get_many
+    backend_class._metrics_instrumented = True
+
+
+def instrument_caches():
+    """Instrumentar las clases de los backends de CACHES (una vez por proceso)"""
+    for alias, config in settings.CACHES.items():
+        try:
+            _instrument_cache_class(import_string(config['BACKEND']))
+        except ImportError as e:
+            logger.warning(f"No se pudo instrumentar la cache {alias}: {e}")
+
+
+# Celery: duración y estado de cada tarea
+
+_task_starts = {}
+_task_lock = threading.Lock()
+
+
+def _task_started(task_id=None, **kwargs):
+    with _task_lock:
+        _task_starts[task_id] = time.perf_counter()
+
+
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    with _task_lock:
+        start = _task_starts.pop(task_id, None)
+    name = getattr(task, 'name', None) or 'unknown'
+    if start is not None:
+        TASK_DURATION.labels(name).observe(time.perf_counter() - start)
+    TASKS_TOTAL.labels(name, state or 'UNKNOWN').inc()
+
+
+def _start_worker_exporter(**kwargs):
+    """Servidor HTTP de métricas del worker de Celery (CELERY_METRICS_PORT)"""
+    port = getattr(settings, 'CELERY_METRICS_PORT', None)
+    if port:
+        start_http_server(int(port), registry=exposition_registries()[0])
+        logger.info(f"Exportador de métricas de Celery escuchando en el puerto {port}")
+
+
+def connect_celery_signals():
+    if not CELERY_AVAILABLE:
+        return
+    task_prerun.connect(_task_started, weak=False, dispatch_uid='metrics_task_prerun')
+    task_postrun.connect(_task_finished, weak=False, dispatch_uid='metrics_task_postrun')
+    worker_ready.connect(_start_worker_exporter, weak=False, dispatch_uid='metrics_worker_ready')
+
+
+def setup():
+    """Llamado desde CoreConfig.ready()"""
+    if not metrics_enabled():
+        return
+    instrument_caches()
+    connect_celery_signals()
+
+
+# Exposición
+
+class SnapshotCollector:
+    """Gauges de host y servicios a partir de la instantánea del colector"""
+    
+    def collect(self):
+        from .monitoring import MetricsSnapshot
+        
+        snapshot = MetricsSnapshot.get()
+        if snapshot['collected_at'] is None:
+            # Primera muestra en curso: sin gauges hasta tenerla
+            return
+        
+        def gauge(name, documentation, value):
+            family = GaugeMetricFamily(name, documentation)
+            family.add_metric([], value)
+            return family
+        
+        yield gauge('monitoring_snapshot_age_seconds', 'Antigüedad de la instantánea de métricas', snapshot['age_seconds'])
+        
+        system = snapshot['system']
+        if system:
+            yield gauge('system_cpu_percent', 'Uso de CPU del host', system['cpu']['percent'])
+            yield gauge('system_memory_percent', 'Uso de memoria del host', system['memory']['percent'])
+            yield gauge('system_memory_used_bytes', 'Memoria usada del host', system['memory']['used'])
+            yield gauge('system_disk_percent', 'Uso de disco del host', system['disk']['percent'])
+            yield gauge('system_disk_used_bytes', 'Disco usado del host', system['disk']['used'])
+        
+        database = snapshot['database']
+        if database.get('status') == 'healthy':
+            yield gauge('database_active_connections', 'Conexiones activas de PostgreSQL', database.get('active_connections', 0))
+            yield gauge('database_max_connections', 'Máximo de conexiones de PostgreSQL', database.get('max_connections', 0))
+            yield gauge('database_size_bytes', 'Tamaño de la base de datos', database.get('database_size_bytes', 0))
+        
+        redis_health = snapshot['redis']
+        if redis_health.get('status') == 'healthy':
+            yield gauge('redis_connected_clients', 'Clientes conectados a Redis', redis_health.get('connected_clients', 0))
+            yield gauge('redis_used_memory_bytes', 'Memoria usada por Redis', redis_health.get('used_memory', 0))
+            yield gauge('redis_total_commands', 'Comandos procesados por Redis', redis_health.get('total_commands_processed', 0))
+        
+        celery_health = snapshot['celery']
+        if celery_health.get('status') in ['healthy', 'warning']:
+            yield gauge('celery_active_workers', 'Workers de Celery activos', celery_health.get('active_workers', 0))
+            yield gauge('celery_total_tasks', 'Tareas de Celery en ejecución', celery_health.get('total_tasks', 0))
+        
+        # Indicadores de estado (1 = healthy, 0 = unhealthy)
+        for service in ('database', 'redis', 'celery'):
+            up = 1 if snapshot[service].get('status') == 'healthy' else 0
+            yield gauge(f'service_{service}_up', f'Estado de {service}', up)
+
+
+_snapshot_registry = None
+
+
+def exposition_registries():
+    """
+    (registro de la aplicación, registro de la instantánea). En modo
+    multiproceso el primero agrega los ficheros de todos los procesos.
+    """
+    global _snapshot_registry
+    if multiprocess_mode():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    if _snapshot_registry is None:
+        _snapshot_registry = CollectorRegistry(auto_describe=False)
+        _snapshot_registry.register(SnapshotCollector())
+    return registry, _snapshot_registry
+
+
+def render_metrics():
+    """(cuerpo en formato de exposición de texto, content type)"""
+    body = b''.join(generate_latest(registry) for registry in exposition_registries())
+    return body, CONTENT_TYPE_LATEST
@@ -1,6 +1,13 @@
 """
 Sistema de monitoreo y alertas para Orta Novias
+
+Las métricas (host, PostgreSQL, Redis, Celery) las recoge en segundo plano
+la tarea periódica collect_system_metrics y se guardan como una instantánea
+en la caché. /api/monitoring/ y /api/metrics/ sirven esa instantánea con su
+antigüedad, sin hacer consultas ni esperas por request.
 """
+import threading
+import time
 import psutil
 try:
     import redis
@@ -11,7 +18,7 @@ import requests
 from django.core.cache import cache
 from django.db import connection
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 try:
@@ -23,17 +30,22 @@ except ImportError:
 from datetime import datetime, timedelta
 import logging
 
+from .metrics import metrics_enabled, render_metrics
+
 logger = logging.getLogger(__name__)
 
 class SystemMonitor:
     """Monitor del sistema para métricas de salud"""
     
+    # Segundos de espera de respuesta de los workers en cada broadcast
+    CELERY_INSPECT_TIMEOUT = 1.0
+    
     @staticmethod
     def get_system_metrics():
         """Obtener métricas del sistema"""
         try:
-            # CPU y Memoria
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU y Memoria (sin bloquear: uso desde la llamada anterior)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -41,6 +53,7 @@ class SystemMonitor:
             network = psutil.net_io_counters()
             
             return {
+                'uptime': int(time.time() - psutil.boot_time()),
                 'cpu': {
                     'percent': cpu_percent,
                     'count': psutil.cpu_count()
@@ -163,12 +176,11 @@ class SystemMonitor:
                     'message': 'Celery no está disponible'
                 }
             
-            i = current_app.control.inspect()
+            i = current_app.control.inspect(timeout=SystemMonitor.CELERY_INSPECT_TIMEOUT)
             
             # Workers activos
             active_workers = i.active()
             registered_tasks = i.registered()
-            stats = i.stats()
             
             worker_count = len(active_workers) if active_workers else 0
             
@@ -187,6 +199,96 @@ class SystemMonitor:
                 'error': str(e)
             }
 
+class MetricsSnapshot:
+    """
+    Última instantánea de métricas, compartida por todos los workers a
+    través de la caché
+    """
+    
+    CACHE_KEY = 'monitoring:snapshot'
+    REFRESH_LOCK_KEY = 'monitoring:refreshing'
+    # Estado de la instantánea provisional mientras se recoge la primera
+    COLLECTING = 'collecting'
+    
+    @staticmethod
+    def interval():
+        """Segundos entre muestras (MONITORING_COLLECT_INTERVAL)"""
+        return getattr(settings, 'MONITORING_COLLECT_INTERVAL', 15)
+    
+    @classmethod
+    def collect(cls):
+        """Muestrear todas las fuentes y guardar la instantánea"""
+        monitor = SystemMonitor()
+        snapshot = {
+            'collected_at': time.time(),
+            'system': monitor.get_system_metrics(),
+            'database': monitor.check_database_health(),
+            'redis': monitor.check_redis_health(),
+            'celery': monitor.check_celery_health(),
+        }
+        # Sin caducidad: si el colector se detiene se sigue sirviendo la
+        # última instantánea y age_seconds muestra el desfase
+        cache.set(cls.CACHE_KEY, snapshot, None)
+        return snapshot
+    
+    @classmethod
+    def _refresh_in_background(cls):
+        # Un solo hilo en todos los workers a la vez
+        if not cache.add(cls.REFRESH_LOCK_KEY, True, cls.interval()):
+            return
+        
+        def refresh():
+            try:
+                cls.collect()
+            except Exception as e:
+                logger.error(f"Error recogiendo métricas: {e}")
+            finally:
+                connection.close()
+                cache.delete(cls.REFRESH_LOCK_KEY)
+        
+        threading.Thread(target=refresh, name='metrics-refresh', daemon=True).start()
+    
+    @classmethod
+    def placeholder(cls):
+        """Instantánea provisional del arranque en frío: aún no hay datos"""
+        pending = {'status': cls.COLLECTING}
+        return {
+            'collected_at': None,
+            'age_seconds': None,
+            'system': None,
+            'database': dict(pending),
+            'redis': dict(pending),
+            'celery': dict(pending),
+        }
+    
+    @classmethod
+    def get(cls):
+        """
+        Instantánea con su antigüedad (age_seconds). Nunca muestrea en línea:
+        si está desfasada se refresca en segundo plano y, sin instantánea
+        (arranque en frío), se devuelve la provisional mientras se recoge.
+        """
+        snapshot = cache.get(cls.CACHE_KEY)
+        if snapshot is None:
+            cls._refresh_in_background()
+            return cls.placeholder()
+        if time.time() - snapshot['collected_at'] > cls.interval() * 2:
+            cls._refresh_in_background()
+        
+        age = max(0.0, time.time() - snapshot['collected_at'])
+        return {**snapshot, 'age_seconds': round(age, 3)}
+
+def overall_status(snapshot):
+    """Estado general a partir de una instantánea"""
+    if snapshot['collected_at'] is None:
+        return MetricsSnapshot.COLLECTING
+    services = (snapshot['database'], snapshot['redis'], snapshot['celery'])
+    if any(service.get('status') == 'unhealthy' for service in services):
+        return 'unhealthy'
+    if snapshot['celery'].get('status') == 'warning':
+        return 'warning'
+    return 'healthy'
+
 @never_cache
 @csrf_exempt
 def health_check(request):
@@ -219,34 +321,25 @@ def health_check(request):
 
 @never_cache
 def detailed_health_check(request):
-    """Health check detallado con métricas completas"""
-    monitor = SystemMonitor()
-    
-    # Recopilar todas las métricas
-    system_metrics = monitor.get_system_metrics()
-    db_health = monitor.check_database_health()
-    redis_health = monitor.check_redis_health()
-    celery_health = monitor.check_celery_health()
+    """Health check detallado con métricas completas (instantánea del colector)"""
+    snapshot = MetricsSnapshot.get()
+    system_metrics = snapshot['system']
     
     # Determinar estado general
-    overall_status = 'healthy'
-    if (db_health.get('status') == 'unhealthy' or 
-        redis_health.get('status') == 'unhealthy' or
-        celery_health.get('status') == 'unhealthy'):
-        overall_status = 'unhealthy'
-    elif celery_health.get('status') == 'warning':
-        overall_status = 'warning'
+    status = overall_status(snapshot)
     
     response_data = {
-        'status': overall_status,
+        'status': status,
         'timestamp': datetime.now().isoformat(),
+        'collected_at': datetime.fromtimestamp(snapshot['collected_at']).isoformat() if snapshot['collected_at'] else None,
+        'age_seconds': snapshot['age_seconds'],
         'service': 'ortanovias-backend',
         'version': '1.0.0',
         'uptime': system_metrics.get('uptime', 0) if system_metrics else 0,
         'system': system_metrics,
-        'database': db_health,
-        'redis': redis_health,
-        'celery': celery_health,
+        'database': snapshot['database'],
+        'redis': snapshot['redis'],
+        'celery': snapshot['celery'],
         'environment': {
             'debug': settings.DEBUG,
             'allowed_hosts': settings.ALLOWED_HOSTS,
@@ -255,25 +348,37 @@ def detailed_health_check(request):
     }
     
     status_code = 200
-    if overall_status == 'unhealthy':
+    if status == 'unhealthy':
         status_code = 500
-    elif overall_status == 'warning':
+    elif status == 'warning':
         status_code = 200  # Warnings no son errores críticos
     
     return JsonResponse(response_data, status=status_code)
 
 @never_cache
 def metrics_endpoint(request):
-    """Endpoint de métricas en formato Prometheus"""
+    """
+    Endpoint de métricas en formato de exposición de texto de Prometheus.
+    Con prometheus_client incluye la instrumentación de la aplicación
+    (metrics.py); sin él, solo los gauges de la instantánea.
+    """
     try:
-        monitor = SystemMonitor()
-        system_metrics = monitor.get_system_metrics()
-        db_health = monitor.check_database_health()
-        redis_health = monitor.check_redis_health()
-        celery_health = monitor.check_celery_health()
+        if metrics_enabled():
+            body, content_type = render_metrics()
+            return HttpResponse(body, content_type=content_type)
+        
+        snapshot = MetricsSnapshot.get()
+        if snapshot['collected_at'] is None:
+            # Primera muestra en curso: sin datos todavía
+            return HttpResponse('', content_type='text/plain; version=0.0.4; charset=utf-8')
+        
+        system_metrics = snapshot['system']
+        db_health = snapshot['database']
+        redis_health = snapshot['redis']
+        celery_health = snapshot['celery']
         
         # Formato Prometheus
-        metrics = []
+        metrics = [f'monitoring_snapshot_age_seconds {snapshot["age_seconds"]}']
         
         if system_metrics:
             metrics.extend([
@@ -313,14 +418,11 @@ def metrics_endpoint(request):
         
         response = '\n'.join(metrics) + '\n'
         
-        return JsonResponse(
-            {'metrics': response},
-            content_type='text/plain'
-        )
+        return HttpResponse(response, content_type='text/plain; version=0.0.4; charset=utf-8')
         
     except Exception as e:
         logger.error(f"Error generando métricas: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
+        return HttpResponse(f"# Error generando métricas: {e}\n", status=500, content_type='text/plain; charset=utf-8')
 
 class AlertManager:
     """Gestor de alertas para eventos críticos"""
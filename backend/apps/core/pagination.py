@@ -0,0 +1,16 @@
+"""
+Paginación por cursor de los listados públicos
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Paginación por clave (keyset) sobre (created_at, id), de más reciente a
+    más antiguo: cada página es un rango del índice, sin OFFSET ni COUNT(*),
+    así el coste depende del tamaño de página y no del catálogo.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
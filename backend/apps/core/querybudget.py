@@ -0,0 +1,130 @@
+"""
+Presupuesto de consultas SQL por request y detección de N+1
+
+Registra cada consulta de un bloque (una request en QueryBudgetMiddleware o
+un test con query_budget()) mediante connection.execute_wrapper:
+
+- Cada consulta se reduce a una huella (SQL sin literales y con las listas
+  IN colapsadas). Muchas consultas con la misma huella son un N+1.
+- Para la primera consulta de cada huella se guarda la pila de llamadas del
+  código del proyecto, que señala el bucle culpable.
+- Los presupuestos son configurables por vista (QUERY_BUDGETS).
+"""
+import re
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# Presupuestos por defecto
+DEFAULT_MAX_QUERIES = 50
+DEFAULT_MAX_REPEATS = 5
+
+# Frames de pila que se guardan por huella
+STACK_DEPTH = 8
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Forma de la consulta: sin literales, listas IN colapsadas, espacios normalizados"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def project_stack():
+    """Frames del código del proyecto (sin Django ni este módulo), del más externo al más interno"""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(root)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return traceback.format_list(frames[-STACK_DEPTH:])
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Un bloque ha superado su presupuesto de consultas o repite una forma (N+1)"""
+    
+    def __init__(self, report, label=''):
+        self.report = report
+        super().__init__(report.describe(label))
+
+
+class QueryRecorder:
+    """Wrapper de execute_wrapper que agrupa las consultas por huella"""
+    
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.stacks = {}
+    
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            shape = fingerprint(sql)
+            self.shapes[shape] += 1
+            if shape not in self.stacks:
+                self.stacks[shape] = project_stack()
+    
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+    
+    def repeated(self):
+        """[(huella, veces)] de las formas repetidas más de max_repeats veces"""
+        if self.max_repeats is None:
+            return []
+        return [(shape, times) for shape, times in self.shapes.most_common() if times - 1 > self.max_repeats]
+    
+    def over_budget(self):
+        return self.max_queries is not None and self.count > self.max_queries
+    
+    @property
+    def exceeded(self):
+        return self.over_budget() or bool(self.repeated())
+    
+    def describe(self, label=''):
+        lines = [f"{label or 'Bloque'}: {self.count} consultas en {self.duration * 1000:.1f} ms"]
+        if self.over_budget():
+            lines.append(f"Presupuesto superado: {self.count} > {self.max_queries}")
+        for shape, times in self.repeated():
+            lines.append(f"Posible N+1: {times} consultas con la forma: {shape}")
+            lines.extend(line.rstrip() for line in self.stacks[shape])
+        return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(max_queries=None, max_repeats=DEFAULT_MAX_REPEATS):
+    """
+    Helper de tests: falla (QueryBudgetExceeded) si el bloque supera
+    max_queries consultas o repite una misma forma más de max_repeats veces
+    (max_repeats=0: cada forma una sola vez).
+        
+        with query_budget(max_queries=5, max_repeats=1):
+            self.client.get(url)
+    """
+    recorder = QueryRecorder(max_queries, max_repeats)
+    with recorder.record():
+        yield recorder
+    if recorder.exceeded:
+        raise QueryBudgetExceeded(recorder)
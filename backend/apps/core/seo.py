@@ -1,13 +1,20 @@
 """
 SEO Configuration y URLs optimizadas para Orta Novias
 """
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.template.response import TemplateResponse
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_GET
 from django.utils import timezone
 from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from .sitemaps import INDEX_NAME, SitemapBuilder, SitemapStore, shard_name
+from .structured_data import StructuredDataCache
+import gzip
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 # SEO Data para diferentes páginas
 SEO_DATA = {
@@ -41,66 +48,66 @@ SEO_DATA = {
     }
 }
 
+def _precompressed_response(request, compressed, etag, content_type, last_modified=None, body=None, max_age=0):
+    """
+    Respuesta a partir de un cuerpo ya comprimido con gzip: se envía tal cual
+    si el cliente acepta gzip, 304 si el ETag/Last-Modified coincide.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_none_match:
+        not_modified = etag in [tag.strip() for tag in if_none_match.split(',')]
+    else:
+        not_modified = last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since
+    
+    if not_modified:
+        response = HttpResponseNotModified()
+    elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(compressed, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(body if body is not None else gzip.decompress(compressed), content_type=content_type)
+    
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    return response
+
+def _serve_sitemap(request, name):
+    """
+    Servir un fichero del sitemap precalculado (gzip) con ETag/Last-Modified.
+    Nunca consulta la base de datos: si aún no existe se programa su generación
+    (con la misma espera que los cambios, nunca dentro de la petición).
+    """
+    sitemap = SitemapStore.get(name)
+    if sitemap is None:
+        if name == INDEX_NAME:
+            try:
+                SitemapBuilder.schedule()
+            except Exception as exc:
+                logger.error(f"No se pudo encolar la generación del sitemap: {exc}")
+            response = HttpResponse('Sitemap en generación', status=503, content_type='text/plain')
+            response['Retry-After'] = '60'
+            return response
+        raise Http404('Sitemap no encontrado')
+    
+    content, etag, last_modified = sitemap
+    return _precompressed_response(
+        request, content, quote_etag(etag), 'application/xml',
+        last_modified=last_modified, max_age=60 * 60
+    )
+
 @require_GET
-@cache_page(60 * 60)  # Cache por 1 hora
 def sitemap_xml(request):
-    """Generar sitemap.xml dinámico"""
-    from backend.apps.store.models import Dress
-    from backend.apps.testimonials.models import Testimonial
-    
-    # URLs estáticas principales
-    urls = [
-        {
-            'loc': 'https://ortanovias.com/',
-            'lastmod': timezone.now().date(),
-            'changefreq': 'daily',
-            'priority': '1.0'
-        },
-        {
-            'loc': 'https://ortanovias.com/vestidos/',
-            'lastmod': timezone.now().date(),
-            'changefreq': 'weekly',
-            'priority': '0.9'
-        },
-        {
-            'loc': 'https://ortanovias.com/cita/',
-            'lastmod': timezone.now().date(),
-            'changefreq': 'monthly',
-            'priority': '0.8'
-        },
-        {
-            'loc': 'https://ortanovias.com/testimonios/',
-            'lastmod': timezone.now().date(),
-            'changefreq': 'weekly',
-            'priority': '0.7'
-        }
-    ]
-    
-    # Agregar vestidos individuales
-    dresses = Dress.objects.filter(is_available=True)
-    for dress in dresses:
-        urls.append({
-            'loc': f'https://ortanovias.com/vestidos/{dress.id}/',
-            'lastmod': dress.updated_at.date() if hasattr(dress, 'updated_at') else timezone.now().date(),
-            'changefreq': 'monthly',
-            'priority': '0.6'
-        })
-    
-    # XML del sitemap
-    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml_content += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    
-    for url in urls:
-        xml_content += f'  <url>\n'
-        xml_content += f'    <loc>{url["loc"]}</loc>\n'
-        xml_content += f'    <lastmod>{url["lastmod"]}</lastmod>\n'
-        xml_content += f'    <changefreq>{url["changefreq"]}</changefreq>\n'
-        xml_content += f'    <priority>{url["priority"]}</priority>\n'
-        xml_content += f'  </url>\n'
-    
-    xml_content += '</urlset>'
-    
-    return HttpResponse(xml_content, content_type='application/xml')
+    """Sitemap (o índice de sitemaps) precalculado"""
+    return _serve_sitemap(request, INDEX_NAME)
+
+@require_GET
+def sitemap_shard_xml(request, shard):
+    """Fragmento del sitemap cuando hay más de 50.000 URLs"""
+    return _serve_sitemap(request, shard_name(shard))
 
 @require_GET
 @cache_page(60 * 60 * 24)  # Cache por 24 horas
@@ -136,128 +143,12 @@ Crawl-delay: 1
 
 @require_GET
 def structured_data_json(request, page='home'):
-    """Generar datos estructurados JSON-LD para SEO"""
-    
-    # Datos base de la empresa
-    business_data = {
-        "@context": "https://schema.org",
-        "@type": "BridalShop",
-        "name": "Orta Novias",
-        "description": "Tienda especializada en vestidos de novia exclusivos con diseños únicos y atención personalizada",
-        "url": "https://ortanovias.com",
-        "logo": "https://ortanovias.com/static/images/logo.png",
-        "image": "https://ortanovias.com/static/images/tienda.jpg",
-        "telephone": "+34-XXX-XXX-XXX",
-        "email": "info@ortanovias.com",
-        "address": {
-            "@type": "PostalAddress",
-            "streetAddress": "Calle Principal, 123",
-            "addressLocality": "Madrid",
-            "addressRegion": "Madrid",
-            "postalCode": "28001",
-            "addressCountry": "ES"
-        },
-        "geo": {
-            "@type": "GeoCoordinates",
-            "latitude": "40.4168",
-            "longitude": "-3.7038"
-        },
-        "openingHours": [
-            "Mo-Fr 10:00-20:00",
-            "Sa 10:00-14:00"
-        ],
-        "priceRange": "€€€",
-        "servesCuisine": [],
-        "acceptsReservations": True,
-        "sameAs": [
-            "https://www.facebook.com/ortanovias",
-            "https://www.instagram.com/ortanovias",
-            "https://www.pinterest.com/ortanovias"
-        ]
-    }
-    
-    if page == 'home':
-        # Página principal con WebSite schema
-        structured_data = [
-            business_data,
-            {
-                "@context": "https://schema.org",
-                "@type": "WebSite",
-                "name": "Orta Novias",
-                "url": "https://ortanovias.com",
-                "potentialAction": {
-                    "@type": "SearchAction",
-                    "target": "https://ortanovias.com/buscar?q={search_term_string}",
-                    "query-input": "required name=search_term_string"
-                }
-            }
-        ]
-    
-    elif page == 'dresses':
-        # Página de vestidos con ItemList
-        from backend.apps.store.models import Dress
-        dresses = Dress.objects.filter(is_available=True)[:10]
-        
-        items = []
-        for i, dress in enumerate(dresses, 1):
-            items.append({
-                "@type": "ListItem",
-                "position": i,
-                "item": {
-                    "@type": "Product",
-                    "name": dress.name,
-                    "description": dress.description,
-                    "image": f"https://ortanovias.com{dress.image.url}" if dress.image else "",
-                    "url": f"https://ortanovias.com/vestidos/{dress.id}/",
-                    "category": "Vestidos de Novia",
-                    "brand": {
-                        "@type": "Brand",
-                        "name": "Orta Novias"
-                    }
-                }
-            })
-        
-        structured_data = [
-            business_data,
-            {
-                "@context": "https://schema.org",
-                "@type": "ItemList",
-                "name": "Colección de Vestidos de Novia",
-                "description": "Nuestra exclusiva colección de vestidos de novia",
-                "numberOfItems": len(items),
-                "itemListElement": items
-            }
-        ]
-    
-    elif page == 'testimonials':
-        # Página de testimonios con Review schema
-        from backend.apps.testimonials.models import Testimonial
-        testimonials = Testimonial.objects.filter(is_published=True)[:10]
-        
-        reviews = []
-        for testimonial in testimonials:
-            reviews.append({
-                "@type": "Review",
-                "author": {
-                    "@type": "Person",
-                    "name": testimonial.client_name
-                },
-                "reviewRating": {
-                    "@type": "Rating",
-                    "ratingValue": testimonial.rating,
-                    "bestRating": "5"
-                },
-                "reviewBody": testimonial.comment,
-                "datePublished": testimonial.created_at.isoformat()
-            })
-        
-        business_data["review"] = reviews
-        structured_data = [business_data]
-    
-    else:
-        structured_data = [business_data]
-    
-    return JsonResponse(structured_data, safe=False)
+    """Datos estructurados JSON-LD para SEO (precalculados y comprimidos en cache)"""
+    entry = StructuredDataCache.get(page)
+    return _precompressed_response(
+        request, entry['gzip'], entry['etag'], 'application/json',
+        body=entry['body'], max_age=60 * 5
+    )
 
 def get_seo_meta(page='home'):
     """Obtener metadatos SEO para una página específica"""
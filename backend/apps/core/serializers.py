@@ -0,0 +1,41 @@
+"""
+Utilidades comunes para los serializers de la API
+"""
+from rest_framework import serializers
+
+
+class SparseFieldsetMixin:
+    """
+    Permite pedir solo algunos campos con ?fields=id,name,image
+    (solo se aplica al serializer raíz de la respuesta, no a los anidados).
+    """
+    
+    FIELDS_PARAM = 'fields'
+    
+    @classmethod
+    def requested_fields(cls, request):
+        """Campos pedidos en la query string, o None si se piden todos"""
+        if request is None:
+            return None
+        raw = request.query_params.get(cls.FIELDS_PARAM, '')
+        requested = {name.strip() for name in raw.split(',') if name.strip()}
+        return requested or None
+    
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.requested_fields(self.context.get('request'))
+        if requested is None or not self._is_root():
+            return fields
+        
+        unknown = requested - set(fields)
+        if unknown:
+            raise serializers.ValidationError({
+                self.FIELDS_PARAM: f"Campos desconocidos: {', '.join(sorted(unknown))}"
+            })
+        return {name: field for name, field in fields.items() if name in requested}
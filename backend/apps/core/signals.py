@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.apps.store.models import Dress
+from backend.apps.testimonials.models import BrideTestimonial
+from .sitemaps import SitemapBuilder
+from .structured_data import StructuredDataCache
+
+
+@receiver(post_save, sender=Dress)
+def schedule_sitemap_for_dress(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Los vestidos nuevos o que cambian de disponibilidad alteran el sitemap"""
+    if raw:
+        return
+    if created or update_fields is None or 'available' in update_fields:
+        SitemapBuilder.schedule()
+
+
+@receiver(post_save, sender=BrideTestimonial)
+def schedule_sitemap_for_testimonial(sender, instance, created=False, raw=False, **kwargs):
+    """Un testimonio nuevo cambia la fecha de la página de testimonios"""
+    if created and not raw:
+        SitemapBuilder.schedule()
+
+
+@receiver(post_delete, sender=Dress)
+@receiver(post_delete, sender=BrideTestimonial)
+def schedule_sitemap_on_delete(sender, instance, **kwargs):
+    SitemapBuilder.schedule()
+
+
+@receiver([post_save, post_delete], sender=Dress)
+@receiver([post_save, post_delete], sender=BrideTestimonial)
+def invalidate_structured_data(sender, instance, update_fields=None, **kwargs):
+    """Borrar el JSON-LD precalculado de las páginas que muestran el objeto"""
+    # Guardados de campos internos (p. ej. derivados de imagen) no cambian el JSON-LD
+    if update_fields is not None and set(update_fields) <= {'image_renditions'}:
+        return
+    StructuredDataCache.invalidate_for_model(sender)
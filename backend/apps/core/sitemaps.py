@@ -0,0 +1,209 @@
+"""
+Sitemap precalculado de Orta Novias
+
+- Una tarea Celery escribe el sitemap como ficheros gzip estáticos en
+  SITEMAP_ROOT; las peticiones de los crawlers solo leen esos ficheros,
+  nunca la base de datos.
+- Con más de MAX_URLS_PER_FILE URLs se genera un índice (sitemap.xml)
+  que apunta a los fragmentos sitemap-1.xml, sitemap-2.xml, ...
+- Un manifiesto guarda el ETag (hash del contenido) y la fecha de
+  modificación de cada fichero; si el contenido no cambia no se reescribe.
+- Las señales de vestidos y testimonios programan la regeneración (agrupando
+  ráfagas de cambios en una sola ejecución).
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from xml.sax.saxutils import escape
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SITE_URL = 'https://ortanovias.com'
+
+# Límite del protocolo sitemaps.org por fichero
+MAX_URLS_PER_FILE = 50000
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+
+def shard_name(number):
+    return f"sitemap-{number}.xml"
+
+
+def url_entry(loc, lastmod, changefreq, priority):
+    return (
+        f"  <url><loc>{escape(loc)}</loc><lastmod>{lastmod.isoformat()}</lastmod>"
+        f"<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n"
+    )
+
+
+class SitemapBuilder:
+    """Generación de los ficheros del sitemap"""
+    
+    # Espera antes de regenerar, para agrupar varios cambios seguidos
+    REGENERATE_DELAY = 60
+    SCHEDULED_KEY = 'sitemap:scheduled'
+    
+    @staticmethod
+    def root():
+        return settings.SITEMAP_ROOT
+    
+    @staticmethod
+    def iter_entries():
+        """Entradas <url> del sitemap (consultas en streaming, solo las columnas necesarias)"""
+        from backend.apps.store.models import Dress
+        from backend.apps.testimonials.models import BrideTestimonial
+        
+        today = timezone.localdate()
+        dresses = Dress.objects.filter(available=True).order_by('id').values_list('id', 'created_at')
+        latest_dress = dresses.order_by('-created_at').values_list('created_at', flat=True).first()
+        latest_testimonial = BrideTestimonial.objects.order_by('-created_at').values_list('created_at', flat=True).first()
+        
+        def day(value):
+            return timezone.localtime(value).date() if value else today
+        
+        # URLs estáticas principales
+        yield url_entry(f'{SITE_URL}/', today, 'daily', '1.0')
+        yield url_entry(f'{SITE_URL}/vestidos/', day(latest_dress), 'weekly', '0.9')
+        yield url_entry(f'{SITE_URL}/cita/', today, 'monthly', '0.8')
+        yield url_entry(f'{SITE_URL}/testimonios/', day(latest_testimonial), 'weekly', '0.7')
+        
+        # Vestidos individuales disponibles
+        for dress_id, created_at in dresses.iterator(chunk_size=2000):
+            yield url_entry(f'{SITE_URL}/vestidos/{dress_id}/', day(created_at), 'monthly', '0.6')
+    
+    @classmethod
+    def build(cls):
+        """
+        Construir el contenido XML de todos los ficheros.
+        Devuelve {nombre: bytes XML}
+        """
+        shards = []
+        current = io.StringIO()
+        count = 0
+        for entry in cls.iter_entries():
+            if count == MAX_URLS_PER_FILE:
+                shards.append(current)
+                current = io.StringIO()
+                count = 0
+            current.write(entry)
+            count += 1
+        shards.append(current)
+        
+        if len(shards) == 1:
+            return {INDEX_NAME: (URLSET_OPEN + shards[0].getvalue() + URLSET_CLOSE).encode('utf-8')}
+        
+        today = timezone.localdate().isoformat()
+        files = {}
+        index = [INDEX_OPEN]
+        for number, shard in enumerate(shards, 1):
+            name = shard_name(number)
+            files[name] = (URLSET_OPEN + shard.getvalue() + URLSET_CLOSE).encode('utf-8')
+            index.append(f"  <sitemap><loc>{SITE_URL}/{name}</loc><lastmod>{today}</lastmod></sitemap>\n")
+        index.append(INDEX_CLOSE)
+        files[INDEX_NAME] = ''.join(index).encode('utf-8')
+        return files
+    
+    @classmethod
+    def generate(cls):
+        """
+        Escribir los ficheros gzip y el manifiesto (escrituras atómicas).
+        Los ficheros cuyo contenido no cambia conservan ETag y Last-Modified.
+        """
+        root = cls.root()
+        os.makedirs(root, exist_ok=True)
+        previous = SitemapStore.manifest()
+        manifest = {}
+        
+        for name, content in cls.build().items():
+            etag = hashlib.sha256(content).hexdigest()[:32]
+            if previous.get(name, {}).get('etag') == etag and os.path.exists(SitemapStore.path(name)):
+                manifest[name] = previous[name]
+                continue
+            
+            # mtime=0: mismo contenido, mismos bytes comprimidos
+            _write_atomic(SitemapStore.path(name), gzip.compress(content, compresslevel=9, mtime=0))
+            manifest[name] = {'etag': etag, 'last_modified': int(time.time())}
+        
+        _write_atomic(os.path.join(root, MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+        
+        # Fragmentos que ya no forman parte del sitemap
+        for name in set(previous) - set(manifest):
+            try:
+                os.remove(SitemapStore.path(name))
+            except FileNotFoundError:
+                pass
+        
+        logger.info(f"Sitemap generado: {len(manifest)} ficheros")
+        return manifest
+    
+    @classmethod
+    def schedule(cls):
+        """Programar una regeneración tras el commit (una sola por ráfaga de cambios)"""
+        def enqueue():
+            if cache.add(cls.SCHEDULED_KEY, True, cls.REGENERATE_DELAY * 2):
+                generate_sitemap.apply_async(countdown=cls.REGENERATE_DELAY)
+        transaction.on_commit(enqueue)
+
+
+class SitemapStore:
+    """Lectura de los ficheros precalculados (sin acceso a la base de datos)"""
+    
+    @staticmethod
+    def path(name):
+        return os.path.join(settings.SITEMAP_ROOT, f"{name}.gz")
+    
+    @staticmethod
+    def manifest():
+        try:
+            with open(os.path.join(settings.SITEMAP_ROOT, MANIFEST_NAME), 'rb') as manifest:
+                return json.load(manifest)
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    @classmethod
+    def get(cls, name):
+        """Devuelve (bytes gzip, etag, last_modified) o None si no existe"""
+        meta = cls.manifest().get(name)
+        if meta is None:
+            return None
+        try:
+            with open(cls.path(name), 'rb') as sitemap:
+                return sitemap.read(), meta['etag'], meta['last_modified']
+        except FileNotFoundError:
+            return None
+
+
+def _write_atomic(path, content):
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as output:
+        output.write(content)
+    os.replace(temporary, path)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_sitemap(self):
+    """Regenerar el sitemap precalculado"""
+    # Los cambios que lleguen a partir de ahora programan otra regeneración
+    cache.delete(SitemapBuilder.SCHEDULED_KEY)
+    try:
+        return SitemapBuilder.generate()
+    except Exception as exc:
+        logger.error(f"Error generando el sitemap: {exc}")
+        raise self.retry(exc=exc)
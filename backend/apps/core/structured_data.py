@@ -0,0 +1,211 @@
+"""
+Datos estructurados JSON-LD precalculados por página
+
+- Cada página se construye una sola vez, se serializa a bytes y se guarda
+  en la cache junto con su versión gzip y su ETag.
+- Las señales de vestidos y testimonios borran solo las páginas afectadas;
+  servir el endpoint cuesta una lectura de cache.
+"""
+import copy
+import gzip
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from .sitemaps import SITE_URL
+
+# Datos base de la empresa (comunes a todas las páginas)
+BUSINESS_DATA = {
+    "@context": "https://schema.org",
+    "@type": "BridalShop",
+    "name": "Orta Novias",
+    "description": "Tienda especializada en vestidos de novia exclusivos con diseños únicos y atención personalizada",
+    "url": SITE_URL,
+    "logo": f"{SITE_URL}/static/images/logo.png",
+    "image": f"{SITE_URL}/static/images/tienda.jpg",
+    "telephone": "+34-XXX-XXX-XXX",
+    "email": "info@ortanovias.com",
+    "address": {
+        "@type": "PostalAddress",
+        "streetAddress": "Calle Principal, 123",
+        "addressLocality": "Madrid",
+        "addressRegion": "Madrid",
+        "postalCode": "28001",
+        "addressCountry": "ES"
+    },
+    "geo": {
+        "@type": "GeoCoordinates",
+        "latitude": "40.4168",
+        "longitude": "-3.7038"
+    },
+    "openingHours": [
+        "Mo-Fr 10:00-20:00",
+        "Sa 10:00-14:00"
+    ],
+    "priceRange": "€€€",
+    "servesCuisine": [],
+    "acceptsReservations": True,
+    "sameAs": [
+        "https://www.facebook.com/ortanovias",
+        "https://www.instagram.com/ortanovias",
+        "https://www.pinterest.com/ortanovias"
+    ]
+}
+
+# Elementos incluidos en las listas de vestidos y reseñas
+MAX_ITEMS = 10
+
+
+def build_home():
+    """Página principal con WebSite schema"""
+    return [
+        BUSINESS_DATA,
+        {
+            "@context": "https://schema.org",
+            "@type": "WebSite",
+            "name": "Orta Novias",
+            "url": SITE_URL,
+            "potentialAction": {
+                "@type": "SearchAction",
+                "target": f"{SITE_URL}/buscar?q={{search_term_string}}",
+                "query-input": "required name=search_term_string"
+            }
+        }
+    ]
+
+
+def build_dresses():
+    """Página de vestidos con ItemList (solo las columnas necesarias)"""
+    from backend.apps.store.models import Dress
+    
+    dresses = (
+        Dress.objects.filter(available=True)
+        .only('id', 'name', 'description', 'image', 'image_exists')
+        .order_by('-created_at', '-id')[:MAX_ITEMS]
+    )
+    
+    items = []
+    for position, dress in enumerate(dresses, 1):
+        # La existencia de la imagen ya está resuelta al subirla
+        image = f"{SITE_URL}{dress.image.url}" if dress.image and dress.image_exists else ""
+        items.append({
+            "@type": "ListItem",
+            "position": position,
+            "item": {
+                "@type": "Product",
+                "name": dress.name,
+                "description": dress.description,
+                "image": image,
+                "url": f"{SITE_URL}/vestidos/{dress.id}/",
+                "category": "Vestidos de Novia",
+                "brand": {
+                    "@type": "Brand",
+                    "name": "Orta Novias"
+                }
+            }
+        })
+    
+    return [
+        BUSINESS_DATA,
+        {
+            "@context": "https://schema.org",
+            "@type": "ItemList",
+            "name": "Colección de Vestidos de Novia",
+            "description": "Nuestra exclusiva colección de vestidos de novia",
+            "numberOfItems": len(items),
+            "itemListElement": items
+        }
+    ]
+
+
+def build_testimonials():
+    """Página de testimonios con Review schema"""
+    from backend.apps.testimonials.models import BrideTestimonial
+    
+    testimonials = (
+        BrideTestimonial.objects
+        .only('bride_name', 'testimonial', 'created_at')
+        .order_by('-created_at', '-id')[:MAX_ITEMS]
+    )
+    
+    business_data = copy.deepcopy(BUSINESS_DATA)
+    business_data["review"] = [
+        {
+            "@type": "Review",
+            "author": {
+                "@type": "Person",
+                "name": testimonial.bride_name
+            },
+            "reviewBody": testimonial.testimonial,
+            "datePublished": testimonial.created_at.date().isoformat()
+        }
+        for testimonial in testimonials
+    ]
+    return [business_data]
+
+
+def build_default():
+    return [BUSINESS_DATA]
+
+
+PAGE_BUILDERS = {
+    'home': build_home,
+    'dresses': build_dresses,
+    'testimonials': build_testimonials,
+}
+
+# Páginas que dependen de cada modelo
+MODEL_PAGES = {
+    'store.Dress': ('dresses',),
+    'testimonials.BrideTestimonial': ('testimonials',),
+}
+
+
+class StructuredDataCache:
+    """Cache de las respuestas JSON-LD ya serializadas y comprimidas"""
+    
+    KEY_PREFIX = 'structured_data'
+    
+    # Las páginas con datos se invalidan por señales; el tope solo limita entradas huérfanas
+    TIMEOUT = 60 * 60 * 24
+    
+    @classmethod
+    def _key(cls, page):
+        return f"{cls.KEY_PREFIX}:{page}"
+    
+    @staticmethod
+    def resolve_page(page):
+        # Las páginas desconocidas comparten una sola entrada
+        return page if page in PAGE_BUILDERS else 'default'
+    
+    @staticmethod
+    def render(page):
+        """Construir y serializar una página: {'body', 'gzip', 'etag'}"""
+        data = PAGE_BUILDERS.get(page, build_default)()
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return {
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+            'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        }
+    
+    @classmethod
+    def get(cls, page):
+        page = cls.resolve_page(page)
+        key = cls._key(page)
+        entry = cache.get(key)
+        if entry is None:
+            entry = cls.render(page)
+            cache.set(key, entry, cls.TIMEOUT)
+        return entry
+    
+    @classmethod
+    def invalidate(cls, *pages):
+        cache.delete_many([cls._key(page) for page in pages])
+    
+    @classmethod
+    def invalidate_for_model(cls, model):
+        pages = MODEL_PAGES.get(model._meta.label)
+        if pages:
+            cls.invalidate(*pages)
@@ -12,6 +12,13 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+@shared_task(bind=True, ignore_result=True)
+def collect_system_metrics(self):
+    """Guardar la instantánea de métricas que sirven /api/monitoring/ y /api/metrics/"""
+    from backend.apps.core.monitoring import MetricsSnapshot
+    
+    MetricsSnapshot.collect()
+
 @shared_task(bind=True)
 def backup_database(self):
     """Crear backup de la base de datos PostgreSQL"""
@@ -0,0 +1,334 @@
+"""
+Tests del sitemap y los datos estructurados precalculados
+"""
+import gzip
+import io
+import shutil
+import tempfile
+import time
+from datetime import date
+from unittest.mock import patch
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from backend.apps.core.images import generate_image_renditions
+from backend.apps.core import metrics
+from backend.apps.core.monitoring import MetricsSnapshot, SystemMonitor
+from backend.apps.core.querybudget import QueryBudgetExceeded, fingerprint, query_budget
+from backend.apps.core.sitemaps import SitemapBuilder, generate_sitemap
+from backend.apps.core.structured_data import StructuredDataCache
+from backend.apps.store.models import Dress
+from backend.apps.testimonials.models import BrideTestimonial
+
+
+class SitemapTest(TestCase):
+    """Tests para la generación y el servicio del sitemap"""
+    
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings_override = override_settings(SITEMAP_ROOT=self.root)
+        self.settings_override.enable()
+        cache.clear()
+        
+        for i in range(4):
+            Dress.objects.create(name=f'Vestido {i}', description='-', image=f'dresses/{i}.jpg', style='Sirena')
+        self.hidden = Dress.objects.create(name='Reservado', description='-', image='dresses/r.jpg', style='Sirena', available=False)
+        BrideTestimonial.objects.create(bride_name='Ana', testimonial='Genial', image='testimonials/a.jpg', wedding_date=date(2025, 5, 1))
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+    
+    def test_precomputed_sitemap_served_without_queries(self):
+        """El sitemap se sirve desde el fichero gzip, con ETag/Last-Modified y sin tocar la BD"""
+        SitemapBuilder.generate()
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('sitemap'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        xml = gzip.decompress(response.content).decode('utf-8')
+        self.assertEqual(xml.count('<url>'), 8)
+        self.assertNotIn(f'/vestidos/{self.hidden.id}/', xml)
+        
+        # Sin gzip se descomprime al vuelo
+        response = self.client.get(reverse('sitemap'))
+        self.assertTrue(response.content.startswith(b'<?xml'))
+        
+        etag = response['ETag']
+        response = self.client.get(reverse('sitemap'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        # Regenerar con el mismo contenido conserva el ETag
+        SitemapBuilder.generate()
+        self.assertEqual(self.client.get(reverse('sitemap'))['ETag'], etag)
+    
+    def test_sitemap_index_and_shards(self):
+        """Por encima del límite de URLs se genera un índice con fragmentos"""
+        with patch('backend.apps.core.sitemaps.MAX_URLS_PER_FILE', 3):
+            manifest = SitemapBuilder.generate()
+        self.assertEqual(sorted(manifest), ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml', 'sitemap.xml'])
+        
+        index = self.client.get(reverse('sitemap')).content.decode('utf-8')
+        self.assertIn('<sitemapindex', index)
+        self.assertIn('https://ortanovias.com/sitemap-3.xml', index)
+        
+        shard = self.client.get(reverse('sitemap_shard', args=[3])).content.decode('utf-8')
+        self.assertEqual(shard.count('<url>'), 2)
+        
+        # Al volver a un único fichero desaparecen los fragmentos
+        SitemapBuilder.generate()
+        self.assertEqual(self.client.get(reverse('sitemap_shard', args=[1])).status_code, 404)
+    
+    def test_missing_sitemap_is_queued_and_changes_schedule_regeneration(self):
+        """Sin fichero se programa la generación; los cambios programan una sola regeneración"""
+        with patch.object(generate_sitemap, 'apply_async') as apply_async, \
+                patch.object(generate_sitemap, 'delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            responses = [self.client.get(reverse('sitemap')) for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [503] * 3)
+        # Nunca se genera dentro de la petición y varias peticiones programan una sola
+        delay.assert_not_called()
+        apply_async.assert_called_once_with(countdown=SitemapBuilder.REGENERATE_DELAY)
+        cache.delete(SitemapBuilder.SCHEDULED_KEY)
+        
+        with patch.object(generate_sitemap, 'apply_async') as apply_async, \
+                patch.object(generate_image_renditions, 'delay'), \
+                self.captureOnCommitCallbacks(execute=True):
+            Dress.objects.create(name='Nuevo', description='-', image='dresses/n.jpg', style='Corte A')
+            self.hidden.available = True
+            self.hidden.save(update_fields=['available'])
+        apply_async.assert_called_once_with(countdown=SitemapBuilder.REGENERATE_DELAY)
+    
+    def test_seo_optimizer_generates_sitemap(self):
+        """El comando regenera el sitemap precalculado"""
+        out = io.StringIO()
+        call_command('seo_optimizer', '--generate-sitemap', stdout=out)
+        self.assertIn('Sitemap precalculado: 1 ficheros', out.getvalue())
+        xml = self.client.get(reverse('sitemap')).content.decode('utf-8')
+        self.assertEqual(xml.count('<url>'), 8)
+
+
+class StructuredDataTest(TestCase):
+    """Tests para la cache de JSON-LD"""
+    
+    def setUp(self):
+        cache.clear()
+        Dress.objects.create(name='Vestido Sirena', description='Encaje', image='dresses/s.jpg', style='Sirena')
+        Dress.objects.create(name='Oculto', description='-', image='dresses/o.jpg', style='Sirena', available=False)
+        BrideTestimonial.objects.create(bride_name='Marta', testimonial='Perfecto', image='testimonials/m.jpg', wedding_date=date(2025, 9, 6))
+    
+    def test_pages_cached_and_precompressed(self):
+        """Cada página se construye una vez y luego cuesta una lectura de cache"""
+        url = reverse('structured_data', args=['dresses'])
+        response = self.client.get(url)
+        items = response.json()[1]['itemListElement']
+        self.assertEqual([item['item']['name'] for item in items], ['Vestido Sirena'])
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), StructuredDataCache.get('dresses')['body'])
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        
+        reviews = self.client.get(reverse('structured_data', args=['testimonials'])).json()[0]['review']
+        self.assertEqual(reviews[0]['author']['name'], 'Marta')
+        self.assertEqual(reviews[0]['reviewBody'], 'Perfecto')
+    
+    def test_invalidated_by_signals(self):
+        """Guardar un vestido invalida solo la página de vestidos"""
+        StructuredDataCache.get('dresses')
+        StructuredDataCache.get('testimonials')
+        
+        with patch.object(generate_sitemap, 'apply_async'):
+            Dress.objects.filter(name='Oculto').first().delete()
+        Dress.objects.create(name='Nuevo', description='-', image='dresses/n.jpg', style='Corte A')
+        
+        self.assertIsNone(cache.get(StructuredDataCache._key('dresses')))
+        self.assertIsNotNone(cache.get(StructuredDataCache._key('testimonials')))
+        items = self.client.get(reverse('structured_data', args=['dresses'])).json()[1]['itemListElement']
+        self.assertEqual(items[0]['item']['name'], 'Nuevo')
+
+
+class MetricsSnapshotTest(TestCase):
+    """Tests para la instantánea de métricas del colector"""
+    
+    def setUp(self):
+        cache.clear()
+        self.healthy = {'status': 'healthy'}
+    
+    def collectors(self):
+        return (
+            patch.object(SystemMonitor, 'get_system_metrics', return_value=None),
+            patch.object(SystemMonitor, 'check_database_health', return_value=self.healthy),
+            patch.object(SystemMonitor, 'check_redis_health', return_value=self.healthy),
+            patch.object(SystemMonitor, 'check_celery_health', return_value=self.healthy),
+        )
+    
+    def test_endpoints_serve_snapshot(self):
+        """Con instantánea los endpoints no vuelven a muestrear"""
+        system, database, redis_health, celery = self.collectors()
+        with system, database as check_database, redis_health, celery:
+            MetricsSnapshot.collect()
+            check_database.reset_mock()
+            
+            response = self.client.get(reverse('detailed_health_check'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['status'], 'healthy')
+            self.assertLess(response.json()['age_seconds'], 5)
+            
+            self.client.get(reverse('metrics_endpoint'))
+            check_database.assert_not_called()
+    
+    def test_stale_snapshot_refreshed_in_background(self):
+        """Una instantánea desfasada se sirve igualmente y se refresca aparte"""
+        cache.set(MetricsSnapshot.CACHE_KEY, {
+            'collected_at': 0, 'system': None, 'database': self.healthy,
+            'redis': self.healthy, 'celery': self.healthy,
+        }, 60)
+        with patch.object(MetricsSnapshot, '_refresh_in_background') as refresh:
+            snapshot = MetricsSnapshot.get()
+        refresh.assert_called_once()
+        self.assertGreater(snapshot['age_seconds'], 3600)
+    
+    def test_cold_start_returns_placeholder(self):
+        """Sin instantánea no se muestrea en línea: se devuelve la provisional"""
+        system, database, redis_health, celery = self.collectors()
+        with system, database as check_database, redis_health, celery, \
+                patch.object(MetricsSnapshot, '_refresh_in_background') as refresh:
+            snapshot = MetricsSnapshot.get()
+            self.assertIsNone(snapshot['age_seconds'])
+            self.assertEqual(snapshot['database']['status'], MetricsSnapshot.COLLECTING)
+            
+            response = self.client.get(reverse('detailed_health_check'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['status'], MetricsSnapshot.COLLECTING)
+            self.assertEqual(self.client.get(reverse('metrics_endpoint')).status_code, 200)
+            check_database.assert_not_called()
+        self.assertEqual(refresh.call_count, 3)
+    
+    def test_snapshot_does_not_expire(self):
+        """La última instantánea se conserva aunque el colector se detenga"""
+        system, database, redis_health, celery = self.collectors()
+        with system, database, redis_health, celery, patch.object(cache, 'set') as cache_set:
+            MetricsSnapshot.collect()
+        self.assertIsNone(cache_set.call_args.args[2])
+
+
+class PrometheusMetricsTest(TestCase):
+    """Tests para la exposición Prometheus y la instrumentación por request"""
+    
+    def setUp(self):
+        cache.clear()
+        healthy = {'status': 'healthy'}
+        cache.set(MetricsSnapshot.CACHE_KEY, {
+            'collected_at': time.time(), 'system': None, 'database': healthy,
+            'redis': healthy, 'celery': healthy,
+        }, 60)
+    
+    def test_text_exposition_with_request_metrics(self):
+        """Las requests quedan medidas por vista en formato de texto"""
+        Dress.objects.create(name='Vestido', description='-', image='dresses/v.jpg', style='Sirena')
+        self.client.get(reverse('structured_data', args=['dresses']))
+        
+        response = self.client.get(reverse('metrics_endpoint'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('django_http_request_duration_seconds_bucket{le="0.005",method="GET",view="structured_data"}', body)
+        self.assertIn('django_http_responses_total{method="GET",status="200",view="structured_data"}', body)
+        self.assertIn('django_db_queries_per_request_count{view="structured_data"}', body)
+        self.assertIn('service_database_up 1.0', body)
+    
+    def test_cache_hits_and_misses(self):
+        """get() cuenta aciertos y fallos"""
+        counter = metrics.CACHE_REQUESTS
+        misses = counter.labels('LocMemCache', 'miss')._value.get()
+        hits = counter.labels('LocMemCache', 'hit')._value.get()
+        
+        cache.get('metrics:nada')
+        cache.set('metrics:algo', 1)
+        self.assertEqual(cache.get('metrics:algo'), 1)
+        
+        self.assertEqual(counter.labels('LocMemCache', 'miss')._value.get(), misses + 1)
+        self.assertEqual(counter.labels('LocMemCache', 'hit')._value.get(), hits + 1)
+    
+    def test_cache_instrumentation_forwards_extra_arguments(self):
+        """Los argumentos propios del backend (p. ej. client de django-redis) se reenvían"""
+        from django.core.cache.backends.locmem import LocMemCache
+        
+        class ClientCache(LocMemCache):
+            clients = []
+            
+            def get(self, key, default=None, version=None, client=None):
+                self.clients.append(client)
+                return super().get(key, default, version)
+            
+            def get_many(self, keys, version=None, client=None):
+                self.clients.append(client)
+                return super().get_many(keys, version)
+        
+        metrics._instrument_cache_class(ClientCache)
+        backend = ClientCache('metrics-test', {})
+        backend.set('clave', 1, version=2)
+        
+        self.assertEqual(backend.get('clave', 'defecto', 2, client='primario'), 1)
+        self.assertEqual(backend.get('clave', 'defecto', version=3), 'defecto')
+        self.assertEqual(backend.get_many(['clave'], version=2, client='replica'), {'clave': 1})
+        self.assertEqual(ClientCache.clients[:3], ['primario', None, 'replica'])
+    
+    def test_celery_task_runtime(self):
+        """Las señales de Celery alimentan el histograma de duración"""
+        task = type('Task', (), {'name': 'backend.apps.core.tasks.collect_system_metrics'})()
+        before = metrics.TASK_DURATION.labels(task.name)._sum.get()
+        
+        metrics._task_started(task_id='abc')
+        metrics._task_finished(task_id='abc', task=task, state='SUCCESS')
+        
+        self.assertGreater(metrics.TASK_DURATION.labels(task.name)._sum.get(), before)
+        self.assertGreaterEqual(metrics.TASKS_TOTAL.labels(task.name, 'SUCCESS')._value.get(), 1)
+
+
+class QueryBudgetTest(TestCase):
+    """Tests para el presupuesto de consultas y la detección de N+1"""
+    
+    def setUp(self):
+        for index in range(4):
+            Dress.objects.create(name=f'Vestido {index}', description='-', image=f'dresses/{index}.jpg', style='Sirena')
+    
+    def test_fingerprint(self):
+        """Consultas con distintos literales o listas IN comparten huella"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM "store_dress" WHERE "id" IN (%s, %s, %s) AND "name" = \'a\''),
+            fingerprint('SELECT *  FROM "store_dress" WHERE "id" IN (%s, %s) AND "name" = \'bb\''),
+        )
+        self.assertNotEqual(fingerprint('SELECT 1 FROM a'), fingerprint('SELECT 1 FROM b'))
+    
+    def test_detects_repeated_queries(self):
+        """Una consulta por fila en un bucle es un N+1 con su pila de llamadas"""
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(max_repeats=2):
+                for dress in Dress.objects.all():
+                    Dress.objects.filter(pk=dress.pk).exists()
+        
+        message = str(raised.exception)
+        self.assertIn('Posible N+1: 4 consultas', message)
+        self.assertIn('test_detects_repeated_queries', message)
+        
+        with query_budget(max_queries=1, max_repeats=0) as recorder:
+            list(Dress.objects.all())
+        self.assertEqual(recorder.count, 1)
+    
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={'structured_data': {'max_queries': 0}})
+    def test_middleware_budget_per_view(self):
+        """El presupuesto por vista hace fallar la request en CI"""
+        cache.clear()
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('structured_data', args=['dresses']))
+        
+        # Ya en cache: sin consultas, dentro del presupuesto
+        response = self.client.get(reverse('structured_data', args=['dresses']))
+        self.assertEqual(response['X-Query-Count'], '0')
@@ -1,9 +1,10 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
+from django.db import transaction
 from backend.apps.appointments.models import Appointment
 from .models import ReminderSchedule
-from .services_adapted import AppointmentNotificationService
+from backend.apps.appointments.services import NotificationService
 import logging
 from datetime import datetime, timedelta
 
@@ -19,16 +20,17 @@ def appointment_created_handler(sender, instance, created, **kwargs):
     if created:
         logger.info(f"Nueva cita creada: {instance.id}")
         
-        # Enviar confirmación inmediata
+        # Encolar la confirmación: se publica en Celery tras el commit,
+        # fuera del ciclo petición/respuesta
         try:
-            AppointmentNotificationService.send_appointment_confirmation(instance)
-            logger.info(f"Confirmación enviada para cita: {instance.id}")
+            NotificationService.queue_confirmation(instance)
         except Exception as e:
-            logger.error(f"Error enviando confirmación para cita {instance.id}: {str(e)}")
+            logger.error(f"Error encolando confirmación para cita {instance.id}: {str(e)}")
         
         # Programar recordatorios automáticos
         try:
-            schedule_appointment_reminders(instance)
+            with transaction.atomic():
+                schedule_appointment_reminders(instance)
             logger.info(f"Recordatorios programados para cita: {instance.id}")
         except Exception as e:
             logger.error(f"Error programando recordatorios para cita {instance.id}: {str(e)}")
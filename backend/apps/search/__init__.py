@@ -0,0 +1 @@
+# Búsqueda de texto completo (vestidos y testimonios)
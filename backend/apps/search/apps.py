@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.apps.search'
+    verbose_name = 'Búsqueda'
+    
+    def ready(self):
+        import backend.apps.search.signals
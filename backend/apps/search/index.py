@@ -0,0 +1,244 @@
+"""
+Índice de búsqueda de texto completo sobre vestidos y testimonios
+
+- Cada vestido/testimonio público tiene un SearchDocument (título, palabras
+  clave y cuerpo) que las señales actualizan al guardar o borrar el
+  original. Los vestidos no disponibles no se indexan.
+- PostgreSQL: tsvector generado con la configuración 'spanish' (stemming) e
+  índice GIN; ranking con ts_rank_cd y resaltado con ts_headline.
+- SQLite (desarrollo/tests): tabla FTS5 sincronizada por triggers; ranking
+  bm25 y resaltado con highlight()/snippet(). Sin stemming: cada término se
+  busca como prefijo.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+from backend.apps.store.models import Dress
+from backend.apps.testimonials.models import BrideTestimonial
+
+from .models import SearchDocument
+
+# Marcas de resaltado internas: se sustituyen por <mark> después de escapar el texto
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+SEARCH_CONFIG = 'spanish'
+FTS_TABLE = 'search_documents_fts'
+
+# Pesos de las columnas (título, palabras clave, cuerpo) para bm25 en SQLite
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def dress_document(dress):
+    return {
+        'title': dress.name,
+        'keywords': dress.style,
+        'body': dress.description,
+    }
+
+
+def testimonial_document(testimonial):
+    return {
+        'title': testimonial.bride_name,
+        'keywords': '',
+        'body': testimonial.testimonial,
+    }
+
+
+# Modelo -> (tipo de documento, constructor, campos indexados, filtro de objetos públicos)
+INDEXED_MODELS = {
+    Dress: ('dress', dress_document, {'name', 'style', 'description', 'available'}, {'available': True}),
+    BrideTestimonial: ('testimonial', testimonial_document, {'bride_name', 'testimonial'}, {}),
+}
+
+
+def render_highlight(text):
+    """Escapar el texto y convertir las marcas internas en <mark>"""
+    return (
+        escape(text or '')
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_STOP, '</mark>')
+    )
+
+
+def fts5_query(query):
+    """Consulta FTS5 segura: cada palabra entre comillas y como prefijo (AND implícito)"""
+    terms = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class SearchIndex:
+    """Mantenimiento y consulta del índice de búsqueda"""
+    
+    @staticmethod
+    def _spec(instance):
+        return INDEXED_MODELS.get(type(instance))
+    
+    @classmethod
+    def index(cls, instance, update_fields=None):
+        """Crear o actualizar el documento de un objeto público (incremental, una fila)"""
+        spec = cls._spec(instance)
+        if spec is None:
+            return None
+        kind, build_document, indexed_fields, public_filter = spec
+        
+        # Guardados parciales que no tocan campos indexados (p. ej. derivados de imagen)
+        if update_fields is not None and not indexed_fields & set(update_fields):
+            return None
+        
+        # Los objetos que dejan de ser públicos salen del índice
+        if any(getattr(instance, field) != value for field, value in public_filter.items()):
+            cls.remove(instance)
+            return None
+        
+        document, _ = SearchDocument.objects.update_or_create(
+            kind=kind,
+            object_id=instance.pk,
+            defaults=build_document(instance)
+        )
+        return document
+    
+    @classmethod
+    def remove(cls, instance):
+        spec = cls._spec(instance)
+        if spec is not None:
+            SearchDocument.objects.filter(kind=spec[0], object_id=instance.pk).delete()
+    
+    @classmethod
+    def rebuild(cls):
+        """Reconstruir el índice completo. Devuelve el número de documentos"""
+        SearchDocument.objects.all().delete()
+        documents = [
+            SearchDocument(kind=kind, object_id=instance.pk, **build_document(instance))
+            for model, (kind, build_document, _, public_filter) in INDEXED_MODELS.items()
+            for instance in model.objects.filter(**public_filter).iterator()
+        ]
+        SearchDocument.objects.bulk_create(documents, batch_size=500)
+        return len(documents)
+    
+    @classmethod
+    def search(cls, query, kind=None, limit=10, offset=0):
+        """
+        Buscar documentos ordenados por relevancia.
+        Devuelve (total, resultados) con título y fragmento resaltados.
+        """
+        query = (query or '').strip()
+        if not query:
+            return 0, []
+        
+        if connection.vendor == 'postgresql':
+            total, rows = cls._search_postgresql(query, kind, limit, offset)
+        elif connection.vendor == 'sqlite':
+            total, rows = cls._search_sqlite(query, kind, limit, offset)
+        else:
+            total, rows = cls._search_fallback(query, kind, limit, offset)
+        
+        results = [
+            {
+                'type': row_kind,
+                'id': object_id,
+                'title': render_highlight(title),
+                'snippet': render_highlight(snippet),
+                'score': round(float(score), 4),
+            }
+            for row_kind, object_id, title, snippet, score in rows
+        ]
+        return total, results
+    
+    @staticmethod
+    def _search_postgresql(query, kind, limit, offset):
+        kind_filter = 'AND kind = %s' if kind else ''
+        kind_params = [kind] if kind else []
+        headline = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}'
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM search_documents "
+                f"WHERE search_vector @@ websearch_to_tsquery(%s, %s) {kind_filter}",
+                [SEARCH_CONFIG, query, *kind_params]
+            )
+            total = cursor.fetchone()[0]
+            if not total:
+                return 0, []
+            
+            # ts_headline es costoso: solo se calcula para las filas de la página
+            cursor.execute(
+                f"""
+                WITH query AS (SELECT websearch_to_tsquery(%s, %s) AS q),
+                page AS (
+                    SELECT id, kind, object_id, title, body, ts_rank_cd(search_vector, query.q, 32) AS rank
+                    FROM search_documents, query
+                    WHERE search_vector @@ query.q {kind_filter}
+                    ORDER BY rank DESC, id
+                    LIMIT %s OFFSET %s
+                )
+                SELECT page.kind, page.object_id,
+                       ts_headline(%s, page.title, query.q, %s),
+                       ts_headline(%s, page.body, query.q, %s),
+                       page.rank
+                FROM page, query
+                ORDER BY page.rank DESC, page.id
+                """,
+                [
+                    SEARCH_CONFIG, query, *kind_params, limit, offset,
+                    SEARCH_CONFIG, f'{headline}, HighlightAll=true',
+                    SEARCH_CONFIG, f'{headline}, MaxFragments=2, MaxWords=30, MinWords=10',
+                ]
+            )
+            return total, cursor.fetchall()
+    
+    @staticmethod
+    def _search_sqlite(query, kind, limit, offset):
+        match = fts5_query(query)
+        if not match:
+            return 0, []
+        kind_filter = 'AND d.kind = %s' if kind else ''
+        kind_params = [kind] if kind else []
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} JOIN search_documents d ON d.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s {kind_filter}",
+                [match, *kind_params]
+            )
+            total = cursor.fetchone()[0]
+            if not total:
+                return 0, []
+            
+            cursor.execute(
+                f"""
+                SELECT d.kind, d.object_id,
+                       highlight({FTS_TABLE}, 0, %s, %s),
+                       snippet({FTS_TABLE}, 2, %s, %s, '…', 30),
+                       -bm25({FTS_TABLE}, {weights}) AS score
+                FROM {FTS_TABLE}
+                JOIN search_documents d ON d.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s {kind_filter}
+                ORDER BY score DESC, d.id
+                LIMIT %s OFFSET %s
+                """,
+                [
+                    HIGHLIGHT_START, HIGHLIGHT_STOP,
+                    HIGHLIGHT_START, HIGHLIGHT_STOP,
+                    match, *kind_params, limit, offset,
+                ]
+            )
+            return total, cursor.fetchall()
+    
+    @staticmethod
+    def _search_fallback(query, kind, limit, offset):
+        """Otros motores: búsqueda por subcadena sin ranking ni resaltado"""
+        documents = SearchDocument.objects.filter(title__icontains=query) | \
+            SearchDocument.objects.filter(keywords__icontains=query) | \
+            SearchDocument.objects.filter(body__icontains=query)
+        if kind:
+            documents = documents.filter(kind=kind)
+        documents = documents.order_by('id')
+        rows = [
+            (document.kind, document.object_id, document.title, document.body[:200], 0.0)
+            for document in documents[offset:offset + limit]
+        ]
+        return documents.count(), rows
@@ -0,0 +1,14 @@
+"""
+Reconstruir el índice de búsqueda de vestidos y testimonios
+"""
+from django.core.management.base import BaseCommand
+
+from backend.apps.search.index import SearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de texto completo'
+    
+    def handle(self, *args, **options):
+        total = SearchIndex.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido: {total} documentos'))
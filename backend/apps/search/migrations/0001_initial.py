@@ -0,0 +1,117 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+POSTGRESQL_INDEX = [
+    """
+    ALTER TABLE search_documents ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(keywords, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX search_documents_vector_idx ON search_documents USING GIN (search_vector)',
+]
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE search_documents_fts USING fts5(
+        title, keywords, body,
+        content='search_documents', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER search_documents_fts_insert AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_documents_fts(rowid, title, keywords, body)
+        VALUES (new.id, new.title, new.keywords, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_fts_delete AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, keywords, body)
+        VALUES ('delete', old.id, old.title, old.keywords, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_documents_fts_update AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_documents_fts(search_documents_fts, rowid, title, keywords, body)
+        VALUES ('delete', old.id, old.title, old.keywords, old.body);
+        INSERT INTO search_documents_fts(rowid, title, keywords, body)
+        VALUES (new.id, new.title, new.keywords, new.body);
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS search_documents_fts_insert',
+    'DROP TRIGGER IF EXISTS search_documents_fts_delete',
+    'DROP TRIGGER IF EXISTS search_documents_fts_update',
+    'DROP TABLE IF EXISTS search_documents_fts',
+]
+
+
+def create_full_text_index(apps, schema_editor):
+    """
+    Índice de texto completo según el motor: tsvector + GIN en PostgreSQL,
+    tabla FTS5 sincronizada por triggers en SQLite
+    """
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_INDEX, 'sqlite': SQLITE_INDEX}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_full_text_index(apps, schema_editor):
+    # En PostgreSQL la columna y el índice desaparecen con la tabla
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+def populate_search_documents(apps, schema_editor):
+    """Indexar los vestidos y testimonios existentes"""
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    Dress = apps.get_model('store', 'Dress')
+    BrideTestimonial = apps.get_model('testimonials', 'BrideTestimonial')
+    
+    documents = [
+        SearchDocument(kind='dress', object_id=dress.pk, title=dress.name, keywords=dress.style, body=dress.description)
+        for dress in Dress.objects.filter(available=True).iterator()
+    ] + [
+        SearchDocument(kind='testimonial', object_id=testimonial.pk, title=testimonial.bride_name, body=testimonial.testimonial)
+        for testimonial in BrideTestimonial.objects.iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    
+    initial = True
+    
+    dependencies = [
+        ('store', '0006_catalog_filter_indexes'),
+        ('testimonials', '0004_created_cursor_index'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('dress', 'Vestido'), ('testimonial', 'Testimonio')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('keywords', models.CharField(blank=True, max_length=200)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'search_documents',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique_object')],
+            },
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
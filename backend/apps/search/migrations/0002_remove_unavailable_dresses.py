@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:20
+
+from django.db import migrations
+
+
+def remove_unavailable_dresses(apps, schema_editor):
+    """Quitar del índice los vestidos no disponibles indexados por 0001"""
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    Dress = apps.get_model('store', 'Dress')
+    
+    hidden = Dress.objects.filter(available=False).values_list('pk', flat=True)
+    SearchDocument.objects.filter(kind='dress', object_id__in=list(hidden)).delete()
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+    
+    operations = [
+        migrations.RunPython(remove_unavailable_dresses, migrations.RunPython.noop),
+    ]
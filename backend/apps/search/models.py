@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Documento del índice de búsqueda: una fila por vestido o testimonio.
+    El índice de texto completo vive fuera del ORM (ver migración 0001):
+    - PostgreSQL: columna generada search_vector (tsvector, 'spanish') con índice GIN
+    - SQLite: tabla virtual FTS5 search_documents_fts sincronizada por triggers
+    """
+    KIND_CHOICES = [
+        ('dress', 'Vestido'),
+        ('testimonial', 'Testimonio'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)  # Peso A
+    keywords = models.CharField(max_length=200, blank=True)  # Peso B
+    body = models.TextField(blank=True)  # Peso C
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_documents'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique_object'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}#{self.object_id} - {self.title}"
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from .models import SearchDocument
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Parámetros de la búsqueda (?q=&type=&page=&page_size=)"""
+    q = serializers.CharField(max_length=200, trim_whitespace=True)
+    type = serializers.ChoiceField(choices=SearchDocument.KIND_CHOICES, required=False)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=50, default=10)
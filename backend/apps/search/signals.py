@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.apps.store.models import Dress
+from backend.apps.testimonials.models import BrideTestimonial
+from .index import SearchIndex
+
+
+@receiver(post_save, sender=Dress)
+@receiver(post_save, sender=BrideTestimonial)
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Actualizar el documento de búsqueda del objeto guardado"""
+    if not raw:
+        SearchIndex.index(instance, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=Dress)
+@receiver(post_delete, sender=BrideTestimonial)
+def remove_search_document(sender, instance, **kwargs):
+    """Quitar del índice los objetos borrados"""
+    SearchIndex.remove(instance)
@@ -0,0 +1,99 @@
+"""
+Tests de la búsqueda de texto completo
+"""
+from datetime import date
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from backend.apps.search.index import SearchIndex
+from backend.apps.search.models import SearchDocument
+from backend.apps.store.models import Dress
+from backend.apps.testimonials.models import BrideTestimonial
+
+
+class SearchTest(APITestCase):
+    """Tests para el índice y el endpoint de búsqueda"""
+    
+    def setUp(self):
+        self.sirena = Dress.objects.create(
+            name='Vestido Sirena Encaje',
+            description='Corte sirena con encaje francés y espalda descubierta',
+            image='dresses/sirena.jpg',
+            style='Sirena',
+        )
+        self.princesa = Dress.objects.create(
+            name='Vestido Princesa',
+            description='Falda de tul con detalles de encaje <b>bordado</b>',
+            image='dresses/princesa.jpg',
+            style='Princesa',
+        )
+        self.testimonial = BrideTestimonial.objects.create(
+            bride_name='Lucía',
+            testimonial='Encontré mi vestido de novia soñado, un diseño sirena precioso',
+            image='testimonials/lucia.jpg',
+            wedding_date=date(2025, 6, 14),
+        )
+    
+    def test_index_updated_incrementally_on_save(self):
+        """Guardar o borrar un objeto actualiza solo su documento"""
+        self.assertEqual(SearchDocument.objects.count(), 3)
+        
+        self.princesa.description = 'Falda de organza'
+        self.princesa.save()
+        document = SearchDocument.objects.get(kind='dress', object_id=self.princesa.pk)
+        self.assertEqual(document.body, 'Falda de organza')
+        
+        # Los guardados parciales de campos no indexados no reescriben el documento
+        with self.assertNumQueries(1):
+            self.princesa.save(update_fields=['image_renditions'])
+        
+        self.princesa.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='dress', object_id=self.princesa.pk).exists())
+    
+    def test_unavailable_dresses_not_searchable(self):
+        """Los vestidos no disponibles salen del índice y vuelven al reactivarlos"""
+        self.sirena.available = False
+        self.sirena.save(update_fields=['available'])
+        response = self.client.get(reverse('search'), {'q': 'sirena', 'type': 'dress'})
+        self.assertEqual(response.data['count'], 0)
+        
+        Dress.objects.create(name='Sirena Oculta', description='-', image='dresses/oculta.jpg', style='Sirena', available=False)
+        self.assertEqual(SearchIndex.rebuild(), 2)
+        self.assertFalse(SearchDocument.objects.filter(kind='dress', title='Sirena Oculta').exists())
+        
+        self.sirena.available = True
+        self.sirena.save()
+        response = self.client.get(reverse('search'), {'q': 'sirena', 'type': 'dress'})
+        self.assertEqual([result['id'] for result in response.data['results']], [self.sirena.pk])
+    
+    def test_ranked_highlighted_results(self):
+        """Los resultados salen ordenados por relevancia, resaltados y escapados"""
+        response = self.client.get(reverse('search'), {'q': 'sirena'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        
+        first = response.data['results'][0]
+        self.assertEqual((first['type'], first['id']), ('dress', self.sirena.pk))
+        self.assertEqual(first['title'], 'Vestido <mark>Sirena</mark> Encaje')
+        self.assertIn('<mark>sirena</mark>', response.data['results'][1]['snippet'])
+        
+        response = self.client.get(reverse('search'), {'q': 'bordado'})
+        self.assertIn('&lt;b&gt;<mark>bordado</mark>&lt;/b&gt;', response.data['results'][0]['snippet'])
+    
+    def test_filter_and_pagination(self):
+        """Filtro por tipo y paginación con enlaces next/previous"""
+        response = self.client.get(reverse('search'), {'q': 'encaje', 'page_size': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+        
+        response = self.client.get(reverse('search'), {'q': 'sirena', 'type': 'testimonial'})
+        self.assertEqual([result['id'] for result in response.data['results']], [self.testimonial.pk])
+        
+        response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,36 @@
+from rest_framework import viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .index import SearchIndex
+from .serializers import SearchQuerySerializer
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Búsqueda de texto completo sobre vestidos y testimonios
+    GET /api/search/?q=sirena&type=dress&page=1&page_size=10
+    """
+    permission_classes = [AllowAny]
+    
+    def list(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        page = params.validated_data['page']
+        page_size = params.validated_data['page_size']
+        
+        total, results = SearchIndex.search(
+            params.validated_data['q'],
+            kind=params.validated_data.get('type'),
+            limit=page_size,
+            offset=(page - 1) * page_size
+        )
+        
+        url = request.build_absolute_uri()
+        return Response({
+            'query': params.validated_data['q'],
+            'count': total,
+            'next': replace_query_param(url, 'page', page + 1) if page * page_size < total else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': results,
+        })
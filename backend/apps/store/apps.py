@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class StoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.apps.store'
+    verbose_name = 'Tienda'
+    
+    def ready(self):
+        import backend.apps.store.signals
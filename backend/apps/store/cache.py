@@ -0,0 +1,106 @@
+"""
+Cache versionada del catálogo de vestidos
+
+- Cada respuesta GET del catálogo se guarda con su ETag fuerte (hash del JSON)
+  bajo una clave que incluye la versión actual del catálogo.
+- Guardar o borrar un Dress/DressImage incrementa la versión: las entradas
+  antiguas dejan de usarse y caducan solas (no hace falta borrar por patrón).
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class CatalogCache:
+    """Cache de respuestas del catálogo con ETag/Last-Modified"""
+    
+    VERSION_KEY = 'catalog:version'
+    LAST_MODIFIED_KEY = 'catalog:last_modified'
+    KEY_PREFIX = 'catalog:response'
+    
+    # Las entradas de versiones antiguas caducan solas
+    TIMEOUT = 60 * 60
+    
+    @classmethod
+    def get_version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, 1, None)
+            cache.add(cls.LAST_MODIFIED_KEY, int(time.time()), None)
+            version = cache.get(cls.VERSION_KEY, 1)
+        return version
+    
+    @classmethod
+    def get_last_modified(cls):
+        last_modified = cache.get(cls.LAST_MODIFIED_KEY)
+        if last_modified is None:
+            last_modified = int(time.time())
+            cache.add(cls.LAST_MODIFIED_KEY, last_modified, None)
+        return last_modified
+    
+    @classmethod
+    def invalidate(cls):
+        """Invalidar todo el catálogo cacheado (nueva versión)"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 2, None)
+        cache.set(cls.LAST_MODIFIED_KEY, int(time.time()), None)
+    
+    @classmethod
+    def _key(cls, request, version):
+        # URL absoluta (esquema incluido): los cuerpos llevan URLs de imagen absolutas
+        raw = request.build_absolute_uri()
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        return f"{cls.KEY_PREFIX}:{version}:{digest}"
+    
+    @staticmethod
+    def _etag(data):
+        body = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+        return quote_etag(hashlib.sha256(body.encode('utf-8')).hexdigest())
+    
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
+    
+    @classmethod
+    def cached_response(cls, request, build_response):
+        """
+        Servir una respuesta GET del catálogo desde la cache.
+        build_response() solo se llama si no hay entrada para la versión actual.
+        """
+        version = cls.get_version()
+        key = cls._key(request, version)
+        entry = cache.get(key)
+        
+        if entry is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = {
+                'data': response.data,
+                'etag': cls._etag(response.data),
+                'last_modified': cls.get_last_modified(),
+            }
+            cache.set(key, entry, cls.TIMEOUT)
+        
+        if cls._not_modified(request, entry['etag'], entry['last_modified']):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+        
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
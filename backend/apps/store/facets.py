@@ -0,0 +1,79 @@
+"""
+Facetas del catálogo (recuentos por estilo y disponibilidad)
+
+- Se precalcula una tabla (style, available, count) con una sola consulta
+  GROUP BY y se guarda en la cache sin caducidad.
+- Las señales de Dress la recalculan tras cada commit, así las peticiones
+  de facetas nunca tocan la base de datos.
+- Los recuentos de cada faceta se filtran por la otra (facetas disyuntivas),
+  de modo que el selector de estilos refleja el filtro de disponibilidad.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Dress
+
+
+class CatalogFacets:
+    """Recuentos precalculados por estilo y disponibilidad"""
+    
+    CACHE_KEY = 'catalog:facets'
+    
+    @staticmethod
+    def compute():
+        rows = (
+            Dress.objects.order_by()
+            .values('style', 'available')
+            .annotate(count=Count('id'))
+        )
+        return [(row['style'], row['available'], row['count']) for row in rows]
+    
+    @classmethod
+    def refresh(cls):
+        """Recalcular y guardar la tabla de recuentos"""
+        table = cls.compute()
+        cache.set(cls.CACHE_KEY, table, None)
+        return table
+    
+    @classmethod
+    def get_table(cls):
+        table = cache.get(cls.CACHE_KEY)
+        if table is None:
+            table = cls.refresh()
+        return table
+    
+    @classmethod
+    def facets(cls, style=None, available=None):
+        """
+        Recuentos para los filtros actuales:
+        - style: recuento por estilo con el filtro de disponibilidad aplicado
+        - available: recuento por disponibilidad con el filtro de estilo aplicado
+        - total: vestidos que cumplen ambos filtros
+        """
+        styles = {}
+        availability = {True: 0, False: 0}
+        total = 0
+        
+        for row_style, row_available, count in cls.get_table():
+            style_matches = style is None or row_style == style
+            available_matches = available is None or row_available == available
+            # Los estilos sin resultados se listan con 0 para no vaciar el selector
+            styles.setdefault(row_style, 0)
+            if available_matches:
+                styles[row_style] += count
+            if style_matches:
+                availability[row_available] += count
+            if style_matches and available_matches:
+                total += count
+        
+        return {
+            'total': total,
+            'style': [
+                {'value': value, 'count': count}
+                for value, count in sorted(styles.items())
+            ],
+            'available': [
+                {'value': value, 'count': availability[value]}
+                for value in (True, False)
+            ],
+        }
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+def resolve_existing_images(apps, schema_editor):
+    """Resolver una vez la existencia de las imágenes ya subidas"""
+    for model_name in ('Dress', 'DressImage'):
+        model = apps.get_model('store', model_name)
+        for obj in model.objects.exclude(image=''):
+            if obj.image.storage.exists(obj.image.name):
+                model.objects.filter(pk=obj.pk).update(image_exists=True)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('store', '0002_dressimage'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='dress',
+            name='image_exists',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='dressimage',
+            name='image_exists',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(resolve_existing_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dress',
+            index=models.Index(fields=['-created_at', '-id'], name='store_dress_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_created_cursor_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dress',
+            index=models.Index(fields=['style', '-created_at', '-id'], name='store_dress_style_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dress',
+            index=models.Index(fields=['available', '-created_at', '-id'], name='store_dress_available_idx'),
+        ),
+    ]
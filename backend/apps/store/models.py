@@ -1,20 +1,49 @@
 from django.db import models
 
+
+def sync_image_exists(instance):
+    """
+    Resolver una sola vez, al guardar, si el archivo de la imagen existe
+    (las lecturas del catálogo no tocan el sistema de archivos)
+    """
+    exists = bool(instance.image) and instance.image.storage.exists(instance.image.name)
+    if exists != instance.image_exists:
+        instance.image_exists = exists
+        type(instance).objects.filter(pk=instance.pk).update(image_exists=exists)
+
 class Dress(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     image = models.ImageField(upload_to='dresses/')  # Imagen principal
+    image_exists = models.BooleanField(default=False, editable=False)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # Derivados responsive
     style = models.CharField(max_length=50)
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Paginación por cursor del catálogo
+            models.Index(fields=['-created_at', '-id'], name='store_dress_created_idx'),
+            # Filtros del catálogo (con el mismo orden que la paginación)
+            models.Index(fields=['style', '-created_at', '-id'], name='store_dress_style_idx'),
+            models.Index(fields=['available', '-created_at', '-id'], name='store_dress_available_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # El archivo ya está guardado en el storage tras super().save()
+        sync_image_exists(self)
+
 class DressImage(models.Model):
     """Imágenes adicionales para cada vestido"""
     dress = models.ForeignKey(Dress, related_name='additional_images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='dresses/additional/')
+    image_exists = models.BooleanField(default=False, editable=False)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # Derivados responsive
     order = models.PositiveIntegerField(default=0)  # Para ordenar las imágenes
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -23,3 +52,7 @@ class DressImage(models.Model):
 
     def __str__(self):
         return f"{self.dress.name} - Imagen {self.order}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        sync_image_exists(self)
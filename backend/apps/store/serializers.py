@@ -1,47 +1,53 @@
 from rest_framework import serializers
+from backend.apps.core.images import ImageRenditionService
+from backend.apps.core.serializers import SparseFieldsetMixin
 from .models import Dress, DressImage
-import os
-from django.conf import settings
 
 class DressImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = DressImage
-        fields = ['id', 'image', 'order']
+        fields = ['id', 'image', 'image_srcset', 'order']
     
     def get_image(self, obj):
         """Devuelve la URL completa de la imagen o un placeholder si no existe"""
-        if obj.image:
-            # Verificar si el archivo existe físicamente
-            image_path = os.path.join(settings.MEDIA_ROOT, str(obj.image))
-            if os.path.exists(image_path):
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(obj.image.url)
-                return obj.image.url
+        # La existencia del archivo se resuelve al subirlo (image_exists), no en cada petición
+        if obj.image and obj.image_exists:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.image.url)
+            return obj.image.url
         
         # Si no existe la imagen, devolver placeholder
         return "https://picsum.photos/400/600?random=1"
+    
+    def get_image_srcset(self, obj):
+        """Derivados responsive por formato ({'avif': 'url 320w, ...', 'webp': ..., 'jpeg': ...})"""
+        return ImageRenditionService.build_srcset(obj, self.context.get('request'))
 
-class DressSerializer(serializers.ModelSerializer):
+class DressSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     additional_images = DressImageSerializer(many=True, read_only=True)
     
     class Meta:
         model = Dress
-        fields = ['id', 'name', 'description', 'image', 'additional_images', 'style', 'available', 'created_at']
+        fields = ['id', 'name', 'description', 'image', 'image_srcset', 'additional_images', 'style', 'available', 'created_at']
     
     def get_image(self, obj):
         """Devuelve la URL completa de la imagen principal o un placeholder si no existe"""
-        if obj.image:
-            # Verificar si el archivo existe físicamente
-            image_path = os.path.join(settings.MEDIA_ROOT, str(obj.image))
-            if os.path.exists(image_path):
-                request = self.context.get('request')
-                if request:
-                    return request.build_absolute_uri(obj.image.url)
-                return obj.image.url
+        # La existencia del archivo se resuelve al subirlo (image_exists), no en cada petición
+        if obj.image and obj.image_exists:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.image.url)
+            return obj.image.url
         
         # Si no existe la imagen, devolver placeholder
         return "https://picsum.photos/400/600?random=1"
+    
+    def get_image_srcset(self, obj):
+        """Derivados responsive por formato ({'avif': 'url 320w, ...', 'webp': ..., 'jpeg': ...})"""
+        return ImageRenditionService.build_srcset(obj, self.context.get('request'))
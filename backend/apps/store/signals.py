@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from backend.apps.core.images import ImageRenditionService
+from .cache import CatalogCache
+from .facets import CatalogFacets
+from .models import Dress, DressImage
+
+
+@receiver([post_save, post_delete], sender=Dress)
+@receiver([post_save, post_delete], sender=DressImage)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    """
+    Cualquier cambio en vestidos o sus imágenes invalida la cache del catálogo
+    tras el commit: antes, un GET concurrente volvería a cachear los datos
+    antiguos (o sin image_exists actualizado) bajo la versión nueva
+    """
+    transaction.on_commit(CatalogCache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Dress)
+def refresh_catalog_facets(sender, instance, **kwargs):
+    """Recalcular los recuentos por estilo/disponibilidad tras el commit"""
+    transaction.on_commit(CatalogFacets.refresh)
+
+
+@receiver(post_save, sender=Dress)
+@receiver(post_save, sender=DressImage)
+def queue_image_renditions(sender, instance, raw=False, **kwargs):
+    """Generar en segundo plano los derivados responsive de una imagen nueva"""
+    if not raw:
+        ImageRenditionService.queue(instance)
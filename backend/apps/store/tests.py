@@ -0,0 +1,226 @@
+"""
+Tests del catálogo de vestidos
+"""
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from backend.apps.core.images import generate_image_renditions
+from backend.apps.core.sitemaps import generate_sitemap
+from backend.apps.store.cache import CatalogCache
+from backend.apps.store.facets import CatalogFacets
+from backend.apps.store.models import Dress, DressImage
+
+# GIF de 1x1 píxel
+TINY_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DressCatalogTest(APITestCase):
+    """Tests para la cache del catálogo"""
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+    
+    def setUp(self):
+        cache.clear()
+        # La regeneración del sitemap no forma parte de estos tests
+        sitemap_patcher = patch.object(generate_sitemap, 'apply_async')
+        sitemap_patcher.start()
+        self.addCleanup(sitemap_patcher.stop)
+        for i in range(3):
+            dress = Dress.objects.create(
+                name=f'Vestido {i}',
+                description='Descripción',
+                image=SimpleUploadedFile(f'dress{i}.gif', TINY_GIF, content_type='image/gif'),
+                style='Sirena',
+            )
+            for order in range(2):
+                DressImage.objects.create(
+                    dress=dress,
+                    image=SimpleUploadedFile(f'extra{i}{order}.gif', TINY_GIF, content_type='image/gif'),
+                    order=order,
+                )
+    
+    def test_image_existence_resolved_on_upload(self):
+        """La existencia de la imagen se guarda al subirla"""
+        dress = Dress.objects.first()
+        self.assertTrue(dress.image_exists)
+        
+        missing = Dress.objects.create(name='Sin imagen', description='-', image='dresses/missing.jpg', style='Corte A')
+        self.assertFalse(missing.image_exists)
+        
+        response = self.client.get(reverse('dress-detail', args=[missing.pk]))
+        self.assertTrue(response.data['image'].startswith('https://picsum.photos/'))
+    
+    def test_list_is_cached_with_etag(self):
+        """El listado se calcula con consultas constantes y luego sale de la cache"""
+        url = reverse('dress-list')
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(response.data['results'][0]['additional_images']), 2)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['ETag'], etag)
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    @override_settings(USE_CLOUDFLARE=True, DEBUG=False)
+    def test_cache_headers_preserved_behind_cloudflare(self):
+        """Con Cloudflare el catálogo conserva su Cache-Control y el resto del API no se cachea"""
+        cloudflare = {'REMOTE_ADDR': '173.245.48.1', 'HTTP_CF_CONNECTING_IP': '203.0.113.10'}
+        response = self.client.get(reverse('dress-list'), **cloudflare)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        
+        response = self.client.get(reverse('search'), {'q': 'vestido'}, **cloudflare)
+        self.assertEqual(response['Cache-Control'], 'no-cache, no-store, must-revalidate')
+    
+    def test_cache_key_includes_scheme(self):
+        """Una request http no envenena la entrada cacheada de https"""
+        url = reverse('dress-list')
+        http = self.client.get(url)
+        https = self.client.get(url, secure=True)
+        self.assertTrue(http.data['results'][0]['image'].startswith('http://'))
+        self.assertTrue(https.data['results'][0]['image'].startswith('https://'))
+    
+    def test_cache_invalidated_on_save(self):
+        """Guardar un vestido invalida la cache y cambia el ETag"""
+        url = reverse('dress-list')
+        etag = self.client.get(url)['ETag']
+        
+        dress = Dress.objects.first()
+        dress.available = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            dress.save()
+        # Dentro de la transacción la versión no cambia: nada se recachea con datos a medias
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn(CatalogCache.invalidate, callbacks)
+        CatalogCache.invalidate()
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertFalse(next(d for d in response.data['results'] if d['id'] == dress.id)['available'])
+    
+    def test_responsive_renditions_generated_after_upload(self):
+        """Al subir una imagen se encolan sus derivados y el serializer expone el srcset"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 1200), (240, 230, 220)).save(buffer, 'JPEG')
+        
+        with patch.object(generate_image_renditions, 'delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            dress = Dress.objects.create(
+                name='Vestido grande',
+                description='Descripción',
+                image=SimpleUploadedFile('grande.jpg', buffer.getvalue(), content_type='image/jpeg'),
+                style='Princesa',
+            )
+        delay.assert_called_once_with('store.Dress', dress.pk)
+        
+        response = self.client.get(reverse('dress-detail', args=[dress.pk]))
+        self.assertEqual(response.data['image_srcset'], {})
+        
+        generate_image_renditions('store.Dress', dress.pk)
+        dress.refresh_from_db()
+        
+        sources = dress.image_renditions['sources']
+        self.assertEqual(dress.image_renditions['source'], dress.image.name)
+        self.assertEqual(list(sources['jpeg']), ['320', '640', '800'])
+        self.assertIn('webp', sources)
+        for name in sources['jpeg'].values():
+            self.assertTrue(dress.image.storage.exists(name))
+        with dress.image.storage.open(sources['jpeg']['320']) as rendition:
+            self.assertEqual(Image.open(rendition).size, (320, 480))
+        
+        # Guardar de nuevo sin cambiar la imagen no vuelve a encolar nada
+        with patch.object(generate_image_renditions, 'delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            dress.save()
+        delay.assert_not_called()
+        
+        response = self.client.get(reverse('dress-detail', args=[dress.pk]))
+        srcset = response.data['image_srcset']
+        self.assertTrue(srcset['jpeg'].startswith('http://testserver/media/dresses/grande'))
+        self.assertTrue(srcset['jpeg'].endswith(' 800w'))
+    
+    def test_cursor_pagination_and_sparse_fields(self):
+        """El listado se pagina por cursor (created_at, id) y admite ?fields="""
+        url = reverse('dress-list')
+        seen = []
+        next_url = f"{url}?page_size=2"
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(dress['id'] for dress in response.data['results'])
+            next_url = response.data['next']
+        
+        expected = list(Dress.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        
+        # Sin imágenes adicionales no hay consulta de prefetch
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,name,image,style'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'image', 'style'})
+        
+        response = self.client.get(url, {'fields': 'id,precio'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_server_side_filters_and_cached_facets(self):
+        """Filtrado por estilo/disponibilidad en el servidor y facetas precalculadas"""
+        Dress.objects.create(name='Corte A', description='-', image='dresses/a.jpg', style='Corte A', available=False)
+        url = reverse('dress-list')
+        
+        response = self.client.get(url, {'style': 'Sirena'})
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(url, {'available': 'false'})
+        self.assertEqual([dress['name'] for dress in response.data['results']], ['Corte A'])
+        response = self.client.get(url, {'available': 'quizá'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        facets_url = reverse('dress-facets')
+        CatalogFacets.refresh()
+        with self.assertNumQueries(0):
+            response = self.client.get(facets_url)
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual(response.data['style'], [
+            {'value': 'Corte A', 'count': 1},
+            {'value': 'Sirena', 'count': 3},
+        ])
+        
+        response = self.client.get(facets_url, {'available': 'true'})
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['style'], [
+            {'value': 'Corte A', 'count': 0},
+            {'value': 'Sirena', 'count': 3},
+        ])
+        self.assertEqual(response.data['available'], [
+            {'value': True, 'count': 3},
+            {'value': False, 'count': 1},
+        ])
+        
+        # Las señales refrescan las facetas tras el commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Dress.objects.filter(style='Sirena').first().delete()
+        response = self.client.get(facets_url, {'style': 'Sirena'})
+        self.assertEqual(response.data['total'], 2)
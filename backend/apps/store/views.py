@@ -1,9 +1,63 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from backend.apps.core.pagination import CreatedAtCursorPagination
+from .cache import CatalogCache
+from .facets import CatalogFacets
 from .models import Dress
 from .serializers import DressSerializer
 
+BOOLEAN_VALUES = {
+    'true': True, '1': True,
+    'false': False, '0': False,
+}
+
 class DressViewSet(viewsets.ModelViewSet):
     queryset = Dress.objects.all()
     serializer_class = DressSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]  # Permitir lectura sin autenticación
+    pagination_class = CreatedAtCursorPagination
+    
+    def get_catalog_filters(self):
+        """Filtros ?style= y ?available= del catálogo (None si no se aplican)"""
+        style = self.request.query_params.get('style') or None
+        available = self.request.query_params.get('available')
+        if available is not None:
+            if available.lower() not in BOOLEAN_VALUES:
+                raise ValidationError({'available': 'Debe ser true o false'})
+            available = BOOLEAN_VALUES[available.lower()]
+        return style, available
+    
+    def get_queryset(self):
+        """Cargar solo lo que pide ?fields= (sin imágenes adicionales ni descripción si no se piden)"""
+        queryset = super().get_queryset()
+        
+        if self.action == 'list':
+            style, available = self.get_catalog_filters()
+            if style is not None:
+                queryset = queryset.filter(style=style)
+            if available is not None:
+                queryset = queryset.filter(available=available)
+        
+        fields = DressSerializer.requested_fields(self.request)
+        if fields is None or 'additional_images' in fields:
+            queryset = queryset.prefetch_related('additional_images')
+        if fields is not None and 'description' not in fields:
+            queryset = queryset.defer('description')
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """Listado servido desde la cache versionada del catálogo (ETag / 304)"""
+        return CatalogCache.cached_response(request, lambda: super(DressViewSet, self).list(request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Detalle servido desde la cache versionada del catálogo (ETag / 304)"""
+        return CatalogCache.cached_response(request, lambda: super(DressViewSet, self).retrieve(request, *args, **kwargs))
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Recuentos por estilo y disponibilidad para los filtros actuales (precalculados)"""
+        style, available = self.get_catalog_filters()
+        return Response(CatalogFacets.facets(style=style, available=available))
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class TestimonialsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.apps.testimonials'
+    verbose_name = 'Testimonios'
+    
+    def ready(self):
+        import backend.apps.testimonials.signals
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testimonials', '0003_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bridetestimonial',
+            index=models.Index(fields=['-created_at', '-id'], name='testimonial_created_idx'),
+        ),
+    ]
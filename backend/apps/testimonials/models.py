@@ -4,9 +4,16 @@ class BrideTestimonial(models.Model):
     bride_name = models.CharField(max_length=100)
     testimonial = models.TextField()
     image = models.ImageField(upload_to='testimonials/')  # Imagen principal
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)  # Derivados responsive
     wedding_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Paginación por cursor de los testimonios
+            models.Index(fields=['-created_at', '-id'], name='testimonial_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.bride_name} - {self.wedding_date}"
 
@@ -14,6 +21,7 @@ class TestimonialImage(models.Model):
     """Imágenes adicionales para cada testimonio"""
     testimonial = models.ForeignKey(BrideTestimonial, related_name='additional_images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='testimonials/additional/')
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     order = models.PositiveIntegerField(default=0)  # Para ordenar las imágenes
     created_at = models.DateTimeField(auto_now_add=True)
 
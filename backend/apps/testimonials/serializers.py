@@ -1,14 +1,17 @@
 from rest_framework import serializers
+from backend.apps.core.images import ImageRenditionService
+from backend.apps.core.serializers import SparseFieldsetMixin
 from .models import BrideTestimonial, TestimonialImage
 import os
 from django.conf import settings
 
 class TestimonialImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = TestimonialImage
-        fields = ['id', 'image', 'order']
+        fields = ['id', 'image', 'image_srcset', 'order']
     
     def get_image(self, obj):
         """Devuelve la URL completa de la imagen o un placeholder si no existe"""
@@ -23,14 +26,19 @@ class TestimonialImageSerializer(serializers.ModelSerializer):
         
         # Si no existe la imagen, devolver placeholder
         return "https://picsum.photos/400/400?random=1"
+    
+    def get_image_srcset(self, obj):
+        """Derivados responsive por formato ({'avif': 'url 320w, ...', 'webp': ..., 'jpeg': ...})"""
+        return ImageRenditionService.build_srcset(obj, self.context.get('request'))
 
-class BrideTestimonialSerializer(serializers.ModelSerializer):
+class BrideTestimonialSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     additional_images = TestimonialImageSerializer(many=True, read_only=True)
     
     class Meta:
         model = BrideTestimonial
-        fields = ['id', 'bride_name', 'testimonial', 'image', 'additional_images', 'wedding_date', 'created_at']
+        fields = ['id', 'bride_name', 'testimonial', 'image', 'image_srcset', 'additional_images', 'wedding_date', 'created_at']
     
     def get_image(self, obj):
         """Devuelve la URL completa de la imagen principal o un placeholder si no existe"""
@@ -45,3 +53,7 @@ class BrideTestimonialSerializer(serializers.ModelSerializer):
         
         # Si no existe la imagen, devolver placeholder
         return "https://picsum.photos/400/400?random=1"
+    
+    def get_image_srcset(self, obj):
+        """Derivados responsive por formato ({'avif': 'url 320w, ...', 'webp': ..., 'jpeg': ...})"""
+        return ImageRenditionService.build_srcset(obj, self.context.get('request'))
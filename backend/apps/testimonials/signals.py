@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from backend.apps.core.images import ImageRenditionService
+from .models import BrideTestimonial, TestimonialImage
+
+
+@receiver(post_save, sender=BrideTestimonial)
+@receiver(post_save, sender=TestimonialImage)
+def queue_image_renditions(sender, instance, raw=False, **kwargs):
+    """Generar en segundo plano los derivados responsive de una imagen nueva"""
+    if not raw:
+        ImageRenditionService.queue(instance)
@@ -1,5 +1,6 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from backend.apps.core.pagination import CreatedAtCursorPagination
 from .models import BrideTestimonial
 from .serializers import BrideTestimonialSerializer
 
@@ -7,3 +8,14 @@ class BrideTestimonialViewSet(viewsets.ModelViewSet):
     queryset = BrideTestimonial.objects.all()
     serializer_class = BrideTestimonialSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]  # Permitir lectura sin autenticación
+    pagination_class = CreatedAtCursorPagination
+    
+    def get_queryset(self):
+        """Cargar solo lo que pide ?fields= (sin imágenes adicionales ni texto si no se piden)"""
+        queryset = super().get_queryset()
+        fields = BrideTestimonialSerializer.requested_fields(self.request)
+        if fields is None or 'additional_images' in fields:
+            queryset = queryset.prefetch_related('additional_images')
+        if fields is not None and 'testimonial' not in fields:
+            queryset = queryset.defer('testimonial')
+        return queryset
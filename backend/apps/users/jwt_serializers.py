@@ -1,11 +1,11 @@
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import update_last_login
-from django.core.cache import cache
 from django.conf import settings
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from backend.apps.users.models import User
+from backend.middleware.ratelimit import RateLimiter
 import time
 import logging
 
@@ -113,22 +113,16 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     
     def _is_login_rate_limited(self, ip):
         """Verificar rate limiting para intentos de login"""
-        cache_key = f"login_attempts_{ip}"
-        attempts = cache.get(cache_key, 0)
-        
-        # Máximo 5 intentos por IP cada 15 minutos
-        return attempts >= 5
+        # Máximo 5 intentos fallidos por IP cada 15 minutos
+        return not RateLimiter.peek('login_failures', ip).allowed
     
     def _increment_failed_attempts(self, ip):
-        """Incrementar contador de intentos fallidos"""
-        cache_key = f"login_attempts_{ip}"
-        attempts = cache.get(cache_key, 0)
-        cache.set(cache_key, attempts + 1, 900)  # 15 minutos
+        """Incrementar contador de intentos fallidos (incremento atómico)"""
+        RateLimiter.hit('login_failures', ip)
     
     def _clear_failed_attempts(self, ip):
         """Limpiar contador de intentos fallidos"""
-        cache_key = f"login_attempts_{ip}"
-        cache.delete(cache_key)
+        RateLimiter.reset('login_failures', ip)
     
     def _log_failed_attempt(self, ip, login, reason):
         """Log de intento de login fallido"""
@@ -3,13 +3,15 @@ Middleware de seguridad avanzado para Orta Novias
 Incluye protecciones adicionales para producción
 """
 import logging
-import re
 import time
 from collections import defaultdict
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from .context import get_security_context
+from .headers import ADVANCED_SECURITY_HEADERS, HSTS_VALUE, apply_header_block, build_header_block
+from .ratelimit import RateLimiter
+from .scanner import ATTACK
 
 logger = logging.getLogger('django.security')
 
@@ -23,24 +25,6 @@ class AdvancedSecurityMiddleware(MiddlewareMixin):
     - Rate limiting por usuario y IP
     """
     
-    # Patrones sospechosos comunes
-    SUSPICIOUS_PATTERNS = [
-        r'union\s+select',
-        r'drop\s+table',
-        r'insert\s+into',
-        r'delete\s+from',
-        r'<script',
-        r'javascript:',
-        r'eval\(',
-        r'base64',
-        r'\.\./',
-        r'etc/passwd',
-        r'proc/self',
-        r'cmd=',
-        r'exec\(',
-        r'system\(',
-    ]
-    
     # User agents sospechosos
     SUSPICIOUS_USER_AGENTS = [
         'sqlmap',
@@ -53,45 +37,41 @@ class AdvancedSecurityMiddleware(MiddlewareMixin):
     ]
     
     # Extensiones de archivo peligrosas
-    DANGEROUS_EXTENSIONS = [
+    DANGEROUS_EXTENSIONS = (
         '.php', '.asp', '.aspx', '.jsp', '.cgi', '.pl', '.py', '.rb', '.sh'
-    ]
+    )
+    
+    # Estados que se registran como eventos de seguridad
+    RESPONSE_EVENT_STATUSES = frozenset({401, 403, 404, 429, 500})
     
     def __init__(self, get_response):
         self.get_response = get_response
-        self.suspicious_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in self.SUSPICIOUS_PATTERNS]
+        
+        # Headers precalculados; HSTS solo en producción
+        self.header_block = build_header_block(ADVANCED_SECURITY_HEADERS)
+        self.hsts = None if settings.DEBUG else f'{HSTS_VALUE}; preload'
+        
+        # Comprobaciones en orden; cada una devuelve una respuesta de bloqueo o None
+        self.checks = (
+            self.check_user_agent,
+            self.check_suspicious_patterns,
+            self.check_dangerous_extension,
+            self.check_rate_limit,
+        )
+        
         super().__init__(get_response)
 
     def process_request(self, request):
         """Procesar request con validaciones de seguridad avanzadas"""
         
-        ip = self._get_client_ip(request)
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        
         # Solo aplicar en producción o si está configurado
         if not settings.DEBUG or getattr(settings, 'ENABLE_ADVANCED_SECURITY', False):
-            
-            # 1. Validar User-Agent sospechoso
-            if self._is_suspicious_user_agent(user_agent):
-                self._log_security_incident(ip, 'SUSPICIOUS_USER_AGENT', user_agent)
-                return self._security_response('Acceso denegado', 'SUSPICIOUS_USER_AGENT', 403)
-            
-            # 2. Validar patrones sospechosos en la URL y parámetros
-            if self._contains_suspicious_patterns(request):
-                self._log_security_incident(ip, 'SUSPICIOUS_PATTERN', request.get_full_path())
-                return self._security_response('Solicitud inválida', 'SUSPICIOUS_PATTERN', 400)
-            
-            # 3. Validar extensiones de archivo peligrosas
-            if self._has_dangerous_extension(request.path):
-                self._log_security_incident(ip, 'DANGEROUS_EXTENSION', request.path)
-                return self._security_response('Archivo no permitido', 'DANGEROUS_EXTENSION', 403)
-            
-            # 4. Rate limiting avanzado
-            if self._is_advanced_rate_limited(request):
-                self._log_security_incident(ip, 'RATE_LIMIT_EXCEEDED', f"Path: {request.path}")
-                return self._security_response('Demasiadas solicitudes', 'RATE_LIMIT_EXCEEDED', 429)
+            for check in self.checks:
+                response = check(request)
+                if response is not None:
+                    return response
         
-        # 5. Logging de requests sensibles (siempre activo)
+        # Logging de requests sensibles (siempre activo)
         self._log_sensitive_request(request)
         
         return None
@@ -99,29 +79,47 @@ class AdvancedSecurityMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         """Agregar headers de seguridad adicionales"""
         
-        # Headers de seguridad adicionales
-        security_headers = {
-            'X-Content-Type-Options': 'nosniff',
-            'X-Frame-Options': 'DENY',
-            'X-XSS-Protection': '1; mode=block',
-            'Referrer-Policy': 'strict-origin-when-cross-origin',
-            'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
-            'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:;",
-        }
-        
-        for header, value in security_headers.items():
-            response[header] = value
-        
-        # HSTS solo para HTTPS en producción
-        if not settings.DEBUG and request.is_secure():
-            response['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains; preload'
+        apply_header_block(response, self.header_block, self.hsts, request.is_secure())
         
         # Log de eventos de seguridad
-        if response.status_code in [401, 403, 404, 429, 500]:
+        if response.status_code in self.RESPONSE_EVENT_STATUSES:
             self._log_response_event(request, response)
         
         return response
 
+    def check_user_agent(self, request):
+        """1. Validar User-Agent sospechoso"""
+        context = get_security_context(request)
+        if self._is_suspicious_user_agent(context.user_agent):
+            self._log_security_incident(context.ip, 'SUSPICIOUS_USER_AGENT', context.user_agent)
+            return self._security_response('Acceso denegado', 'SUSPICIOUS_USER_AGENT', 403)
+        return None
+    
+    def check_suspicious_patterns(self, request):
+        """2. Validar patrones sospechosos en la URL, headers y body"""
+        hit = self._contains_suspicious_patterns(request)
+        if hit:
+            self._log_security_incident(
+                self._get_client_ip(request), 'SUSPICIOUS_PATTERN',
+                f"{hit.rule} in {hit.source} ({hit.fragment!r}): {request.get_full_path()}"
+            )
+            return self._security_response('Solicitud inválida', 'SUSPICIOUS_PATTERN', 400)
+        return None
+    
+    def check_dangerous_extension(self, request):
+        """3. Validar extensiones de archivo peligrosas"""
+        if self._has_dangerous_extension(request.path):
+            self._log_security_incident(self._get_client_ip(request), 'DANGEROUS_EXTENSION', request.path)
+            return self._security_response('Archivo no permitido', 'DANGEROUS_EXTENSION', 403)
+        return None
+    
+    def check_rate_limit(self, request):
+        """4. Rate limiting avanzado"""
+        if self._is_advanced_rate_limited(request):
+            self._log_security_incident(self._get_client_ip(request), 'RATE_LIMIT_EXCEEDED', f"Path: {request.path}")
+            return self._security_response('Demasiadas solicitudes', 'RATE_LIMIT_EXCEEDED', 429)
+        return None
+    
     def _is_suspicious_user_agent(self, user_agent):
         """Verificar si el User-Agent es sospechoso"""
         if not user_agent or len(user_agent) < 10:
@@ -138,102 +136,33 @@ class AdvancedSecurityMiddleware(MiddlewareMixin):
         return False
 
     def _contains_suspicious_patterns(self, request):
-        """Verificar patrones sospechosos en URL, query params y body"""
-        # Verificar URL y query string
-        full_path = request.get_full_path().lower()
-        for pattern in self.suspicious_patterns:
-            if pattern.search(full_path):
-                return True
-        
-        # Verificar headers HTTP
-        for header_name, header_value in request.META.items():
-            if header_name.startswith('HTTP_') and header_value:
-                header_str = str(header_value).lower()
-                for pattern in self.suspicious_patterns:
-                    if pattern.search(header_str):
-                        return True
-        
-        # Verificar parámetros POST/PUT
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            try:
-                body = request.body.decode('utf-8', errors='ignore').lower()
-                for pattern in self.suspicious_patterns:
-                    if pattern.search(body):
-                        return True
-            except (UnicodeDecodeError, AttributeError):
-                pass
-        
-        return False
+        """
+        Verificar patrones de ataque en URL, query params, headers y body.
+        Devuelve la coincidencia (regla, origen, fragmento) o None
+        """
+        return get_security_context(request).scan.first(ATTACK)
 
     def _has_dangerous_extension(self, path):
         """Verificar si la URL tiene extensiones peligrosas"""
-        path_lower = path.lower()
-        for extension in self.DANGEROUS_EXTENSIONS:
-            if path_lower.endswith(extension):
-                return True
-        return False
+        return path.lower().endswith(self.DANGEROUS_EXTENSIONS)
 
     def _is_advanced_rate_limited(self, request):
         """Rate limiting avanzado por IP y usuario"""
-        ip = self._get_client_ip(request)
-        user_id = getattr(request.user, 'id', None) if hasattr(request, 'user') and request.user.is_authenticated else None
+        context = get_security_context(request)
+        ip = context.ip
+        user_id = context.user_id
         
-        # Rate limits diferentes para usuarios autenticados y anónimos
+        # Rate limits diferentes para usuarios autenticados (1000/h) y anónimos (100/h)
         if user_id:
-            cache_key = f"rate_limit_user_{user_id}"
-            limit = 1000  # 1000 requests por hora para usuarios autenticados
+            result = RateLimiter.allow('authenticated_user', user_id)
         else:
-            cache_key = f"rate_limit_ip_{ip}"
-            limit = 100   # 100 requests por hora para usuarios anónimos
-        
-        window = 3600  # 1 hora
+            result = RateLimiter.allow('anonymous_ip', ip)
         
-        current_requests = cache.get(cache_key, 0)
-        if current_requests >= limit:
-            return True
-        
-        cache.set(cache_key, current_requests + 1, window)
-        return False
+        return not result.allowed
 
     def _get_client_ip(self, request):
-        """Obtener IP real del cliente considerando proxies"""
-        # Lista de headers que pueden contener la IP real
-        ip_headers = [
-            'HTTP_X_FORWARDED_FOR',
-            'HTTP_X_REAL_IP',
-            'HTTP_CF_CONNECTING_IP',  # Cloudflare
-            'HTTP_X_FORWARDED',
-            'HTTP_FORWARDED_FOR',
-            'HTTP_FORWARDED',
-            'REMOTE_ADDR'
-        ]
-        
-        for header in ip_headers:
-            ip = request.META.get(header)
-            if ip:
-                # Si hay múltiples IPs (X-Forwarded-For), tomar la primera
-                if ',' in ip:
-                    ip = ip.split(',')[0].strip()
-                
-                # Validar que sea una IP válida
-                if self._is_valid_ip(ip):
-                    return ip
-        
-        return request.META.get('REMOTE_ADDR', 'unknown')
-
-    def _is_valid_ip(self, ip):
-        """Validar formato de IP"""
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
-        
-        try:
-            for part in parts:
-                if not 0 <= int(part) <= 255:
-                    return False
-            return True
-        except ValueError:
-            return False
+        """Obtener IP real del cliente (calculada una vez por request)"""
+        return get_security_context(request).ip
 
     def _log_security_incident(self, ip, incident_type, details):
         """Log de incidentes de seguridad"""
@@ -256,7 +185,7 @@ class AdvancedSecurityMiddleware(MiddlewareMixin):
             '/api/notifications/',
         ]
         
-        path = request.path.lower()
+        path = get_security_context(request).path
         for sensitive_path in sensitive_paths:
             if path.startswith(sensitive_path):
                 logger.info(
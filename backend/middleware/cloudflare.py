@@ -6,11 +6,52 @@ import logging
 from django.conf import settings
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
-import ipaddress
+from .context import get_security_context
+from .matchers import IPRangeMatcher, ReloadableMatcher, ValueSetMatcher, asn_matcher
+from .ratelimit import RateLimiter
 
 logger = logging.getLogger('django.security')
 
+# IPs de Cloudflare por defecto (https://www.cloudflare.com/ips/)
+CLOUDFLARE_IPS_V4 = [
+    '173.245.48.0/20', '103.21.244.0/22', '103.22.200.0/22',
+    '103.31.4.0/22', '141.101.64.0/18', '108.162.192.0/18',
+    '190.93.240.0/20', '188.114.96.0/20', '197.234.240.0/22',
+    '198.41.128.0/17', '162.158.0.0/15', '104.16.0.0/13',
+    '104.24.0.0/14', '172.64.0.0/13', '131.0.72.0/22'
+]
+
+CLOUDFLARE_IPS_V6 = [
+    '2400:cb00::/32', '2606:4700::/32', '2803:f800::/32',
+    '2405:b500::/32', '2405:8100::/32', '2a06:98c0::/29',
+    '2c0f:f248::/32'
+]
+
+# Países con alta actividad maliciosa (50 requests por hora)
+RATE_LIMITED_COUNTRIES = ValueSetMatcher(['CN', 'RU'])
+
+# ASNs conocidos por actividad maliciosa (20 requests por hora)
+SUSPICIOUS_ASNS = asn_matcher(['AS16276', 'AS8100', 'AS4134'])  # Ejemplos
+
+
+def cloudflare_networks():
+    """
+    Redes de Cloudflare compiladas una sola vez. Se recargan periódicamente desde
+    CLOUDFLARE_IPS_CACHE_KEY o CLOUDFLARE_IPS_FILE (un CIDR por línea) si están configurados.
+    """
+    defaults = (
+        list(getattr(settings, 'CLOUDFLARE_IPS_V4', None) or CLOUDFLARE_IPS_V4) +
+        list(getattr(settings, 'CLOUDFLARE_IPS_V6', None) or CLOUDFLARE_IPS_V6)
+    )
+    return ReloadableMatcher(
+        IPRangeMatcher,
+        defaults,
+        file_path=getattr(settings, 'CLOUDFLARE_IPS_FILE', None),
+        cache_key=getattr(settings, 'CLOUDFLARE_IPS_CACHE_KEY', None),
+        refresh_interval=getattr(settings, 'CLOUDFLARE_IPS_REFRESH_SECONDS', 3600)
+    )
+
+
 class CloudflareMiddleware(MiddlewareMixin):
     """
     Middleware para manejar requests que pasan por Cloudflare WAF
@@ -23,20 +64,8 @@ class CloudflareMiddleware(MiddlewareMixin):
     def __init__(self, get_response):
         self.get_response = get_response
         
-        # IPs de Cloudflare (se pueden actualizar desde la API)
-        self.cloudflare_ips_v4 = [
-            '173.245.48.0/20', '103.21.244.0/22', '103.22.200.0/22',
-            '103.31.4.0/22', '141.101.64.0/18', '108.162.192.0/18',
-            '190.93.240.0/20', '188.114.96.0/20', '197.234.240.0/22',
-            '198.41.128.0/17', '162.158.0.0/15', '104.16.0.0/13',
-            '104.24.0.0/14', '172.64.0.0/13', '131.0.72.0/22'
-        ]
-        
-        self.cloudflare_ips_v6 = [
-            '2400:cb00::/32', '2606:4700::/32', '2803:f800::/32',
-            '2405:b500::/32', '2405:8100::/32', '2a06:98c0::/29',
-            '2c0f:f248::/32'
-        ]
+        # Rangos de Cloudflare compilados al arrancar (búsqueda binaria por request)
+        self.cloudflare_networks = cloudflare_networks()
         
         super().__init__(get_response)
     
@@ -58,6 +87,7 @@ class CloudflareMiddleware(MiddlewareMixin):
         # Extraer IP real del cliente
         real_ip = self._get_real_client_ip(request)
         request.META['REAL_CLIENT_IP'] = real_ip
+        get_security_context(request).ip = real_ip
         
         # Procesar headers de Cloudflare
         self._process_cloudflare_headers(request)
@@ -79,26 +109,7 @@ class CloudflareMiddleware(MiddlewareMixin):
         if not connecting_ip:
             return False
         
-        try:
-            client_ip = ipaddress.ip_address(connecting_ip)
-            
-            # Verificar IPv4
-            if client_ip.version == 4:
-                for cidr in self.cloudflare_ips_v4:
-                    if client_ip in ipaddress.ip_network(cidr):
-                        return True
-            
-            # Verificar IPv6
-            elif client_ip.version == 6:
-                for cidr in self.cloudflare_ips_v6:
-                    if client_ip in ipaddress.ip_network(cidr):
-                        return True
-            
-            return False
-            
-        except ValueError:
-            logger.warning(f"Invalid IP address: {connecting_ip}")
-            return False
+        return connecting_ip in self.cloudflare_networks
     
     def _get_connecting_ip(self, request):
         """Obtener IP que se conecta directamente al servidor"""
@@ -155,29 +166,15 @@ class CloudflareMiddleware(MiddlewareMixin):
             return False
         
         # Rate limiting por país si es necesario
-        if cf_country and cf_country in ['CN', 'RU']:  # Países con alta actividad maliciosa
-            cache_key = f"cf_country_limit_{cf_country}_{real_ip}"
-            requests_count = cache.get(cache_key, 0)
-            
-            if requests_count > 50:  # 50 requests por hora para estos países
+        if cf_country in RATE_LIMITED_COUNTRIES:
+            if not RateLimiter.allow('cloudflare_country', f"{cf_country}:{real_ip}").allowed:
                 return True
-            
-            cache.set(cache_key, requests_count + 1, 3600)
         
         # Rate limiting por ASN sospechoso
         cf_asn = request.META.get('HTTP_CF_ASN')
-        if cf_asn:
-            # Lista de ASNs conocidos por actividad maliciosa
-            suspicious_asns = ['AS16276', 'AS8100', 'AS4134']  # Ejemplos
-            
-            if cf_asn in suspicious_asns:
-                cache_key = f"cf_asn_limit_{cf_asn}_{real_ip}"
-                requests_count = cache.get(cache_key, 0)
-                
-                if requests_count > 20:  # 20 requests por hora para ASNs sospechosos
-                    return True
-                
-                cache.set(cache_key, requests_count + 1, 3600)
+        if cf_asn in SUSPICIOUS_ASNS:
+            if not RateLimiter.allow('cloudflare_asn', f"{cf_asn}:{real_ip}").allowed:
+                return True
         
         return False
 
@@ -186,6 +183,11 @@ class CloudflareSecurityMiddleware(MiddlewareMixin):
     Middleware adicional de seguridad que aprovecha datos de Cloudflare
     """
     
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.blocked_countries = ValueSetMatcher(getattr(settings, 'BLOCKED_COUNTRIES', []))
+        super().__init__(get_response)
+    
     def process_request(self, request):
         """Aplicar reglas de seguridad adicionales"""
         
@@ -194,9 +196,8 @@ class CloudflareSecurityMiddleware(MiddlewareMixin):
         
         # Bloquear países específicos si es necesario
         cf_country = request.META.get('HTTP_CF_IPCOUNTRY')
-        blocked_countries = getattr(settings, 'BLOCKED_COUNTRIES', [])
         
-        if cf_country and cf_country in blocked_countries:
+        if cf_country in self.blocked_countries:
             logger.warning(f"Blocked country access: {cf_country}")
             return JsonResponse({
                 'error': 'Acceso no disponible en tu región',
@@ -219,7 +220,10 @@ class CloudflareSecurityMiddleware(MiddlewareMixin):
         if cf_ray:
             response['CF-Ray'] = cf_ray
         
-        # Headers de caché para Cloudflare
+        # Headers de caché por defecto para Cloudflare; se respeta el que
+        # haya decidido la vista (p. ej. revalidación por ETag del catálogo)
+        if 'Cache-Control' in response:
+            return response
         if request.path.startswith('/static/') or request.path.startswith('/media/'):
             response['Cache-Control'] = 'public, max-age=31536000'  # 1 año
         elif request.path.startswith('/api/'):
@@ -0,0 +1,75 @@
+"""
+Contexto de seguridad calculado una sola vez por request
+
+Todos los middlewares de seguridad (y las etapas del pipeline) leen de aquí
+la IP real del cliente, la ruta y el User-Agent en minúsculas, los headers,
+el fragmento de body analizado y la identidad del usuario, en lugar de
+volver a derivarlos cada uno.
+"""
+from django.utils.functional import cached_property
+
+from .scanner import body_text, scan_request
+
+
+def resolve_client_ip(meta):
+    """
+    IP real del cliente: la verificada por CloudflareMiddleware, después
+    X-Forwarded-For / X-Real-IP y, por último, la conexión directa
+    """
+    real_ip = meta.get('REAL_CLIENT_IP')
+    if real_ip:
+        return real_ip
+    
+    forwarded_for = meta.get('HTTP_X_FORWARDED_FOR')
+    if forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    
+    return meta.get('HTTP_X_REAL_IP') or meta.get('REMOTE_ADDR') or 'unknown'
+
+
+class SecurityContext:
+    """Datos de la request que comparten las comprobaciones de seguridad"""
+    
+    def __init__(self, request):
+        self.request = request
+    
+    @cached_property
+    def ip(self):
+        return resolve_client_ip(self.request.META)
+    
+    @cached_property
+    def path(self):
+        return self.request.path.lower()
+    
+    @cached_property
+    def user_agent(self):
+        return self.request.META.get('HTTP_USER_AGENT', '').lower()
+    
+    @property
+    def headers(self):
+        # HttpHeaders ya es un mapa sin distinción de mayúsculas, construido una vez por Django
+        return self.request.headers
+    
+    @cached_property
+    def body(self):
+        """Fragmento del body limitado por Content-Type (el mismo que analiza el scanner)"""
+        return body_text(self.request)
+    
+    @property
+    def scan(self):
+        return scan_request(self.request, self.body)
+    
+    @property
+    def user_id(self):
+        # Sin caché: AuthenticationMiddleware puede asignar request.user después
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.id
+        return None
+
+
+def get_security_context(request):
+    context = getattr(request, 'security_context', None)
+    if context is None:
+        context = request.security_context = SecurityContext(request)
+    return context
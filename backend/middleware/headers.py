@@ -0,0 +1,50 @@
+"""
+Bloques de headers de seguridad precalculados
+
+Cada middleware construye su bloque una vez al arrancar (tupla de pares
+header/valor) y lo aplica a cada respuesta en un solo bucle.
+"""
+from django.conf import settings
+
+# Headers básicos (SecurityMiddleware y pipeline)
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    'Referrer-Policy': 'same-origin',
+}
+
+# Headers de AdvancedSecurityMiddleware
+ADVANCED_SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+    'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
+    'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data: https:;",
+}
+
+HSTS_VALUE = 'max-age=31536000; includeSubDomains'
+
+
+def build_header_block(headers, overrides=None):
+    """Tupla inmutable de (header, valor); un valor None elimina el header"""
+    block = dict(headers)
+    block.update(overrides or {})
+    return tuple((header, value) for header, value in block.items() if value is not None)
+
+
+def apply_header_block(response, block, hsts=None, secure=False):
+    for header, value in block:
+        response[header] = value
+    # HSTS solo para HTTPS
+    if hsts and secure:
+        response['Strict-Transport-Security'] = hsts
+    return response
+
+
+def default_header_block():
+    """Bloque del pipeline: vacío en desarrollo, ajustable con SECURITY_RESPONSE_HEADERS"""
+    if settings.DEBUG:
+        return ()
+    return build_header_block(SECURITY_HEADERS, getattr(settings, 'SECURITY_RESPONSE_HEADERS', None))
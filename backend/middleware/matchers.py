@@ -0,0 +1,166 @@
+"""
+Listas de permitidos/bloqueados compiladas para los middlewares de seguridad
+
+- IPRangeMatcher: rangos CIDR convertidos una sola vez a intervalos enteros
+  ordenados y fusionados; cada consulta es una búsqueda binaria (bisect).
+- ValueSetMatcher: países, ASNs u otros códigos normalizados en un frozenset.
+- ReloadableMatcher: envuelve cualquiera de los dos y recarga sus entradas
+  periódicamente desde una clave de cache o un fichero local (una entrada
+  por línea), sin tocar el camino caliente entre recargas.
+"""
+import ipaddress
+import logging
+import os
+import time
+from bisect import bisect_right
+
+from django.core.cache import cache
+
+logger = logging.getLogger('django.security')
+
+
+class IPRangeMatcher:
+    """Pertenencia de una IP a un conjunto de redes CIDR en O(log n)"""
+    
+    def __init__(self, cidrs):
+        ranges = {4: [], 6: []}
+        for cidr in cidrs:
+            cidr = cidr.strip()
+            if not cidr or cidr.startswith('#'):
+                continue
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                logger.warning(f"Invalid network in IP list: {cidr}")
+                continue
+            ranges[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+        
+        self._starts = {}
+        self._ends = {}
+        for version, intervals in ranges.items():
+            starts, ends = [], []
+            # Fusionar intervalos solapados o contiguos
+            for start, end in sorted(intervals):
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._starts[version] = starts
+            self._ends[version] = ends
+    
+    def __len__(self):
+        return sum(len(starts) for starts in self._starts.values())
+    
+    def __contains__(self, ip):
+        if not ip:
+            return False
+        try:
+            address = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        
+        value = int(address)
+        starts = self._starts[address.version]
+        position = bisect_right(starts, value) - 1
+        return position >= 0 and value <= self._ends[address.version][position]
+
+
+class ValueSetMatcher:
+    """Pertenencia de un código (país, ASN...) a una lista, normalizado"""
+    
+    def __init__(self, values, normalize=None):
+        self.normalize = normalize or (lambda value: value.strip().upper())
+        self._values = frozenset(
+            self.normalize(value) for value in values
+            if value and value.strip() and not value.strip().startswith('#')
+        )
+    
+    def __len__(self):
+        return len(self._values)
+    
+    def __contains__(self, value):
+        return bool(value) and self.normalize(value) in self._values
+
+
+def normalize_asn(value):
+    """'AS16276', 'as16276' y '16276' son el mismo ASN"""
+    value = str(value).strip().upper()
+    return value[2:] if value.startswith('AS') else value
+
+
+def asn_matcher(values):
+    return ValueSetMatcher(values, normalize=normalize_asn)
+
+
+class ReloadableMatcher:
+    """
+    Matcher que se recompila cada refresh_interval segundos si cambian sus
+    entradas. Orden de fuentes: clave de cache (lista de cadenas), fichero
+    local (una entrada por línea) y, si no hay ninguna, las entradas por defecto.
+    """
+    
+    def __init__(self, factory, defaults, file_path=None, cache_key=None, refresh_interval=3600):
+        self.factory = factory
+        self.defaults = list(defaults)
+        self.file_path = file_path
+        self.cache_key = cache_key
+        self.refresh_interval = refresh_interval
+        
+        self._entries = None
+        self._file_mtime = None
+        self._file_entries = None
+        self._matcher = None
+        self._next_refresh = 0
+        self.refresh()
+    
+    def _load_file(self):
+        try:
+            mtime = os.stat(self.file_path).st_mtime
+        except OSError:
+            return None
+        if mtime != self._file_mtime:
+            with open(self.file_path, encoding='utf-8') as entries_file:
+                self._file_entries = [line.strip() for line in entries_file if line.strip()]
+            self._file_mtime = mtime
+        return self._file_entries
+    
+    def load_entries(self):
+        if self.cache_key:
+            try:
+                entries = cache.get(self.cache_key)
+            except Exception as exc:
+                logger.warning(f"Could not read {self.cache_key} from cache: {exc}")
+                entries = None
+            if entries:
+                return list(entries)
+        if self.file_path:
+            entries = self._load_file()
+            if entries:
+                return entries
+        return self.defaults
+    
+    def refresh(self):
+        """Recompilar solo si las entradas han cambiado"""
+        entries = self.load_entries()
+        if entries != self._entries:
+            self._matcher = self.factory(entries)
+            self._entries = entries
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        return self._matcher
+    
+    @property
+    def matcher(self):
+        if time.monotonic() >= self._next_refresh:
+            return self.refresh()
+        return self._matcher
+    
+    def __len__(self):
+        return len(self.matcher)
+    
+    def __contains__(self, value):
+        return value in self.matcher
@@ -0,0 +1,39 @@
+"""
+Middleware de métricas Prometheus
+
+Mide cada request (latencia, código de estado, consultas SQL y su tiempo)
+y lo registra por vista. Debe ir el primero en MIDDLEWARE para incluir el
+coste del resto de middlewares.
+"""
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from backend.apps.core.metrics import QueryTimer, metrics_enabled, observe_request, view_label
+
+
+class MetricsMiddleware:
+    """Instrumentación por request (METRICS_ENABLED y prometheus_client instalado)"""
+    
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with timer.wrap(ExitStack()):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        
+        observe_request(
+            view_label(request),
+            request.method,
+            response.status_code,
+            duration,
+            timer.count,
+            timer.duration,
+        )
+        return response
@@ -0,0 +1,150 @@
+"""
+Pipeline de seguridad unificado
+
+Sustituye a la cadena SecurityMiddleware + AdvancedSecurityMiddleware +
+CloudflareMiddleware + CloudflareSecurityMiddleware + DataSanitizationMiddleware
+por un único middleware:
+
+- El contexto de la request (IP real, ruta/User-Agent en minúsculas, headers,
+  fragmento de body, usuario) se calcula una sola vez (context.py).
+- Las comprobaciones son etapas ordenadas que se activan con el setting
+  SECURITY_PIPELINE_STAGES; la primera que devuelve una respuesta corta el
+  pipeline.
+- Los headers de seguridad son un bloque precalculado al arrancar que se
+  aplica una vez a cada respuesta.
+
+Las etapas reutilizan la lógica de los middlewares originales, que siguen
+funcionando por separado.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+
+from backend.apps.appointments.security_monitor import SecurityMonitor
+
+from .advanced_security import AdvancedSecurityMiddleware
+from .cloudflare import CloudflareMiddleware, CloudflareSecurityMiddleware
+from .context import get_security_context
+from .headers import HSTS_VALUE, apply_header_block, default_header_block
+from .scanner import SUSPICIOUS
+from .security import DataSanitizationMiddleware, SecurityMiddleware
+
+logger = logging.getLogger('django.security')
+
+# Orden canónico de todas las etapas disponibles
+STAGES = (
+    'cloudflare',           # Verificar origen Cloudflare, IP real y límites por país/ASN
+    'country_block',        # BLOCKED_COUNTRIES
+    'ip_reputation',        # IPs bloqueadas por SecurityMonitor; registra patrones sospechosos
+    'user_agent',           # User-Agent de herramientas de ataque
+    'attack_patterns',      # SQLi, XSS, traversal... en ruta, headers y body (400)
+    'dangerous_extension',  # .php, .asp, ...
+    'rate_limit',           # Políticas por ruta (ROUTE_POLICIES)
+    'user_rate_limit',      # Límite por usuario autenticado / IP anónima
+    'suspicious_activity',  # Registro de patrones sospechosos
+    'sanitization',         # Aviso de contenido peligroso en query/body
+    'sensitive_logging',    # Registro de accesos a rutas sensibles
+)
+
+# Etapas activas por defecto: el comportamiento de la cadena anterior
+DEFAULT_STAGES = (
+    'cloudflare',
+    'country_block',
+    'rate_limit',
+    'suspicious_activity',
+    'sanitization',
+)
+
+
+class SecurityPipelineMiddleware:
+    """Middleware único de seguridad con etapas configurables"""
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        
+        names = tuple(getattr(settings, 'SECURITY_PIPELINE_STAGES', None) or DEFAULT_STAGES)
+        unknown = set(names) - set(STAGES)
+        if unknown:
+            raise ImproperlyConfigured(f"Etapas de seguridad desconocidas: {', '.join(sorted(unknown))}")
+        self.stage_names = names
+        self.stages = tuple(getattr(self, f'stage_{name}') for name in names)
+        
+        # Lógica de los middlewares originales (una instancia por proceso)
+        self.cloudflare = CloudflareMiddleware(get_response)
+        self.cloudflare_security = CloudflareSecurityMiddleware(get_response)
+        self.advanced = AdvancedSecurityMiddleware(get_response)
+        self.security = SecurityMiddleware(get_response)
+        self.sanitization = DataSanitizationMiddleware(get_response)
+        
+        # Trabajo de respuesta decidido al arrancar
+        self.header_block = default_header_block()
+        self.hsts = None if settings.DEBUG else HSTS_VALUE
+        self.use_cloudflare = getattr(settings, 'USE_CLOUDFLARE', False)
+    
+    def __call__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+    
+    def process_request(self, request):
+        get_security_context(request)
+        for stage in self.stages:
+            response = stage(request)
+            if response is not None:
+                return response
+        return None
+    
+    def process_response(self, request, response):
+        apply_header_block(response, self.header_block, self.hsts, request.is_secure())
+        if self.use_cloudflare:
+            self.cloudflare_security.process_response(request, response)
+        self.security._log_security_event(request, response)
+        return response
+    
+    # Etapas: cada una devuelve una respuesta de bloqueo o None
+    
+    def stage_cloudflare(self, request):
+        return self.cloudflare.process_request(request)
+    
+    def stage_country_block(self, request):
+        return self.cloudflare_security.process_request(request)
+    
+    def stage_ip_reputation(self, request):
+        context = get_security_context(request)
+        if SecurityMonitor.is_ip_blocked(context.ip):
+            logger.critical(f"Blocked IP {context.ip} attempted access to {request.get_full_path()}")
+            return JsonResponse({
+                'error': 'Acceso denegado. Contacta al administrador si crees que esto es un error.',
+                'code': 'IP_BLOCKED'
+            }, status=403)
+        
+        hit = context.scan.first(SUSPICIOUS)
+        if hit:
+            SecurityMonitor.log_suspicious_pattern(context.ip, hit.fragment, request.get_full_path())
+    
+    def stage_user_agent(self, request):
+        return self.advanced.check_user_agent(request)
+    
+    def stage_attack_patterns(self, request):
+        return self.advanced.check_suspicious_patterns(request)
+    
+    def stage_dangerous_extension(self, request):
+        return self.advanced.check_dangerous_extension(request)
+    
+    def stage_rate_limit(self, request):
+        return self.security._rate_limit_response(request)
+    
+    def stage_user_rate_limit(self, request):
+        return self.advanced.check_rate_limit(request)
+    
+    def stage_suspicious_activity(self, request):
+        self.security._log_suspicious_activity(request)
+    
+    def stage_sanitization(self, request):
+        return self.sanitization.process_request(request)
+    
+    def stage_sensitive_logging(self, request):
+        self.advanced._log_sensitive_request(request)
@@ -0,0 +1,61 @@
+"""
+Middleware de presupuesto de consultas y detección de N+1 (desarrollo y CI)
+
+Desactivado por defecto (QUERY_BUDGET_ENABLED). Por request registra las
+consultas SQL y, si la vista supera su presupuesto o repite una misma forma
+de consulta, registra un aviso con la pila de llamadas culpable, o lanza
+QueryBudgetExceeded con QUERY_BUDGET_RAISE (para que fallen los tests).
+
+Presupuestos por nombre de vista:
+    
+    QUERY_BUDGETS = {
+        'dress-list': {'max_queries': 5, 'max_repeats': 1},
+    }
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from backend.apps.core.querybudget import (
+    DEFAULT_MAX_QUERIES, DEFAULT_MAX_REPEATS, QueryBudgetExceeded, QueryRecorder,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Presupuesto de consultas por vista (opt-in)"""
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', None) or {}
+        self.default_budget = {
+            'max_queries': getattr(settings, 'QUERY_BUDGET_MAX_QUERIES', DEFAULT_MAX_QUERIES),
+            'max_repeats': getattr(settings, 'QUERY_BUDGET_MAX_REPEATS', DEFAULT_MAX_REPEATS),
+        }
+        self.raise_on_exceed = getattr(settings, 'QUERY_BUDGET_RAISE', False)
+    
+    def __call__(self, request):
+        recorder = QueryRecorder(**self.default_budget)
+        with recorder.record():
+            response = self.get_response(request)
+        
+        # La vista solo se conoce tras resolver la URL: el presupuesto se aplica al final
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        budget = self.budgets.get(view)
+        if budget:
+            recorder.max_queries = budget.get('max_queries', recorder.max_queries)
+            recorder.max_repeats = budget.get('max_repeats', recorder.max_repeats)
+        
+        if recorder.exceeded:
+            label = f"{request.method} {request.path} ({view or 'sin vista'})"
+            if self.raise_on_exceed:
+                raise QueryBudgetExceeded(recorder, label)
+            logger.warning(recorder.describe(label))
+        
+        response['X-Query-Count'] = str(recorder.count)
+        return response
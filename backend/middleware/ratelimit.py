@@ -0,0 +1,286 @@
+"""
+Motor único de rate limiting para middlewares y login
+
+- Ventana deslizante aproximada con dos contadores (ventana actual y
+  anterior ponderada por el tiempo que aún solapa).
+- Redis (RATE_LIMIT_REDIS_URL): un script Lua comprueba e incrementa en una
+  sola ida y vuelta y de forma atómica, sin perder incrementos concurrentes.
+- Sin Redis (desarrollo/tests) o si Redis falla: contadores en memoria del
+  proceso protegidos con un lock. Redis usa timeouts cortos y, tras un
+  fallo, no se reintenta durante REDIS_FAILURE_COOLDOWN segundos.
+- Las políticas son declarativas (POLICIES, ROUTE_POLICIES) y se pueden
+  ajustar con el setting RATE_LIMIT_POLICIES = {'nombre': (límite, ventana)}.
+"""
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger('django.security')
+
+RatePolicy = namedtuple('RatePolicy', ['name', 'limit', 'window'])
+
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'count', 'limit', 'retry_after'])
+
+# Políticas por defecto (límite de requests por ventana en segundos)
+POLICIES = {
+    'appointments_create': RatePolicy('appointments_create', 10, 300),
+    'appointments': RatePolicy('appointments', 20, 300),
+    'appointment_holds': RatePolicy('appointment_holds', 30, 300),
+    'api': RatePolicy('api', 100, 300),
+    'authenticated_user': RatePolicy('authenticated_user', 1000, 3600),
+    'anonymous_ip': RatePolicy('anonymous_ip', 100, 3600),
+    'cloudflare_country': RatePolicy('cloudflare_country', 50, 3600),
+    'cloudflare_asn': RatePolicy('cloudflare_asn', 20, 3600),
+    'login_failures': RatePolicy('login_failures', 5, 900),
+}
+
+# Prefijo de ruta -> política de SecurityMiddleware (el más específico primero)
+ROUTE_POLICIES = [
+    ('/api/appointments/create/', 'appointments_create'),
+    ('/api/appointments/', 'appointments'),
+    ('/api/', 'api'),
+]
+
+# Timeout de conexión y de socket de Redis (segundos, REDIS_SOCKET_TIMEOUT)
+DEFAULT_REDIS_TIMEOUT = 0.25
+# Segundos en memoria local tras un fallo de Redis (REDIS_FAILURE_COOLDOWN)
+DEFAULT_FAILURE_COOLDOWN = 30
+
+# Modos del script: comprobar e incrementar, solo incrementar, solo comprobar
+ALLOW, HIT, PEEK = 'allow', 'hit', 'peek'
+
+# KEYS: ventana actual, ventana anterior
+# ARGV: límite, TTL, peso de la ventana anterior, modo
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+local estimated = previous * tonumber(ARGV[3]) + current
+local mode = ARGV[4]
+if mode == 'peek' or (mode == 'allow' and estimated >= limit) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {1, current, previous}
+"""
+
+
+def get_policy(name):
+    """Política con los ajustes de RATE_LIMIT_POLICIES aplicados"""
+    overrides = getattr(settings, 'RATE_LIMIT_POLICIES', None) or {}
+    if name in overrides:
+        limit, window = overrides[name]
+        return RatePolicy(name, limit, window)
+    return POLICIES[name]
+
+
+def route_policy(path):
+    for prefix, name in ROUTE_POLICIES:
+        if path.startswith(prefix):
+            return get_policy(name)
+    return None
+
+
+def window_position(window, now=None):
+    """(índice de la ventana actual, peso de la ventana anterior)"""
+    now = time.time() if now is None else now
+    index = int(now // window)
+    return index, 1 - (now - index * window) / window
+
+
+def redis_client(url):
+    """Cliente Redis con timeouts cortos: un Redis lento no debe bloquear las requests"""
+    timeout = getattr(settings, 'REDIS_SOCKET_TIMEOUT', DEFAULT_REDIS_TIMEOUT)
+    return redis.from_url(url, socket_connect_timeout=timeout, socket_timeout=timeout)
+
+
+class CircuitBreaker:
+    """
+    Tras un fallo del backend remoto se deja de intentar durante
+    REDIS_FAILURE_COOLDOWN segundos y se usa el respaldo local
+    """
+    
+    def __init__(self):
+        self.open_until = 0.0
+    
+    def is_open(self):
+        return time.monotonic() < self.open_until
+    
+    def trip(self):
+        cooldown = getattr(settings, 'REDIS_FAILURE_COOLDOWN', DEFAULT_FAILURE_COOLDOWN)
+        self.open_until = time.monotonic() + cooldown
+        return cooldown
+    
+    def reset(self):
+        self.open_until = 0.0
+
+
+class LocalRateLimitBackend:
+    """Contadores en memoria del proceso (tests, desarrollo o Redis caído)"""
+    
+    # A partir de este número de claves se eliminan las ventanas caducadas
+    PRUNE_THRESHOLD = 10000
+    
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+    
+    def _prune(self, now):
+        expired = [key for key, (_, expires) in self.counters.items() if expires <= now]
+        for key in expired:
+            del self.counters[key]
+    
+    def evaluate(self, current_key, previous_key, limit, ttl, weight, mode):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.counters) > self.PRUNE_THRESHOLD:
+                self._prune(now)
+            
+            current, expires = self.counters.get(current_key, (0, 0))
+            if expires <= now:
+                current = 0
+            previous, previous_expires = self.counters.get(previous_key, (0, 0))
+            if previous_expires <= now:
+                previous = 0
+            
+            if mode == PEEK or (mode == ALLOW and previous * weight + current >= limit):
+                return False, current, previous
+            
+            if current == 0:
+                expires = now + ttl
+            self.counters[current_key] = (current + 1, expires)
+            return True, current + 1, previous
+    
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.counters.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+
+
+class RedisRateLimitBackend:
+    """Contadores en Redis: comprobación e incremento atómicos con un script Lua"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.script = client.register_script(SLIDING_WINDOW_SCRIPT)
+    
+    def evaluate(self, current_key, previous_key, limit, ttl, weight, mode):
+        applied, current, previous = self.script(keys=[current_key, previous_key], args=[limit, ttl, weight, mode])
+        return bool(applied), int(current), int(previous)
+    
+    def delete(self, *keys):
+        self.client.delete(*keys)
+
+
+class RateLimiter:
+    """Punto de entrada común: allow() para middlewares, hit()/peek()/reset() para contadores de fallos"""
+    
+    KEY_PREFIX = 'ratelimit'
+    
+    _backend = None
+    _local = LocalRateLimitBackend()
+    _breaker = CircuitBreaker()
+    
+    @classmethod
+    def get_backend(cls):
+        if cls._backend is None:
+            redis_url = getattr(settings, 'RATE_LIMIT_REDIS_URL', None)
+            if redis_url and REDIS_AVAILABLE:
+                cls._backend = RedisRateLimitBackend(redis_client(redis_url))
+            else:
+                cls._backend = cls._local
+        return cls._backend
+    
+    @classmethod
+    def _active_backend(cls):
+        """Backend configurado, salvo los contadores locales mientras el circuito está abierto"""
+        backend = cls.get_backend()
+        if backend is not cls._local and cls._breaker.is_open():
+            return cls._local
+        return backend
+    
+    @classmethod
+    def reset_backend(cls):
+        """Volver a leer la configuración y vaciar los contadores en memoria (tests)"""
+        cls._backend = None
+        cls._local.clear()
+        cls._breaker.reset()
+    
+    @classmethod
+    def _keys(cls, policy, identity, index):
+        base = f"{cls.KEY_PREFIX}:{policy.name}:{identity}"
+        return f"{base}:{index}", f"{base}:{index - 1}"
+    
+    @classmethod
+    def _evaluate(cls, policy, identity, mode):
+        if isinstance(policy, str):
+            policy = get_policy(policy)
+        index, weight = window_position(policy.window)
+        current_key, previous_key = cls._keys(policy, identity, index)
+        args = (current_key, previous_key, policy.limit, policy.window * 2, weight, mode)
+        
+        backend = cls._active_backend()
+        try:
+            applied, current, previous = backend.evaluate(*args)
+        except Exception as exc:
+            if backend is cls._local:
+                raise
+            cooldown = cls._breaker.trip()
+            logger.error(f"Rate limit backend unavailable, using local counters for {cooldown}s: {exc}")
+            applied, current, previous = cls._local.evaluate(*args)
+        
+        if mode == ALLOW:
+            allowed = applied
+        else:
+            # hit/peek: ¿cabría otra request con los contadores actuales?
+            allowed = previous * weight + current < policy.limit
+        
+        retry_after = 0 if allowed else max(1, math.ceil(policy.window * weight))
+        return RateLimitResult(allowed, current, policy.limit, retry_after)
+    
+    @classmethod
+    def allow(cls, policy, identity):
+        """Registrar una request si cabe en la política (atómico)"""
+        return cls._evaluate(policy, identity, ALLOW)
+    
+    @classmethod
+    def hit(cls, policy, identity):
+        """Registrar un evento siempre (p. ej. un login fallido)"""
+        return cls._evaluate(policy, identity, HIT)
+    
+    @classmethod
+    def peek(cls, policy, identity):
+        """Consultar sin registrar"""
+        return cls._evaluate(policy, identity, PEEK)
+    
+    @classmethod
+    def reset(cls, policy, identity):
+        if isinstance(policy, str):
+            policy = get_policy(policy)
+        index, _ = window_position(policy.window)
+        keys = cls._keys(policy, identity, index)
+        backend = cls._active_backend()
+        try:
+            if backend is not cls._local:
+                backend.delete(*keys)
+        except Exception as exc:
+            cls._breaker.trip()
+            logger.error(f"Could not reset rate limit {policy.name} for {identity}: {exc}")
+        cls._local.delete(*keys)
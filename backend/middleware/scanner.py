@@ -0,0 +1,184 @@
+"""
+Motor común de detección de patrones para los middlewares de seguridad
+
+- Todas las listas de patrones (AdvancedSecurityMiddleware, SecurityMiddleware
+  y DataSanitizationMiddleware) se compilan en una sola alternancia; cada
+  entrada se pasa a minúsculas y se recorre una sola vez. Todas las ramas
+  empiezan por un literal, así el motor de re salta directamente a los
+  caracteres candidatos. Solo cuando hay coincidencia se identifica la regla.
+- Cada regla pertenece a una o varias categorías ('attack', 'suspicious',
+  'dangerous'); cada middleware consulta solo la suya.
+- El análisis de una request se hace una vez y se guarda en la propia
+  request; el cuerpo se limita a unos pocos KB según el Content-Type.
+"""
+import logging
+import re
+from collections import namedtuple
+from urllib.parse import unquote_plus
+
+from django.core.exceptions import RequestDataTooBig
+from django.http.request import RawPostDataException
+
+logger = logging.getLogger('django.security')
+
+# Categorías: ataques que bloquea AdvancedSecurityMiddleware, actividad sospechosa
+# que registra SecurityMiddleware y contenido peligroso que avisa DataSanitizationMiddleware
+ATTACK = 'attack'
+SUSPICIOUS = 'suspicious'
+DANGEROUS = 'dangerous'
+
+# Entradas que analiza cada categoría
+CATEGORY_SOURCES = {
+    ATTACK: {'path', 'query', 'header', 'body'},
+    SUSPICIOUS: {'query', 'body'},
+    DANGEROUS: {'query', 'body'},
+}
+
+# (nombre, expresión en minúsculas que empieza por un literal, categorías).
+# Las reglas que pueden empezar en la misma posición comparten categorías,
+# así la alternancia no oculta ninguna.
+RULES = [
+    ('sql_union', r'union\s+select', {ATTACK, SUSPICIOUS}),
+    ('sql_drop', r'drop\s+table', {ATTACK, SUSPICIOUS}),
+    ('sql_insert', r'insert\s+into', {ATTACK, SUSPICIOUS}),
+    ('sql_delete', r'delete\s+from', {ATTACK, SUSPICIOUS}),
+    ('script_tag', r'</?script', {ATTACK, SUSPICIOUS, DANGEROUS}),
+    ('script_close', r'script>', {SUSPICIOUS, DANGEROUS}),
+    ('iframe_tag', r'</?iframe', {SUSPICIOUS, DANGEROUS}),
+    ('javascript_uri', r'javascript:', {ATTACK, SUSPICIOUS, DANGEROUS}),
+    ('vbscript_uri', r'vbscript:', {DANGEROUS}),
+    ('data_uri', r'data:', {DANGEROUS}),
+    ('event_handler', r'on(?:load|error|click|mouse\w+|key\w+|focus|blur|submit|change|input|abort)\s*=', {SUSPICIOUS, DANGEROUS}),
+    ('path_traversal', r'\.\.[/\\]', {ATTACK, SUSPICIOUS}),
+    ('system_file', r'etc/(?:passwd|shadow)', {ATTACK, SUSPICIOUS}),
+    ('proc_self', r'proc/self', {ATTACK}),
+    ('command_param', r'cmd=', {ATTACK}),
+    ('code_eval', r'eval\(', {ATTACK}),
+    ('code_exec', r'exec\(', {ATTACK}),
+    ('code_system', r'system\(', {ATTACK}),
+    ('base64', r'base64', {ATTACK}),
+]
+
+# Bytes del cuerpo analizados según el Content-Type (0 = no se analiza)
+BODY_SCAN_LIMITS = {
+    'application/json': 64 * 1024,
+    'application/x-www-form-urlencoded': 64 * 1024,
+    'multipart/form-data': 16 * 1024,  # solo los campos de texto, nunca los ficheros
+    'text/plain': 16 * 1024,
+    'application/octet-stream': 0,
+    'image': 0,
+    'video': 0,
+    'audio': 0,
+}
+DEFAULT_BODY_SCAN_LIMIT = 16 * 1024
+
+BODY_METHODS = ('POST', 'PUT', 'PATCH')
+
+ScanHit = namedtuple('ScanHit', ['rule', 'source', 'fragment'])
+
+
+class PatternScanner:
+    """Alternancia compilada de todas las reglas; informa de la regla que coincide"""
+    
+    def __init__(self, rules):
+        self.rules = [(name, re.compile(expression)) for name, expression, _ in rules]
+        self.categories = {name: frozenset(categories) for name, _, categories in rules}
+        # Sin grupos ni IGNORECASE: re puede usar el prefijo de caracteres de las ramas
+        self.pattern = re.compile('|'.join(f'(?:{expression})' for _, expression, _ in rules))
+    
+    def rule_for(self, fragment):
+        """Regla que produjo un fragmento: la primera rama que lo reconoce entero"""
+        for name, expression in self.rules:
+            if expression.fullmatch(fragment):
+                return name
+        return None
+    
+    def finditer(self, text):
+        """Coincidencias (regla, fragmento) en una sola pasada"""
+        for match in self.pattern.finditer(text.lower()):
+            fragment = match.group()
+            yield self.rule_for(fragment), fragment
+    
+    def search(self, text):
+        """Primera regla que coincide o None"""
+        match = self.pattern.search(text.lower())
+        return (self.rule_for(match.group()), match.group()) if match else None
+
+
+SCANNER = PatternScanner(RULES)
+
+
+class ScanResult:
+    """Primera coincidencia de cada categoría en una request"""
+    
+    def __init__(self):
+        self.hits = {}
+    
+    def first(self, category):
+        return self.hits.get(category)
+    
+    def scan(self, source, text, source_name=None):
+        """Analizar una entrada; se detiene cuando sus categorías ya tienen coincidencia"""
+        pending = {category for category, sources in CATEGORY_SOURCES.items() if source in sources} - set(self.hits)
+        if not text or not pending:
+            return
+        for rule, fragment in SCANNER.finditer(text):
+            for category in SCANNER.categories[rule] & pending:
+                self.hits[category] = ScanHit(rule, source_name or source, fragment[:100])
+            pending -= SCANNER.categories[rule]
+            if not pending:
+                return
+
+
+def body_scan_limit(content_type):
+    content_type = (content_type or '').lower()
+    if content_type in BODY_SCAN_LIMITS:
+        return BODY_SCAN_LIMITS[content_type]
+    return BODY_SCAN_LIMITS.get(content_type.split('/')[0], DEFAULT_BODY_SCAN_LIMIT)
+
+
+def body_text(request):
+    """Fragmento del cuerpo a analizar, limitado según el Content-Type"""
+    if request.method not in BODY_METHODS:
+        return ''
+    content_type = request.content_type
+    limit = body_scan_limit(content_type)
+    if not limit:
+        return ''
+    
+    try:
+        if content_type == 'multipart/form-data':
+            # Django ya separa los ficheros: solo se miran los campos de texto
+            return '\n'.join(
+                value for _, values in request.POST.lists() for value in values
+            )[:limit]
+        
+        body = request.body[:limit].decode('utf-8', errors='ignore')
+    except (RawPostDataException, RequestDataTooBig) as exc:
+        logger.debug(f"Body not scanned: {exc}")
+        return ''
+    
+    if content_type == 'application/x-www-form-urlencoded':
+        return unquote_plus(body)
+    return body
+
+
+def scan_request(request, body=None):
+    """
+    Analizar ruta, query string, headers y cuerpo una sola vez por request.
+    body: fragmento ya extraído (SecurityContext.body) para no decodificarlo dos veces
+    """
+    result = getattr(request, '_security_scan', None)
+    if result is not None:
+        return result
+    
+    result = ScanResult()
+    result.scan('path', request.path)
+    result.scan('query', unquote_plus(request.META.get('QUERY_STRING', '')))
+    for name, value in request.META.items():
+        if name.startswith('HTTP_') and value:
+            result.scan('header', str(value), name)
+    result.scan('body', body_text(request) if body is None else body)
+    
+    request._security_scan = result
+    return result
@@ -0,0 +1,277 @@
+"""
+Tests de los matchers compilados, el motor de patrones, el rate limiter,
+el pipeline de seguridad y el middleware de Cloudflare
+"""
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from backend.apps.appointments.security_monitor import SecurityMonitor
+from backend.middleware.advanced_security import AdvancedSecurityMiddleware
+from backend.middleware.cloudflare import CloudflareMiddleware, CloudflareSecurityMiddleware
+from backend.middleware.context import get_security_context
+from backend.middleware.matchers import IPRangeMatcher, ReloadableMatcher, ValueSetMatcher, asn_matcher
+from backend.middleware.pipeline import SecurityPipelineMiddleware
+from backend.middleware.ratelimit import RateLimiter, RatePolicy, RedisRateLimitBackend, route_policy
+from backend.middleware.scanner import ATTACK, DANGEROUS, SUSPICIOUS, scan_request
+from backend.middleware.security import SecurityMiddleware
+
+
+class MatchersTest(SimpleTestCase):
+    """Tests para IPRangeMatcher, ValueSetMatcher y ReloadableMatcher"""
+    
+    def test_ip_ranges(self):
+        matcher = IPRangeMatcher(['10.0.0.0/24', '10.0.1.0/24', '10.0.0.128/25', '2400:cb00::/32', 'no-es-ip'])
+        
+        # Los rangos solapados y contiguos se fusionan en uno
+        self.assertEqual(len(matcher), 2)
+        self.assertIn('10.0.0.0', matcher)
+        self.assertIn('10.0.1.255', matcher)
+        self.assertNotIn('10.0.2.0', matcher)
+        self.assertNotIn('9.255.255.255', matcher)
+        self.assertIn('2400:cb00::1', matcher)
+        self.assertIn('::ffff:10.0.0.5', matcher)
+        self.assertNotIn('2400:cb01::1', matcher)
+        self.assertNotIn('no-es-ip', matcher)
+        self.assertNotIn(None, matcher)
+    
+    def test_value_sets(self):
+        countries = ValueSetMatcher(['cn', ' RU ', ''])
+        self.assertIn('CN', countries)
+        self.assertIn('ru', countries)
+        self.assertNotIn('ES', countries)
+        self.assertNotIn(None, countries)
+        
+        asns = asn_matcher(['AS16276', '8100'])
+        self.assertIn('16276', asns)
+        self.assertIn('as8100', asns)
+        self.assertNotIn('AS4134', asns)
+    
+    def test_reload_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ips.txt')
+            matcher = ReloadableMatcher(IPRangeMatcher, ['192.0.2.0/24'], file_path=path, refresh_interval=0)
+            self.assertIn('192.0.2.1', matcher)
+            
+            with open(path, 'w') as entries:
+                entries.write('# Cloudflare\n198.51.100.0/24\n')
+            self.assertIn('198.51.100.7', matcher)
+            self.assertNotIn('192.0.2.1', matcher)
+
+
+class CloudflareMiddlewareTest(SimpleTestCase):
+    """Tests para la detección de Cloudflare y el bloqueo por país"""
+    
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    @override_settings(USE_CLOUDFLARE=True, DEBUG=False)
+    def test_only_cloudflare_connections(self):
+        middleware = CloudflareMiddleware(lambda request: HttpResponse())
+        
+        request = self.factory.get('/', REMOTE_ADDR='173.245.48.10', HTTP_CF_CONNECTING_IP='203.0.113.9')
+        self.assertIsNone(middleware.process_request(request))
+        self.assertEqual(request.META['REAL_CLIENT_IP'], '203.0.113.9')
+        
+        request = self.factory.get('/', REMOTE_ADDR='203.0.113.50', HTTP_CF_CONNECTING_IP='198.51.100.1')
+        self.assertEqual(middleware.process_request(request).status_code, 403)
+    
+    @override_settings(USE_CLOUDFLARE=True, BLOCKED_COUNTRIES=['XX'])
+    def test_blocked_countries(self):
+        middleware = CloudflareSecurityMiddleware(lambda request: HttpResponse())
+        
+        request = self.factory.get('/', HTTP_CF_IPCOUNTRY='xx')
+        self.assertEqual(middleware.process_request(request).status_code, 403)
+        
+        request = self.factory.get('/', HTTP_CF_IPCOUNTRY='ES')
+        self.assertIsNone(middleware.process_request(request))
+
+
+class PatternScannerTest(SimpleTestCase):
+    """Tests para el motor común de detección de patrones"""
+    
+    def setUp(self):
+        self.factory = RequestFactory()
+    
+    def test_reports_rule_and_source(self):
+        request = self.factory.get('/api/dresses/', {'q': "1 UNION  select password"})
+        result = scan_request(request)
+        
+        self.assertEqual(result.first(ATTACK).rule, 'sql_union')
+        self.assertEqual(result.first(SUSPICIOUS).source, 'query')
+        self.assertIsNone(result.first(DANGEROUS))
+        
+        # El análisis se hace una sola vez por request
+        self.assertIs(scan_request(request), result)
+    
+    def test_overlapping_rules_keep_every_category(self):
+        request = self.factory.post('/api/testimonials/', '{"text": "<script>alert(1)</script>"}', content_type='application/json')
+        result = scan_request(request)
+        
+        self.assertEqual(result.first(ATTACK).rule, 'script_tag')
+        self.assertEqual(result.first(DANGEROUS).rule, 'script_tag')
+        self.assertEqual(result.first(SUSPICIOUS).source, 'body')
+    
+    def test_body_limits_by_content_type(self):
+        padding = 'a' * (64 * 1024)
+        request = self.factory.post('/api/', f'{{"x": "{padding} ../../etc/passwd"}}', content_type='application/json')
+        self.assertIsNone(scan_request(request).first(ATTACK))
+        
+        request = self.factory.post('/api/', b'../../etc/passwd', content_type='application/octet-stream')
+        self.assertIsNone(scan_request(request).first(ATTACK))
+        
+        request = self.factory.post('/api/', {'name': 'javascript:alert(1)'})
+        self.assertEqual(scan_request(request).first(DANGEROUS).rule, 'javascript_uri')
+    
+    @override_settings(ENABLE_ADVANCED_SECURITY=True)
+    def test_advanced_security_blocks_attack(self):
+        middleware = AdvancedSecurityMiddleware(lambda request: HttpResponse())
+        user_agent = 'Mozilla/5.0 (X11; Linux x86_64)'
+        
+        request = self.factory.get('/api/dresses/', {'file': '../../etc/passwd'}, HTTP_USER_AGENT=user_agent)
+        self.assertEqual(middleware.process_request(request).status_code, 400)
+        
+        request = self.factory.get('/api/dresses/', {'style': 'Sirena'}, HTTP_USER_AGENT=user_agent)
+        self.assertIsNone(middleware._contains_suspicious_patterns(request))
+
+
+@override_settings(RATE_LIMIT_REDIS_URL='')
+class RateLimiterTest(SimpleTestCase):
+    """Tests para el rate limiter común (contadores en memoria)"""
+    
+    def setUp(self):
+        RateLimiter.reset_backend()
+        self.factory = RequestFactory()
+    
+    def tearDown(self):
+        RateLimiter.reset_backend()
+    
+    def test_allow_until_limit(self):
+        policy = RatePolicy('test', 3, 60)
+        results = [RateLimiter.allow(policy, '1.2.3.4') for _ in range(4)]
+        
+        self.assertEqual([result.allowed for result in results], [True, True, True, False])
+        self.assertGreater(results[-1].retry_after, 0)
+        self.assertTrue(RateLimiter.allow(policy, '5.6.7.8').allowed)
+    
+    def test_concurrent_requests_do_not_lose_updates(self):
+        policy = RatePolicy('concurrent', 50, 60)
+        results = []
+        
+        def worker():
+            for _ in range(10):
+                results.append(RateLimiter.allow(policy, 'ip').allowed)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(results.count(True), 50)
+    
+    def test_login_failures(self):
+        for _ in range(4):
+            RateLimiter.hit('login_failures', 'ip')
+        self.assertTrue(RateLimiter.peek('login_failures', 'ip').allowed)
+        
+        RateLimiter.hit('login_failures', 'ip')
+        self.assertFalse(RateLimiter.peek('login_failures', 'ip').allowed)
+        
+        RateLimiter.reset('login_failures', 'ip')
+        self.assertTrue(RateLimiter.peek('login_failures', 'ip').allowed)
+    
+    @override_settings(RATE_LIMIT_POLICIES={'appointments_create': (2, 300)})
+    def test_route_policies(self):
+        self.assertEqual(route_policy('/api/appointments/create/').limit, 2)
+        self.assertEqual(route_policy('/api/appointments/1/').name, 'appointments')
+        self.assertIsNone(route_policy('/admin/'))
+        
+        middleware = SecurityMiddleware(lambda request: HttpResponse())
+        statuses = []
+        for _ in range(3):
+            response = middleware.process_request(self.factory.post('/api/appointments/create/'))
+            statuses.append(response.status_code if response else 200)
+        
+        self.assertEqual(statuses, [200, 200, 429])
+    
+    @override_settings(RATE_LIMIT_REDIS_URL='redis://127.0.0.1:1/0', REDIS_SOCKET_TIMEOUT=0.05)
+    def test_redis_failure_opens_circuit(self):
+        """Tras un fallo de Redis se usan los contadores locales sin reintentar"""
+        backend = RateLimiter.get_backend()
+        self.assertIsInstance(backend, RedisRateLimitBackend)
+        self.assertEqual(backend.client.connection_pool.connection_kwargs['socket_timeout'], 0.05)
+        
+        policy = RatePolicy('circuit', 2, 60)
+        with patch.object(RedisRateLimitBackend, 'evaluate', side_effect=ConnectionError) as evaluate:
+            results = [RateLimiter.allow(policy, 'ip').allowed for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        evaluate.assert_called_once()
+
+
+@override_settings(RATE_LIMIT_REDIS_URL='')
+class SecurityPipelineTest(SimpleTestCase):
+    """Tests para el pipeline de seguridad y el contexto por request"""
+    
+    def setUp(self):
+        RateLimiter.reset_backend()
+        self.factory = RequestFactory()
+        self.user_agent = 'Mozilla/5.0 (X11; Linux x86_64)'
+    
+    def tearDown(self):
+        RateLimiter.reset_backend()
+    
+    def test_context_is_computed_once(self):
+        request = self.factory.get('/API/Dresses/', HTTP_X_FORWARDED_FOR='203.0.113.9, 10.0.0.1', HTTP_USER_AGENT='Mozilla')
+        context = get_security_context(request)
+        
+        self.assertIs(get_security_context(request), context)
+        self.assertEqual(context.ip, '203.0.113.9')
+        self.assertEqual(context.path, '/api/dresses/')
+        self.assertEqual(context.user_agent, 'mozilla')
+        self.assertIsNone(context.user_id)
+    
+    @override_settings(SECURITY_PIPELINE_STAGES=['user_agent', 'attack_patterns', 'rate_limit'], DEBUG=False)
+    def test_stages_and_header_block(self):
+        pipeline = SecurityPipelineMiddleware(lambda request: HttpResponse())
+        
+        response = pipeline(self.factory.get('/api/dresses/', {'q': '<script>'}, HTTP_USER_AGENT=self.user_agent))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        
+        response = pipeline(self.factory.get('/api/dresses/', HTTP_USER_AGENT='sqlmap/1.7 (https://sqlmap.org)'))
+        self.assertEqual(response.status_code, 403)
+        
+        response = pipeline(self.factory.get('/api/dresses/', HTTP_USER_AGENT=self.user_agent, secure=True))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age', response['Strict-Transport-Security'])
+    
+    @override_settings(SECURITY_PIPELINE_STAGES=['rate_limit'], DEBUG=False)
+    def test_disabled_stages_do_not_run(self):
+        pipeline = SecurityPipelineMiddleware(lambda request: HttpResponse())
+        response = pipeline(self.factory.get('/api/dresses/', {'q': '<script>'}, HTTP_USER_AGENT='sqlmap'))
+        self.assertEqual(response.status_code, 200)
+    
+    @override_settings(SECURITY_PIPELINE_STAGES=['ip_reputation'], SECURITY_MONITOR_REDIS_URL='', DEBUG=True)
+    def test_ip_reputation_stage(self):
+        SecurityMonitor.reset_store()
+        pipeline = SecurityPipelineMiddleware(lambda request: HttpResponse())
+        try:
+            for _ in range(SecurityMonitor.SUSPICIOUS_THRESHOLDS['suspicious_patterns_per_ip']):
+                response = pipeline(self.factory.get('/api/dresses/', {'q': '1 union select password'}, REMOTE_ADDR='198.51.100.20'))
+                self.assertEqual(response.status_code, 200)
+            
+            response = pipeline(self.factory.get('/api/dresses/', REMOTE_ADDR='198.51.100.20'))
+            self.assertEqual(response.status_code, 403)
+            response = pipeline(self.factory.get('/api/dresses/', REMOTE_ADDR='198.51.100.21'))
+            self.assertEqual(response.status_code, 200)
+        finally:
+            SecurityMonitor.reset_store()
+    
+    @override_settings(SECURITY_PIPELINE_STAGES=['rate_limit', 'firewall'])
+    def test_unknown_stage(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SecurityPipelineMiddleware(lambda request: HttpResponse())
@@ -31,8 +31,18 @@ app.conf.update(
     task_routes={
         'backend.apps.appointments.tasks.send_appointment_email': {'queue': 'email'},
         'backend.apps.appointments.tasks.send_appointment_whatsapp': {'queue': 'whatsapp'},
+        'backend.apps.appointments.tasks.send_confirmation_email': {'queue': 'email'},
+        'backend.apps.appointments.tasks.send_confirmation_whatsapp': {'queue': 'whatsapp'},
         'backend.apps.appointments.tasks.send_notification': {'queue': 'notifications'},
         'backend.apps.appointments.tasks.cleanup_old_appointments': {'queue': 'cleanup'},
+        'backend.apps.appointments.tasks.cleanup_security_data': {'queue': 'cleanup'},
+        'backend.apps.analytics.tasks.flush_analytics_events': {'queue': 'default'},
+        'backend.apps.analytics.tasks.rollup_business_metrics': {'queue': 'default'},
+        'backend.apps.analytics.tasks.maintain_analytics_partitions': {'queue': 'cleanup'},
+        'backend.apps.analytics.tasks.close_idle_sessions': {'queue': 'cleanup'},
+        'backend.apps.core.images.generate_image_renditions': {'queue': 'default'},
+        'backend.apps.core.sitemaps.generate_sitemap': {'queue': 'default'},
+        'backend.apps.core.tasks.collect_system_metrics': {'queue': 'default'},
     },
     
     # Queue configuration
@@ -51,7 +61,7 @@ app.conf.update(
     worker_task_log_format='[%(asctime)s: %(levelname)s/%(processName)s][%(task_name)s(%(task_id)s)] %(message)s',
     
     # Task execution
-    task_always_eager=False,
+    task_always_eager=getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False),
     task_eager_propagates=True,
     task_ignore_result=False,
     task_store_eager_result=True,
@@ -80,11 +90,41 @@ app.conf.update(
             'schedule': 3600.0,  # Cada hora
             'options': {'queue': 'cleanup'}
         },
+        'cleanup-security-data': {
+            'task': 'backend.apps.appointments.tasks.cleanup_security_data',
+            'schedule': 86400.0,  # Cada día
+            'options': {'queue': 'cleanup'}
+        },
         'send-daily-summary': {
             'task': 'backend.apps.appointments.tasks.send_daily_summary',
             'schedule': 86400.0,  # Cada día
             'options': {'queue': 'email'}
         },
+        'flush-analytics-events': {
+            'task': 'backend.apps.analytics.tasks.flush_analytics_events',
+            'schedule': 10.0,  # Cada 10 segundos
+            'options': {'queue': 'default'}
+        },
+        'rollup-business-metrics': {
+            'task': 'backend.apps.analytics.tasks.rollup_business_metrics',
+            'schedule': 3600.0,  # Cada hora
+            'options': {'queue': 'default'}
+        },
+        'maintain-analytics-partitions': {
+            'task': 'backend.apps.analytics.tasks.maintain_analytics_partitions',
+            'schedule': 86400.0,  # Cada día
+            'options': {'queue': 'cleanup'}
+        },
+        'close-idle-sessions': {
+            'task': 'backend.apps.analytics.tasks.close_idle_sessions',
+            'schedule': 600.0,  # Cada 10 minutos
+            'options': {'queue': 'cleanup'}
+        },
+        'collect-system-metrics': {
+            'task': 'backend.apps.core.tasks.collect_system_metrics',
+            'schedule': float(getattr(settings, 'MONITORING_COLLECT_INTERVAL', 15)),
+            'options': {'queue': 'default', 'expires': getattr(settings, 'MONITORING_COLLECT_INTERVAL', 15)}
+        },
         'backup-database': {
             'task': 'backend.apps.core.tasks.backup_database',
             'schedule': 21600.0,  # Cada 6 horas
@@ -73,19 +73,21 @@ INSTALLED_APPS = [
     'backend.apps.notifications',
     'backend.apps.core',
     'backend.apps.analytics',
+    'backend.apps.search',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
+    'backend.middleware.metrics.MetricsMiddleware',  # Métricas Prometheus (primero: mide toda la cadena)
+    'backend.middleware.querybudget.QueryBudgetMiddleware',  # Presupuesto de consultas / N+1 (QUERY_BUDGET_ENABLED)
     'corsheaders.middleware.CorsMiddleware',
-    'backend.middleware.security.SecurityMiddleware',  # Nuestro middleware de seguridad
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'backend.middleware.security.CSRFSecurityMiddleware',  # Validación CSRF adicional
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'backend.middleware.security.DataSanitizationMiddleware',  # Sanitización de datos
+    'backend.middleware.pipeline.SecurityPipelineMiddleware',  # Rate limiting, detección de ataques y sanitización
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -249,6 +251,51 @@ TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
 TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_FROM', '')  # whatsapp:+14155238886
 
+# Celery configuration
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://127.0.0.1:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+# En desarrollo (sin worker) las tareas se ejecutan en el propio proceso
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', str(DEBUG)).lower() in ('true', '1', 'yes')
+
+# Analytics: buffer de eventos en Redis (vacío = escritura directa con bulk_create)
+ANALYTICS_EVENT_BUFFER_URL = os.environ.get('ANALYTICS_EVENT_BUFFER_URL', '')
+# Retención de eventos: los meses más antiguos se archivan (gzip NDJSON) y se eliminan
+ANALYTICS_RETENTION_MONTHS = int(os.environ.get('ANALYTICS_RETENTION_MONTHS', 13))
+ANALYTICS_ARCHIVE_DIR = os.environ.get('ANALYTICS_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archives', 'analytics'))
+
+# Sitemap precalculado (gzip) que regenera Celery cuando cambian vestidos o testimonios
+SITEMAP_ROOT = os.environ.get('SITEMAP_ROOT', os.path.join(BASE_DIR, 'sitemaps'))
+
+# Rate limiting: Redis con script Lua atómico (vacío = contadores en memoria del proceso)
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', '')
+
+# Eventos de SecurityMonitor (reputación por IP): mismo Redis que el rate limiting por defecto
+SECURITY_MONITOR_REDIS_URL = os.environ.get('SECURITY_MONITOR_REDIS_URL', RATE_LIMIT_REDIS_URL)
+
+# Timeouts de Redis (segundos) y enfriamiento tras un fallo (contadores locales mientras tanto)
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 0.25))
+REDIS_FAILURE_COOLDOWN = int(os.environ.get('REDIS_FAILURE_COOLDOWN', 30))
+
+# Segundos entre muestras del colector de métricas (tarea collect_system_metrics)
+MONITORING_COLLECT_INTERVAL = int(os.environ.get('MONITORING_COLLECT_INTERVAL', 15))
+
+# Instrumentación Prometheus (backend/apps/core/metrics.py). Con varios procesos
+# definir PROMETHEUS_MULTIPROC_DIR en el entorno antes de arrancar
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+CELERY_METRICS_PORT = os.environ.get('CELERY_METRICS_PORT', '')
+
+# Presupuesto de consultas por request y detección de N+1 (desarrollo y CI).
+# QUERY_BUDGET_RAISE hace fallar la request (y el test) en lugar de avisar en el log
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', 'False').lower() in ('true', '1', 'yes')
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', 'False').lower() in ('true', '1', 'yes')
+QUERY_BUDGET_MAX_QUERIES = int(os.environ.get('QUERY_BUDGET_MAX_QUERIES', 50))
+QUERY_BUDGET_MAX_REPEATS = int(os.environ.get('QUERY_BUDGET_MAX_REPEATS', 5))
+# Presupuestos por nombre de vista: {'dress-list': {'max_queries': 5, 'max_repeats': 1}}
+QUERY_BUDGETS = {}
+
+# Etapas del pipeline de seguridad, en orden (vacío = etapas por defecto, ver backend/middleware/pipeline.py)
+SECURITY_PIPELINE_STAGES = [stage for stage in os.environ.get('SECURITY_PIPELINE_STAGES', '').split(',') if stage]
+
 # Logging configuration
 LOGGING = {
     'version': 1,
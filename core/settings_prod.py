@@ -42,12 +42,15 @@ LOCAL_APPS = [
     'backend.apps.appointments',
     'backend.apps.testimonials',
     'backend.apps.notifications',
+    'backend.apps.core',
     'backend.apps.analytics',
+    'backend.apps.search',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'backend.middleware.metrics.MetricsMiddleware',  # Métricas Prometheus (primero: mide toda la cadena)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Para servir archivos estáticos
@@ -57,7 +60,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'backend.middleware.security.SecurityMiddleware',
+    'backend.middleware.pipeline.SecurityPipelineMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -299,12 +302,33 @@ if config('SENTRY_DSN', default=None):
 # Rate Limiting
 RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = 'default'
+# Contadores atómicos compartidos por todos los workers (backend/middleware/ratelimit.py)
+RATE_LIMIT_REDIS_URL = config('RATE_LIMIT_REDIS_URL', default=config('REDIS_URL', default='redis://localhost:6379/0'))
+# Eventos de SecurityMonitor en sorted sets (backend/apps/appointments/security_monitor.py)
+SECURITY_MONITOR_REDIS_URL = config('SECURITY_MONITOR_REDIS_URL', default=RATE_LIMIT_REDIS_URL)
+# Timeouts de Redis (segundos) y enfriamiento tras un fallo, en los que se usan contadores locales
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=0.25, cast=float)
+REDIS_FAILURE_COOLDOWN = config('REDIS_FAILURE_COOLDOWN', default=30, cast=int)
+# Segundos entre muestras del colector de métricas (tarea collect_system_metrics)
+MONITORING_COLLECT_INTERVAL = config('MONITORING_COLLECT_INTERVAL', default=15, cast=int)
+# Instrumentación Prometheus; gunicorn y Celery usan PROMETHEUS_MULTIPROC_DIR (modo multiproceso)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+CELERY_METRICS_PORT = config('CELERY_METRICS_PORT', default=9808, cast=int)
 
 # Configuración específica de Orta Novias
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_WHATSAPP_FROM = config('TWILIO_WHATSAPP_FROM', default='')
 
+# Analytics: buffer de eventos en Redis, volcado por Celery en lotes
+ANALYTICS_EVENT_BUFFER_URL = config('ANALYTICS_EVENT_BUFFER_URL', default='')
+# Retención de eventos: los meses más antiguos se archivan (gzip NDJSON) y se eliminan
+ANALYTICS_RETENTION_MONTHS = config('ANALYTICS_RETENTION_MONTHS', default=13, cast=int)
+ANALYTICS_ARCHIVE_DIR = config('ANALYTICS_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archives', 'analytics'))
+
+# Sitemap precalculado (gzip) que regenera Celery cuando cambian vestidos o testimonios
+SITEMAP_ROOT = config('SITEMAP_ROOT', default=os.path.join(BASE_DIR, 'sitemaps'))
+
 # AWS S3 Configuration (opcional)
 USE_S3 = config('USE_S3', default=False, cast=bool)
 
@@ -336,7 +360,12 @@ BLOCKED_COUNTRIES = config('BLOCKED_COUNTRIES', default='', cast=Csv())
 CLOUDFLARE_IPS_V4 = config('CLOUDFLARE_IPS_V4', default='', cast=Csv())
 CLOUDFLARE_IPS_V6 = config('CLOUDFLARE_IPS_V6', default='', cast=Csv())
 
-# Actualizar MIDDLEWARE para incluir Cloudflare (solo si está habilitado)
-if USE_CLOUDFLARE:
-    MIDDLEWARE.insert(1, 'backend.middleware.cloudflare.CloudflareMiddleware')
-    MIDDLEWARE.insert(2, 'backend.middleware.cloudflare.CloudflareSecurityMiddleware')
+# Recarga periódica de los rangos de Cloudflare (un CIDR por línea en el fichero,
+# o una lista de CIDRs en la clave de cache); vacíos = listas por defecto
+CLOUDFLARE_IPS_FILE = config('CLOUDFLARE_IPS_FILE', default='') or None
+CLOUDFLARE_IPS_CACHE_KEY = config('CLOUDFLARE_IPS_CACHE_KEY', default='') or None
+CLOUDFLARE_IPS_REFRESH_SECONDS = config('CLOUDFLARE_IPS_REFRESH_SECONDS', default=3600, cast=int)
+
+# Las etapas de Cloudflare del pipeline de seguridad solo actúan con USE_CLOUDFLARE.
+# Etapas activas, en orden (vacío = por defecto); p. ej. añadir user_agent,attack_patterns
+SECURITY_PIPELINE_STAGES = config('SECURITY_PIPELINE_STAGES', default='', cast=Csv())
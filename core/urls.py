@@ -22,7 +22,7 @@ from django.conf.urls.static import static
 # Importar vistas de monitoreo
 from backend.apps.core.monitoring import health_check, detailed_health_check, metrics_endpoint
 # Importar vistas de SEO
-from backend.apps.core.seo import sitemap_xml, robots_txt, structured_data_json
+from backend.apps.core.seo import sitemap_xml, sitemap_shard_xml, robots_txt, structured_data_json
 
 def api_root(request):
     """Vista simple para la raíz que muestra información de la API"""
@@ -53,6 +53,7 @@ urlpatterns = [
     
     # SEO URLs
     path('sitemap.xml', sitemap_xml, name='sitemap'),
+    path('sitemap-<int:shard>.xml', sitemap_shard_xml, name='sitemap_shard'),
     path('robots.txt', robots_txt, name='robots'),
     path('structured-data/<str:page>/', structured_data_json, name='structured_data'),
 ]
@@ -12,6 +12,7 @@ import DressesPage from './pages/DressesPage';
 import TestimonialsPage from './pages/TestimonialsPage';
 import AppointmentsPage from './pages/AppointmentsPage';
 import NotificationsPage from './pages/NotificationsPage';
+import SearchPage from './pages/SearchPage';
 //import AuthPage from './pages/AuthPage';
 import NotFoundPage from './pages/NotFoundPage';
 
@@ -37,6 +38,7 @@ function App() {
               <Route path="/dresses" element={<DressesPage />} />
               <Route path="/testimonials" element={<TestimonialsPage />} />
               <Route path="/appointments" element={<AppointmentsPage />} />
+              <Route path="/buscar" element={<SearchPage />} />
               <Route path="/notifications" element={
                // <ProtectedRoute>
                   <NotificationsPage />
@@ -1,27 +1,21 @@
-import React, { useEffect, useState } from 'react';
-import { getDresses } from '../services/dresses';
-import type { Dress } from '../types';
+import React, { useCallback } from 'react';
+import { getDressesPage } from '../services/dresses';
+import { useCursorList } from '../hooks/useCursorList';
 
-const DressList: React.FC = () => {
-  const [dresses, setDresses] = useState<Dress[]>([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState('');
+const PAGE_SIZE = 24;
 
-  useEffect(() => {
-    getDresses()
-      .then(data => setDresses(data))
-      .catch((err) => {
-        if (err instanceof Error && err.message) {
-          setError(`Error al cargar los vestidos: ${err.message}`);
-        } else {
-          setError('Error al cargar los vestidos');
-        }
-      })
-      .finally(() => setLoading(false));
-  }, []);
+const DressList: React.FC = () => {
+  const fetchPage = useCallback((cursor: string | null) => getDressesPage(cursor, { page_size: PAGE_SIZE }), []);
+  const { items: dresses, loading, loadingMore, error, hasMore, loadMore } = useCursorList(fetchPage);
 
   if (loading) return <p>Cargando vestidos...</p>;
-  if (error) return <p className="text-red-600">{error}</p>;
+  if (error) {
+    return (
+      <p className="text-red-600">
+        {error instanceof Error && error.message ? `Error al cargar los vestidos: ${error.message}` : 'Error al cargar los vestidos'}
+      </p>
+    );
+  }
 
   return (
     <div>
@@ -40,6 +34,11 @@ const DressList: React.FC = () => {
           ))}
         </ul>
       )}
+      {hasMore && (
+        <button onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? 'Cargando...' : 'Cargar más'}
+        </button>
+      )}
     </div>
   );
 };
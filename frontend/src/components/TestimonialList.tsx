@@ -1,27 +1,21 @@
-import React, { useEffect, useState } from 'react';
-import { getTestimonials } from '../services/testimonials';
-import type { BrideTestimonial } from '../types';
+import React, { useCallback } from 'react';
+import { getTestimonialsPage } from '../services/testimonials';
+import { useCursorList } from '../hooks/useCursorList';
 
-const TestimonialList: React.FC = () => {
-  const [testimonials, setTestimonials] = useState<BrideTestimonial[]>([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState('');
+const PAGE_SIZE = 24;
 
-  useEffect(() => {
-    getTestimonials()
-      .then(data => setTestimonials(data))
-      .catch((err) => {
-        if (err instanceof Error && err.message) {
-          setError(`Error al cargar los testimonios: ${err.message}`);
-        } else {
-          setError('Error al cargar los testimonios');
-        }
-      })
-      .finally(() => setLoading(false));
-  }, []);
+const TestimonialList: React.FC = () => {
+  const fetchPage = useCallback((cursor: string | null) => getTestimonialsPage(cursor, { page_size: PAGE_SIZE }), []);
+  const { items: testimonials, loading, loadingMore, error, hasMore, loadMore } = useCursorList(fetchPage);
 
   if (loading) return <p>Cargando testimonios...</p>;
-  if (error) return <p className="text-red-600">{error}</p>;
+  if (error) {
+    return (
+      <p className="text-red-600">
+        {error instanceof Error && error.message ? `Error al cargar los testimonios: ${error.message}` : 'Error al cargar los testimonios'}
+      </p>
+    );
+  }
 
   return (
     <div>
@@ -39,6 +33,11 @@ const TestimonialList: React.FC = () => {
           ))}
         </ul>
       )}
+      {hasMore && (
+        <button onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? 'Cargando...' : 'Cargar más'}
+        </button>
+      )}
     </div>
   );
 };
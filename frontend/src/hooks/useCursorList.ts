@@ -0,0 +1,53 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+import type { CursorPage } from '../types';
+
+// Listado paginado por cursor: carga solo la primera página y las siguientes
+// bajo demanda con loadMore(). `fetchPage` debe ser estable (useCallback):
+// al cambiar (p. ej. con otros filtros) el listado vuelve a empezar.
+export function useCursorList<T>(fetchPage: (cursor: string | null) => Promise<CursorPage<T>>) {
+  const [items, setItems] = useState<T[]>([]);
+  const [next, setNext] = useState<string | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState<unknown>(null);
+  // Descarta las respuestas de un listado anterior
+  const generation = useRef(0);
+
+  useEffect(() => {
+    const current = ++generation.current;
+    setLoading(true);
+    setError(null);
+    setItems([]);
+    setNext(null);
+    fetchPage(null)
+      .then(page => {
+        if (current !== generation.current) return;
+        setItems(page.results);
+        setNext(page.next);
+      })
+      .catch(err => {
+        if (current === generation.current) setError(err);
+      })
+      .finally(() => {
+        if (current === generation.current) setLoading(false);
+      });
+  }, [fetchPage]);
+
+  const loadMore = useCallback(() => {
+    if (!next || loadingMore) return;
+    const current = generation.current;
+    setLoadingMore(true);
+    fetchPage(next)
+      .then(page => {
+        if (current !== generation.current) return;
+        setItems(prev => [...prev, ...page.results]);
+        setNext(page.next);
+      })
+      .catch(err => {
+        if (current === generation.current) setError(err);
+      })
+      .finally(() => setLoadingMore(false));
+  }, [fetchPage, next, loadingMore]);
+
+  return { items, setItems, loading, loadingMore, error, hasMore: next !== null, loadMore };
+}
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { ChevronLeft, ChevronRight, Filter, Grid, List, Search, X, Calendar, Tag, CheckCircle } from 'lucide-react';
 import type { Dress } from '../types';
-import { getDresses } from '../services/dresses';
+import { getDressesPage, getDressFacets } from '../services/dresses';
 import EnhancedGallery from '../components/EnhancedGallery';
 import SEOComponent from '../components/SEO';
 
@@ -11,10 +11,16 @@ const DressesPage: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [selectedStyle, setSelectedStyle] = useState('');
+  const [styles, setStyles] = useState<string[]>([]);
   const [searchTerm, setSearchTerm] = useState('');
   const [showFilters, setShowFilters] = useState(false);
   const [viewMode, setViewMode] = useState<'grid' | 'list'>('grid');
+  // Paginación por cursor: se descarga solo la página visible
+  const [cursor, setCursor] = useState<string | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [previousCursor, setPreviousCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState<number | null>(null);
   const [selectedDress, setSelectedDress] = useState<Dress | null>(null);
   const [showModal, setShowModal] = useState(false);
   const [currentImageIndex, setCurrentImageIndex] = useState(0);
@@ -22,15 +28,31 @@ const DressesPage: React.FC = () => {
   const [galleryImages, setGalleryImages] = useState<string[]>([]);
   const itemsPerPage = 6;
 
-  // Cargar vestidos del backend
+  // Total del filtro actual y estilos disponibles a partir de las facetas
+  // precalculadas del backend (sin descargar el catálogo)
   useEffect(() => {
+    getDressFacets({ style: selectedStyle || undefined })
+      .then(facets => {
+        setTotal(facets.total);
+        if (!selectedStyle) setStyles(facets.style.map(facet => facet.value).filter(Boolean));
+      })
+      .catch(err => console.error('Error fetching dress facets:', err));
+  }, [selectedStyle]);
+
+  // Cargar la página actual del backend (el filtro de estilo se aplica en el servidor)
+  useEffect(() => {
+    let cancelled = false;
     const fetchDresses = async () => {
       try {
         setLoading(true);
-        const data = await getDresses();
-        setDresses(data);
+        const page = await getDressesPage(cursor, { page_size: itemsPerPage, style: selectedStyle || undefined });
+        if (cancelled) return;
+        setDresses(page.results);
+        setNextCursor(page.next);
+        setPreviousCursor(page.previous);
         setError(null);
       } catch (err) {
+        if (cancelled) return;
         console.error('Error fetching dresses:', err);
         setError('Error al cargar los vestidos. Mostrando datos de ejemplo.');
         // Fallback a datos de ejemplo si falla la API
@@ -62,31 +84,43 @@ const DressesPage: React.FC = () => {
           }
         ];
         setDresses(mockDresses);
+        setNextCursor(null);
+        setPreviousCursor(null);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchDresses();
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [cursor, selectedStyle]);
 
-  // Filtrar vestidos
-  const filteredDresses = dresses.filter(dress => {
-    return (
-      (selectedStyle === '' || dress.style === selectedStyle) &&
-      (searchTerm === '' || dress.name.toLowerCase().includes(searchTerm.toLowerCase()))
-    );
+  // Filtrar la página actual por nombre (el estilo ya viene filtrado del backend)
+  const currentDresses = dresses.filter(dress => {
+    return searchTerm === '' || dress.name.toLowerCase().includes(searchTerm.toLowerCase());
   });
 
-  // Paginación
-  const totalPages = Math.ceil(filteredDresses.length / itemsPerPage);
+  const totalPages = total !== null ? Math.max(1, Math.ceil(total / itemsPerPage)) : null;
   const startIndex = (currentPage - 1) * itemsPerPage;
-  const currentDresses = filteredDresses.slice(startIndex, startIndex + itemsPerPage);
+
+  const goToPage = (pageCursor: string | null, step: number) => {
+    if (!pageCursor) return;
+    setCursor(pageCursor);
+    setCurrentPage(prev => prev + step);
+  };
+
+  // Un filtro nuevo vuelve a la primera página
+  const changeStyle = (style: string) => {
+    setSelectedStyle(style);
+    setCursor(null);
+    setCurrentPage(1);
+  };
 
   const clearFilters = () => {
-    setSelectedStyle('');
+    changeStyle('');
     setSearchTerm('');
-    setCurrentPage(1);
   };
 
   const openModal = (dress: Dress) => {
@@ -140,10 +174,7 @@ const DressesPage: React.FC = () => {
     }
   };
 
-  // Obtener estilos únicos de los vestidos
-  const styles = Array.from(new Set(dresses.map(dress => dress.style))).filter(Boolean);
-
-  if (loading) {
+  if (loading && dresses.length === 0) {
     return (
       <div className="min-h-screen bg-[#FAF7F4] flex items-center justify-center">
         <div className="text-center">
@@ -262,7 +293,7 @@ const DressesPage: React.FC = () => {
                 <label className="block text-sm font-medium text-gray-700 mb-2">Estilo</label>
                 <select
                   value={selectedStyle}
-                  onChange={(e) => setSelectedStyle(e.target.value)}
+                  onChange={(e) => changeStyle(e.target.value)}
                   className="w-full px-4 py-3 border border-gray-200 rounded-lg focus:ring-2 focus:ring-[#D4B483] focus:border-transparent outline-none transition-all duration-300"
                 >
                   <option value="">Todos los estilos</option>
@@ -277,7 +308,9 @@ const DressesPage: React.FC = () => {
 
         {/* Results count */}
         <p className="text-gray-600 mb-6">
-          Mostrando {Math.min(startIndex + 1, filteredDresses.length)}-{Math.min(startIndex + itemsPerPage, filteredDresses.length)} de {filteredDresses.length} vestidos
+          {dresses.length === 0
+            ? 'No hay vestidos con estos filtros'
+            : `Mostrando ${startIndex + 1}-${startIndex + dresses.length}${total !== null ? ` de ${total}` : ''} vestidos`}
         </p>
 
         {/* Dress Grid/List */}
@@ -384,36 +417,24 @@ const DressesPage: React.FC = () => {
         )}
 
         {/* Pagination */}
-        {totalPages > 1 && (
+        {(previousCursor || nextCursor) && (
           <div className="flex justify-center items-center gap-4">
             <button
-              onClick={() => setCurrentPage(prev => Math.max(prev - 1, 1))}
-              disabled={currentPage === 1}
+              onClick={() => goToPage(previousCursor, -1)}
+              disabled={!previousCursor || loading}
               className="flex items-center gap-2 px-4 py-2 border border-gray-200 rounded-lg disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50 transition-colors duration-300"
             >
               <ChevronLeft className="w-5 h-5" />
               Anterior
             </button>
             
-            <div className="flex gap-2">
-              {Array.from({ length: totalPages }, (_, i) => i + 1).map(page => (
-                <button
-                  key={page}
-                  onClick={() => setCurrentPage(page)}
-                  className={`w-10 h-10 rounded-lg transition-colors duration-300 ${
-                    currentPage === page
-                      ? 'bg-[#8A2E3B] text-white'
-                      : 'border border-gray-200 hover:bg-gray-50'
-                  }`}
-                >
-                  {page}
-                </button>
-              ))}
-            </div>
+            <span className="text-gray-600">
+              Página {currentPage}{totalPages !== null ? ` de ${totalPages}` : ''}
+            </span>
             
             <button
-              onClick={() => setCurrentPage(prev => Math.min(prev + 1, totalPages))}
-              disabled={currentPage === totalPages}
+              onClick={() => goToPage(nextCursor, 1)}
+              disabled={!nextCursor || loading}
               className="flex items-center gap-2 px-4 py-2 border border-gray-200 rounded-lg disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50 transition-colors duration-300"
             >
               Siguiente
@@ -0,0 +1,80 @@
+import React, { useEffect, useState } from 'react';
+import { Link, useSearchParams } from 'react-router-dom';
+import { search } from '../services/search';
+import type { SearchResponse } from '../services/search';
+
+// Página de resultados de /buscar?q= (SearchAction del JSON-LD)
+const SearchPage: React.FC = () => {
+  const [searchParams, setSearchParams] = useSearchParams();
+  const query = searchParams.get('q') || '';
+  const page = Number(searchParams.get('page') || '1');
+  const [term, setTerm] = useState(query);
+  const [data, setData] = useState<SearchResponse | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  useEffect(() => {
+    setTerm(query);
+    if (!query.trim()) {
+      setData(null);
+      return;
+    }
+    setLoading(true);
+    search(query, page)
+      .then(response => {
+        setData(response);
+        setError(null);
+      })
+      .catch(() => setError('Error al realizar la búsqueda'))
+      .finally(() => setLoading(false));
+  }, [query, page]);
+
+  const submit = (e: React.FormEvent) => {
+    e.preventDefault();
+    setSearchParams(term.trim() ? { q: term.trim() } : {});
+  };
+
+  return (
+    <div className="max-w-4xl mx-auto px-4 py-8">
+      <form onSubmit={submit} className="mb-8">
+        <input
+          type="search"
+          value={term}
+          onChange={(e) => setTerm(e.target.value)}
+          placeholder="Buscar vestidos y testimonios..."
+          className="w-full px-4 py-3 border border-gray-200 rounded-lg focus:ring-2 focus:ring-[#D4B483] focus:border-transparent outline-none"
+        />
+      </form>
+
+      {loading && <p className="text-gray-600">Buscando...</p>}
+      {error && <p className="text-red-600">{error}</p>}
+
+      {data && !loading && (
+        <>
+          <p className="text-gray-600 mb-6">{data.count} resultados para «{data.query}»</p>
+          <ul className="space-y-6">
+            {data.results.map(result => (
+              <li key={`${result.type}-${result.id}`} className="bg-white rounded-xl shadow p-6">
+                <Link to={result.type === 'dress' ? '/dresses' : '/testimonials'}>
+                  {/* El backend escapa el texto: solo añade las etiquetas <mark> */}
+                  <h2 className="text-xl font-semibold text-[#8A2E3B]" dangerouslySetInnerHTML={{ __html: result.title }} />
+                </Link>
+                <p className="text-gray-700 mt-2" dangerouslySetInnerHTML={{ __html: result.snippet }} />
+              </li>
+            ))}
+          </ul>
+          <div className="flex justify-between mt-8">
+            {data.previous ? (
+              <button onClick={() => setSearchParams({ q: query, page: String(page - 1) })}>Anterior</button>
+            ) : <span />}
+            {data.next && (
+              <button onClick={() => setSearchParams({ q: query, page: String(page + 1) })}>Siguiente</button>
+            )}
+          </div>
+        </>
+      )}
+    </div>
+  );
+};
+
+export default SearchPage;
@@ -1,19 +1,24 @@
-import React, { useState, useEffect } from 'react';
+import React, { useCallback, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { Calendar, Quote, ChevronLeft, ChevronRight } from 'lucide-react';
+import { Calendar, Quote, ChevronDown } from 'lucide-react';
 import type { BrideTestimonial } from '../types';
-import { getTestimonials } from '../services/testimonials';
+import { getTestimonialsPage } from '../services/testimonials';
+import { useCursorList } from '../hooks/useCursorList';
 import SEO from '../components/SEO';
 import { useAnalyticsContext } from '../components/AnalyticsProvider';
 import { useConversionTracking } from '../hooks/useAnalytics';
 
 const TestimonialsPage: React.FC = () => {
-  const [testimonials, setTestimonials] = useState<BrideTestimonial[]>([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState<string | null>(null);
-  const [currentPage, setCurrentPage] = useState(1);
   const testimonialsPerPage = 6;
 
+  // Cargar testimonios del backend: solo la primera página, el resto bajo demanda
+  const fetchPage = useCallback(
+    (cursor: string | null) => getTestimonialsPage(cursor, { page_size: testimonialsPerPage }),
+    []
+  );
+  const { items: testimonials, loading, loadingMore, error: loadError, hasMore, loadMore } = useCursorList(fetchPage);
+  const error = loadError ? 'Error al conectar con el servidor. Por favor, verifica que el backend esté funcionando.' : null;
+
   // Analytics hooks
   const { trackEvent } = useAnalyticsContext();
   const { trackTestimonialEngagement, trackAppointmentIntent } = useConversionTracking();
@@ -26,41 +31,16 @@ const TestimonialsPage: React.FC = () => {
     });
   }, [trackEvent]);
 
-  // Cargar testimonios del backend
   useEffect(() => {
-    const fetchTestimonials = async () => {
-      try {
-        setLoading(true);
-        setError(null);
-        console.log('Cargando testimonios del backend...');
-        
-        const data = await getTestimonials();
-        console.log('Testimonios recibidos:', data);
-        
-        setTestimonials(data);
-        
-      } catch (err) {
-        console.error('Error al cargar testimonios:', err);
-        setError('Error al conectar con el servidor. Por favor, verifica que el backend esté funcionando.');
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchTestimonials();
-  }, []);
+    if (loadError) console.error('Error al cargar testimonios:', loadError);
+  }, [loadError]);
 
-  // Paginación con analytics
-  const totalPages = Math.ceil(testimonials.length / testimonialsPerPage);
-  const startIndex = (currentPage - 1) * testimonialsPerPage;
-  const currentTestimonials = testimonials.slice(startIndex, startIndex + testimonialsPerPage);
-
-  const handlePageChange = (newPage: number) => {
-    setCurrentPage(newPage);
+  // Siguiente página con analytics
+  const handleLoadMore = () => {
+    loadMore();
     trackEvent('testimonials_pagination', {
       category: 'user_interaction',
-      page_number: newPage,
-      total_pages: totalPages
+      page_number: Math.floor(testimonials.length / testimonialsPerPage) + 1
     });
   };
 
@@ -141,7 +121,7 @@ const TestimonialsPage: React.FC = () => {
       <div className="container mx-auto px-4 py-8">
         {/* Results count */}
         <p className="text-gray-600 mb-6">
-          Mostrando {Math.min(startIndex + 1, testimonials.length)}-{Math.min(startIndex + testimonialsPerPage, testimonials.length)} de {testimonials.length} testimonios
+          Mostrando {testimonials.length} testimonios
         </p>
 
         {/* Empty State */}
@@ -163,7 +143,7 @@ const TestimonialsPage: React.FC = () => {
         {/* Testimonials Grid */}
         {testimonials.length > 0 && (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-8 mb-12">
-            {currentTestimonials.map((testimonial) => (
+            {testimonials.map((testimonial) => (
               <div 
                 key={testimonial.id} 
                 className="bg-white rounded-2xl shadow-lg overflow-hidden hover:shadow-xl transition-all duration-500 border border-gray-100"
@@ -219,41 +199,16 @@ const TestimonialsPage: React.FC = () => {
           </div>
         )}
 
-        {/* Pagination */}
-        {totalPages > 1 && (
-          <div className="flex justify-center items-center gap-4">
-            <button
-              onClick={() => handlePageChange(Math.max(currentPage - 1, 1))}
-              disabled={currentPage === 1}
-              className="flex items-center gap-2 px-4 py-2 border border-gray-200 rounded-lg disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50 transition-colors duration-300"
-            >
-              <ChevronLeft className="w-5 h-5" />
-              Anterior
-            </button>
-            
-            <div className="flex gap-2">
-              {Array.from({ length: totalPages }, (_, i) => i + 1).map(page => (
-                <button
-                  key={page}
-                  onClick={() => handlePageChange(page)}
-                  className={`w-10 h-10 rounded-lg transition-colors duration-300 ${
-                    currentPage === page
-                      ? 'bg-[#8A2E3B] text-white'
-                      : 'border border-gray-200 hover:bg-gray-50'
-                  }`}
-                >
-                  {page}
-                </button>
-              ))}
-            </div>
-            
+        {/* Cargar más */}
+        {hasMore && (
+          <div className="flex justify-center">
             <button
-              onClick={() => handlePageChange(Math.min(currentPage + 1, totalPages))}
-              disabled={currentPage === totalPages}
+              onClick={handleLoadMore}
+              disabled={loadingMore}
               className="flex items-center gap-2 px-4 py-2 border border-gray-200 rounded-lg disabled:opacity-50 disabled:cursor-not-allowed hover:bg-gray-50 transition-colors duration-300"
             >
-              Siguiente
-              <ChevronRight className="w-5 h-5" />
+              {loadingMore ? 'Cargando...' : 'Cargar más testimonios'}
+              <ChevronDown className="w-5 h-5" />
             </button>
           </div>
         )}
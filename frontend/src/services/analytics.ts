@@ -127,6 +127,27 @@ export const getBusinessInsights = async (params?: {
   }
 };
 
+// Grouped time-series report
+export const getAnalyticsReport = async (params: {
+  start_date: string;
+  end_date: string;
+  group_by?: 'day' | 'week' | 'month';
+  metric_types?: string[];
+}) => {
+  try {
+    const response = await analyticsApi.get('/reports/report/', {
+      params: {
+        ...params,
+        metric_types: params.metric_types?.join(','),
+      }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching analytics report:', error);
+    throw error;
+  }
+};
+
 // Real-time analytics
 export const getRealtimeMetrics = async () => {
   try {
@@ -154,6 +175,7 @@ export default {
   endSession,
   getAnalyticsDashboard,
   getBusinessInsights,
+  getAnalyticsReport,
   getRealtimeMetrics,
 };
 
@@ -31,6 +31,32 @@ export interface DateValidation {
   message: string;
 }
 
+export interface AvailabilitySlot {
+  time: string;
+  available: boolean;
+  occupied: boolean;
+}
+
+export interface AvailabilityDay {
+  date: string;
+  is_working_day: boolean;
+  available_count: number;
+  slots: AvailabilitySlot[];
+}
+
+export interface AvailabilityCalendar {
+  start_date: string;
+  end_date: string;
+  days: AvailabilityDay[];
+}
+
+export interface SlotHold {
+  hold_token: string;
+  date: string;
+  time: string;
+  expires_in: number;
+}
+
 export const appointmentService = {
   async getAppointments(): Promise<Appointment[]> {
     const response = await apiClient.get('/appointments/');
@@ -64,6 +90,24 @@ export const appointmentService = {
     return response.data as BusinessHoursInfo;
   },
 
+  async getAvailability(startDate: string, endDate?: string): Promise<AvailabilityCalendar> {
+    const params = new URLSearchParams({ start_date: startDate });
+    if (endDate) {
+      params.append('end_date', endDate);
+    }
+    const response = await apiClient.get(`/appointments/availability/?${params.toString()}`);
+    return response.data as AvailabilityCalendar;
+  },
+
+  async holdSlot(date: string, time: string, holdToken?: string): Promise<SlotHold> {
+    const response = await apiClient.post('/appointments/hold/', { date, time, hold_token: holdToken });
+    return response.data as SlotHold;
+  },
+
+  async releaseHold(date: string, time: string, holdToken: string): Promise<void> {
+    await apiClient.post('/appointments/release_hold/', { date, time, hold_token: holdToken });
+  },
+
   async validateDate(date: string): Promise<DateValidation> {
     const response = await apiClient.get(`/appointments/validate_date/?date=${date}`);
     return response.data as DateValidation;
@@ -1,8 +1,37 @@
 import api from './api';
-import type { Dress } from '../types';
+import type { CursorPage, Dress, DressFacets } from '../types';
 
-export async function getDresses(): Promise<Dress[]> {
-  const response = await api.get<Dress[]>('dresses/');
+export interface DressFilters {
+  style?: string;
+  available?: boolean;
+}
+
+export interface DressPageParams extends DressFilters {
+  page_size?: number;
+  fields?: string[];
+}
+
+// Una página del catálogo; `cursor` es la URL `next`/`previous` de la página anterior
+export async function getDressesPage(cursor?: string | null, params: DressPageParams = {}): Promise<CursorPage<Dress>> {
+  const response = await api.get<CursorPage<Dress>>(cursor || 'dresses/', {
+    params: cursor ? undefined : {
+      page_size: params.page_size,
+      fields: params.fields?.join(','),
+      style: params.style || undefined,
+      available: params.available,
+    },
+  });
+  return response.data;
+}
+
+// Recuentos por estilo y disponibilidad para los filtros actuales
+export async function getDressFacets(filters: DressFilters = {}): Promise<DressFacets> {
+  const response = await api.get<DressFacets>('dresses/facets/', {
+    params: {
+      style: filters.style || undefined,
+      available: filters.available,
+    },
+  });
   return response.data;
 }
 
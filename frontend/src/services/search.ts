@@ -0,0 +1,24 @@
+import api from './api';
+
+export interface SearchResult {
+  type: 'dress' | 'testimonial';
+  id: number;
+  title: string;    // HTML escapado con <mark> en los términos encontrados
+  snippet: string;  // HTML escapado con <mark> en los términos encontrados
+  score: number;
+}
+
+export interface SearchResponse {
+  query: string;
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: SearchResult[];
+}
+
+export async function search(q: string, page = 1, type?: SearchResult['type']): Promise<SearchResponse> {
+  const response = await api.get<SearchResponse>('search/', {
+    params: { q, page, type },
+  });
+  return response.data;
+}
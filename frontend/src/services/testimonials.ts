@@ -1,8 +1,19 @@
 import api from './api';
-import type { BrideTestimonial } from '../types';
+import type { BrideTestimonial, CursorPage } from '../types';
 
-export async function getTestimonials(): Promise<BrideTestimonial[]> {
-  const response = await api.get<BrideTestimonial[]>('testimonials/');
+export interface TestimonialPageParams {
+  page_size?: number;
+  fields?: string[];
+}
+
+// Una página de testimonios; `cursor` es la URL `next`/`previous` de la página anterior
+export async function getTestimonialsPage(cursor?: string | null, params: TestimonialPageParams = {}): Promise<CursorPage<BrideTestimonial>> {
+  const response = await api.get<CursorPage<BrideTestimonial>>(cursor || 'testimonials/', {
+    params: cursor ? undefined : {
+      page_size: params.page_size,
+      fields: params.fields?.join(','),
+    },
+  });
   return response.data;
 }
 
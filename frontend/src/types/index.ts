@@ -1,8 +1,31 @@
 // Interfaces que coinciden con los modelos del backend
 
+// Derivados responsive por formato: { avif: "url 320w, url 640w", webp: ..., jpeg: ... }
+export type ImageSrcset = Partial<Record<'avif' | 'webp' | 'jpeg', string>>;
+
+// Página de un listado paginado por cursor (dresses/, testimonials/)
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Recuentos precalculados del catálogo (dresses/facets/)
+export interface FacetCount<T> {
+  value: T;
+  count: number;
+}
+
+export interface DressFacets {
+  total: number;
+  style: FacetCount<string>[];
+  available: FacetCount<boolean>[];
+}
+
 export interface DressImage {
   id: number;
   image: string;
+  image_srcset?: ImageSrcset;
   order: number;
 }
 
@@ -11,6 +34,7 @@ export interface Dress {
   name: string;
   description: string;
   image: string;
+  image_srcset?: ImageSrcset;
   additional_images: DressImage[];
   style: string;
   available: boolean;
@@ -20,6 +44,7 @@ export interface Dress {
 export interface TestimonialImage {
   id: number;
   image: string;
+  image_srcset?: ImageSrcset;
   order: number;
 }
 
@@ -28,6 +53,7 @@ export interface BrideTestimonial {
   bride_name: string;
   testimonial: string;
   image: string;
+  image_srcset?: ImageSrcset;
   additional_images: TestimonialImage[];
   wedding_date: string;
   created_at: string;